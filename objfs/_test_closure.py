@@ -0,0 +1,42 @@
+import pytest
+from objfs.platon import Platon
+from objfs.closure import Closure
+
+
+@pytest.fixture
+def isa():
+    isa = Platon()
+    closure = Closure(isa).install()
+    yield isa, closure
+    closure.uninstall()
+
+
+def test_closure_incremental(isa):
+    isa, closure = isa
+    string, utf8, ascii, name, other = (Platon() for _ in range(5))
+    ascii.define(isa, utf8)
+    name.define(isa, ascii)
+    assert(closure.reaches(name, utf8) and not closure.reaches(name, string))
+    utf8.define(isa, string)
+    assert(closure.reaches(name, string) and closure.reaches(ascii, string))
+    assert(not closure.reaches(string, utf8) and closure.is_a(string, string) and not closure.reaches(string, string))
+    assert(set(closure.ancestors(name)) == {ascii, utf8, string})
+    assert(set(closure.descendants(string)) == {name, ascii, utf8})
+    assert(not closure.reaches(other, string) and list(closure.ancestors(other)) == [])
+    name.define(other, string, 1)
+    string.define(isa, name)
+    assert(closure.reaches(string, string) and closure.reaches(utf8, name))
+
+
+def test_closure_load():
+    isa = Platon()
+    a, b, c = Platon(), Platon(), Platon()
+    a.define(isa, b)
+    b.define(isa, c)
+    closure = Closure(isa).load([a, b, c])
+    assert(closure.reaches(a, c) and len(closure) == 3)
+    chain = [Platon() for _ in range(300)]
+    for sub, sup in zip(chain, chain[1:]): closure.add(sub, (sup,))
+    assert(closure.reaches(chain[0], chain[-1]) and not closure.reaches(chain[-1], chain[0]))
+    assert(isinstance(closure.up[closure.ids[chain[0]]], bytearray) and len(list(closure.ancestors(chain[0]))) == 299)
+    assert(Platon.closures is None)
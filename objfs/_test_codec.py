@@ -0,0 +1,58 @@
+import pytest
+from objfs.codec import write_term, read_term, encode_node, decode_namespace, decode_sentences, encode_sentences, \
+    decode_sentence_sets, encode_sentence_sets
+from objfs.platon import Platon, Sentences
+from objfs.platon_id import PlatonID
+
+
+def test_codec_terms():
+    terms = [None, True, False, 0, -1, 1, -300, 1 << 70, '', 'héllo', b'', b'\x00\xff', PlatonID(5, 6)]
+    out = bytearray()
+    for term in terms: write_term(out, term)
+    i, back = 0, []
+    while i < len(out):
+        term, i = read_term(out, i)
+        back.append(term)
+    assert(back == terms and [type(t) for t in back] == [type(t) for t in terms])
+    with pytest.raises(TypeError):
+        write_term(bytearray(), 1.5)
+
+
+def test_codec_detached():
+    root, a = Platon(), Platon()
+    root.namespace[3] = a
+    write_term(out := bytearray(), a)
+    write_term(out, root, root)
+    assert(read_term(out, 0)[0] == PlatonID(3) and read_term(out, read_term(out, 0)[1])[0] == '.')
+    with pytest.raises(ValueError):
+        write_term(bytearray(), root)
+    with pytest.raises(ValueError):
+        write_term(bytearray(), Platon(), root)
+
+
+def test_codec_node():
+    root, a = Platon(), Platon()
+    root.namespace[9] = a
+    sentences = Sentences()
+    sentences.add(a, ('x', 1))
+    sentences.add(a, ('y',))
+    record = encode_node([300, 2, 9], sentences)
+    keys, start = decode_namespace(record)
+    assert(keys == [2, 9, 300])
+    back = decode_sentences(record, start, root.lookup)
+    assert(set(back[a]) == {('x', 1), ('y',)})
+    assert(decode_sentences(record, start)[PlatonID(9)] == back[a])
+
+
+def test_codec_sentence_sets():
+    root, a, b = Platon(), Platon(), Platon()
+    root.namespace[9], root.namespace[10] = a, b
+    sentences = Sentences()
+    for objs in [('x', 1), (None, True, -5, b'\x01'), ('y', PlatonID(3), a), ()]: sentences.add(a, objs)
+    sentences.add(b, ('z',))
+    encode_sentences(encoded := bytearray(), sentences, canonical=True)
+    sets = decode_sentence_sets(encoded)
+    assert(len(sets) == 2 and sum(len(objects) for objects in sets.values()) == 5)
+    assert(encode_sentence_sets(bytearray(), sets) == encoded)
+    sets[next(iter(sets))] = set()
+    assert(decode_sentences(encode_sentence_sets(bytearray(), sets), 0, root.lookup) == {b: sentences[b]})
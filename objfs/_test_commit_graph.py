@@ -0,0 +1,59 @@
+import pytest
+from hashlib import sha256
+from objfs.kvfs import Filesystem, KVStore
+from objfs.commit import Commit
+from objfs.commit_graph import CommitGraph
+from objfs.object_store import ObjectStore
+
+
+@pytest.fixture
+def bridge(tmp_path):
+    return Filesystem(KVStore(id='test', base=str(tmp_path)))
+
+
+def _history(graph, edges):
+    ''' {name: parent names} in order -> {name: digest}
+    '''
+    digests = {}
+    for name, parents in edges.items():
+        digests[name] = sha256(name.encode()).digest()
+        graph.add(digests[name], bytes(32), [digests[p] for p in parents])
+    return digests
+
+
+def test_commit_graph_queries(bridge):
+    graph = CommitGraph(bridge)
+    # a <- b <- c <- d <- e0,  c <- d1 <- e1,  and a criss-cross x1/x2 over e0 and e1
+    c = _history(graph, {'a': [], 'b': ['a'], 'c': ['b'], 'd': ['c'], 'e0': ['d'], 'd1': ['c'], 'e1': ['d1'],
+        'x1': ['e0', 'e1'], 'x2': ['e1', 'e0'], 'y1': ['x1'], 'y2': ['x2']})
+    assert(graph.generation(c['a']) == 1 and graph.generation(c['x1']) == 6)
+    assert(graph.is_ancestor(c['b'], c['e1']) and graph.is_ancestor(c['e1'], c['e1']))
+    assert(not graph.is_ancestor(c['d'], c['e1']) and not graph.is_ancestor(c['e1'], c['b']))
+    assert(graph.merge_base(c['e0'], c['e1']) == [c['c']])
+    assert(graph.merge_base(c['d'], c['e0']) == [c['d']])
+    assert(set(graph.merge_base(c['y1'], c['y2'])) == {c['e0'], c['e1']})
+    assert(graph.merge_base(c['e0'], c['e1'], c['b']) == [c['b']])
+    assert(graph.since(c['e1'], c['e0']) == [c['e1'], c['d1']])
+    assert(set(graph.since(c['x1'], c['d'])) == {c['x1'], c['e0'], c['e1'], c['d1']})
+    assert(graph.since(c['c'], c['e0']) == [] and len(graph.since(c['y2'])) == 9)
+    assert(graph.parents_of(c['x2']) == [c['e1'], c['e0']])
+
+
+def test_commit_graph_store(bridge):
+    store = ObjectStore(bridge)
+    tree = store.put(b'', b'tree')
+    first = store.put_commit(Commit(tree, message='first'))
+    second = store.put_commit(Commit(tree, [first], message='second'))
+    store.flush()
+    third = store.put_commit(Commit(tree, [second], message='third'))
+    store.flush()
+    reopened = ObjectStore(bridge)
+    assert(len(reopened.graph) == 3 and reopened.graph.segments == 2)
+    reopened.get = None # History questions must not read commits
+    assert(reopened.graph.since(third, first) == [third, second] and reopened.graph.tree(third) == tree)
+    # Commits stored without the graph are added when a child is
+    del reopened.get
+    lost = ObjectStore(bridge, prefix='other/')
+    lost.put(Commit(tree, message='first').encode(), b'commit')
+    fourth = lost.put_commit(Commit(tree, [first], message='fourth'))
+    assert(lost.graph.parents_of(fourth) == [first] and lost.graph.generation(fourth) == 2)
@@ -0,0 +1,25 @@
+import pytest
+from objfs.db import DB
+from objfs.platon import Platon
+from objfs.platon_id import PlatonID
+from objfs.triple_index import TripleIndex
+from objfs.closure import Closure
+
+
+def test_db_load():
+    db = DB()
+    isa = Platon()
+    subjects = [Platon() for _ in range(10)]
+    for i, s in enumerate(subjects): db.namespace[i] = s
+    Platon.index = TripleIndex()
+    closure = Closure(isa).install()
+    try:
+        n = db.load(((subjects[i % 10], isa, subjects[(i + 1) % 10]) for i in range(25)), batch=7)
+        n += db.load([(PlatonID(3), isa, 'three')])
+        assert(n == 26)
+        assert(Platon.index.subjects(isa, subjects[4]) == {subjects[3]} and Platon.index.subjects(isa, 'three') == {subjects[3]})
+        assert(closure.reaches(subjects[0], subjects[9]) and closure.reaches(subjects[9], subjects[0]))
+        assert(set(subjects[3].each(isa)) == {(subjects[4],), ('three',)})
+    finally:
+        Platon.index = None
+        closure.uninstall()
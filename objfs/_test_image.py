@@ -0,0 +1,75 @@
+import io, pytest
+from objfs.db import DB
+from objfs.image import ImagePager, write_image
+from objfs.paging import PagedPlaton
+from objfs.platon import Platon
+from objfs.platon_id import PlatonID
+from objfs.wal import WAL
+from objfs._test_paging import _tree
+
+
+def test_image_lazy(tmp_path):
+    root = _tree()
+    isa, leaf = root.lookup(PlatonID(0)), root.lookup(PlatonID(1, 2, 3))
+    leaf.define(isa, 'x', 7, PlatonID(300))
+    root.lookup(PlatonID(2)).define(isa, leaf)
+    root.define(isa)
+    assert(write_image(tmp_path / 'db.img', root) == 1 + 4 + 16 + 64)
+    image = ImagePager(tmp_path / 'db.img')
+    assert(len(image) == 85 and image.faults == 0)
+    leaf = image.root.lookup(PlatonID(1, 2, 3))
+    assert(isinstance(leaf, PagedPlaton) and leaf.state == PagedPlaton.UNLOADED)
+    assert(list(leaf) == [(image.root.lookup(PlatonID(0)), 'x', 7, PlatonID(300))])
+    assert(image.subjects(image.root.lookup(PlatonID(0))) == [image.root, image.root.lookup(PlatonID(2)), leaf])
+    assert(image.subjects(leaf) == [] and image.node(84).path() == PlatonID(3, 3, 3))
+    with pytest.raises(io.UnsupportedOperation):
+        leaf.define(isa, 'y')
+        image.flush()
+
+
+def test_image_evict(tmp_path):
+    write_image(tmp_path / 'db.img', _tree(width=10))
+    image = ImagePager(tmp_path / 'db.img', budget=ImagePager.NODE_COST * 20)
+    for n in range(len(image)): image.node(n)
+    assert(image.faults >= 111 and image.evictions > 0 and image.used <= image.budget)
+    assert(image.root.lookup(PlatonID(9, 9, 9)).path() == PlatonID(9, 9, 9))
+
+
+def test_image_db(tmp_path):
+    db = DB(WAL(tmp_path / 'wal'))
+    verb = Platon()
+    with db.transaction() as tx:
+        tx.insert(db, 0, verb)
+        tx.insert(db, 1)
+        tx.define(db, verb, 'root')
+        tx.define(PlatonID(1), verb, 'hello', 1)
+    db.checkpoint_image(tmp_path / 'db.img')
+    with db.transaction() as tx:
+        tx.insert(PlatonID(1), 5)
+        tx.define(PlatonID(1, 5), verb, db.lookup(PlatonID(1)))
+    db.wal.close()
+    back = DB.open(WAL(tmp_path / 'wal'))
+    verb = back.lookup(PlatonID(0))
+    assert(isinstance(back.image, ImagePager) and isinstance(verb, PagedPlaton))
+    assert(list(back.each(verb)) == [('root',)])
+    assert(list(back.lookup(PlatonID(1)).each(verb)) == [('hello', 1)])
+    assert(list(back.lookup(PlatonID(1, 5))) == [(verb, back.lookup(PlatonID(1)))])
+    one = back.lookup(PlatonID(1))
+    assert(one.modified())
+    back.checkpoint_image(tmp_path / 'db.img')
+    # The modified nodes were moved onto the new image, so they can be evicted again
+    assert(not any(node.modified() for node in back.image.loaded) and back.image.node(one.stored) is one)
+    back.image.budget = 0
+    back.image.evict()
+    assert(list(back.lookup(PlatonID(1, 5))) == [(back.lookup(PlatonID(0)), one)] and list(one.each(verb)) == [('hello', 1)])
+    # New nodes come from the image, so once saved they don't pin their ancestors
+    with back.transaction() as tx:
+        tx.insert(PlatonID(1, 5), 0)
+        tx.define(PlatonID(1, 5, 0), verb, 'deep')
+    five, deep = back.lookup(PlatonID(1, 5)), back.lookup(PlatonID(1, 5, 0))
+    back.checkpoint_image(tmp_path / 'db.img')
+    back.image.evict()
+    assert(isinstance(deep, PagedPlaton) and five.state == deep.state == PagedPlaton.UNLOADED)
+    assert(list(deep) == [(back.lookup(PlatonID(0)), 'deep')])
+    again = DB.open(WAL(tmp_path / 'wal'))
+    assert(list(again.lookup(PlatonID(1, 5))) == [(again.lookup(PlatonID(0)), again.lookup(PlatonID(1)))])
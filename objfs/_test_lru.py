@@ -0,0 +1,15 @@
+import pytest
+from objfs.lru import LRU
+
+
+def test_lru():
+    lru = LRU(2)
+    lru['a'], lru['b'] = 1, 2
+    assert(lru.get('a') == 1)
+    lru['c'] = 3
+    assert('b' not in lru and 'a' in lru and len(lru) == 2)
+    assert(lru.get('b', 'x') == 'x')
+    assert((lru.hits, lru.misses, lru.hit_rate()) == (1, 1, 0.5))
+    assert(lru.pop('a') == 1 and lru.pop('a') == None)
+    lru.clear()
+    assert(len(lru) == 0 and lru.hit_rate() == 0)
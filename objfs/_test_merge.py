@@ -0,0 +1,85 @@
+import pytest
+from objfs.kvfs import Filesystem, KVStore
+from objfs.commit import Commit
+from objfs.merge import Merge
+from objfs.object_store import ObjectStore
+from objfs.platon import Platon
+from objfs.platon_id import PlatonID
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ObjectStore(Filesystem(KVStore(id='test', base=str(tmp_path))))
+
+
+def test_merge_trees(store):
+    world = Platon()
+    world.namespace[0] = verbs = Platon()
+    tag, title = verbs.namespace[0], verbs.namespace[1] = Platon(), Platon()
+    for g in range(5):
+        world.namespace[g + 1] = group = Platon()
+        for i in range(20):
+            group.namespace[i] = node = Platon()
+            node.define(tag, 'base')
+            node.define(title, f"{g}.{i}")
+    base = store.put_tree(world)
+    # Ours: tag 1.1, retitle 2.2 and 3.3, delete 4.4, add 5.20
+    world.lookup(PlatonID(1, 1)).define(tag, 'ours')
+    world.lookup(PlatonID(2, 2)).sentences[title] = ('ours',),
+    world.lookup(PlatonID(3, 3)).sentences[title] = ('ours',),
+    del world.lookup(PlatonID(4)).namespace[4]
+    world.lookup(PlatonID(5)).namespace[20] = Platon()
+    ours = store.put_tree(world)
+    world = store.get_tree(base)
+    tag, title = world.lookup(PlatonID(0, 0)), world.lookup(PlatonID(0, 1))
+    # Theirs: tag 1.1 and drop its base tag, retitle 3.3, change 4.4, add 5.21
+    world.lookup(PlatonID(1, 1)).define(tag, 'theirs')
+    world.lookup(PlatonID(1, 1)).sentences[tag] = tuple(o for o in world.lookup(PlatonID(1, 1)).sentences[tag] if o != ('base',))
+    world.lookup(PlatonID(3, 3)).sentences[title] = ('theirs',),
+    world.lookup(PlatonID(4, 4)).define(tag, 'theirs')
+    world.lookup(PlatonID(5)).namespace[21] = Platon()
+    theirs = store.put_tree(world)
+    merge = Merge(store, single=[title])
+    merged = store.get_tree(merge.trees(base, ours, theirs))
+    tag, title = merged.lookup(PlatonID(0, 0)), merged.lookup(PlatonID(0, 1))
+    assert(set(merged.lookup(PlatonID(1, 1)).each(tag)) == {('ours',), ('theirs',)})
+    assert(list(merged.lookup(PlatonID(2, 2)).each(title)) == [('ours',)])
+    assert(list(merged.lookup(PlatonID(3, 3)).each(title)) == [('ours',)])
+    assert(set(merged.lookup(PlatonID(4, 4)).each(tag)) == {('base',), ('theirs',)})
+    assert(sorted(merged.lookup(PlatonID(5)).namespace)[-2:] == [20, 21])
+    assert(sorted((c.kind, str(c.path)) for c in merge.conflicts) == [('delete/modify', str(PlatonID(4, 4))), ('value', str(PlatonID(3, 3)))])
+    value = next(c for c in merge.conflicts if c.kind == 'value')
+    assert(value.verb == PlatonID(0, 1) and value.base == {('2.3',)} and value.ours == {('ours',)} and value.theirs == {('theirs',)})
+    # Only the changed nodes and their ancestors are read: the root, 5 groups and 3 nodes on each side and in the base
+    assert(merge.reads <= 3 * (1 + 5 + 3))
+    assert(Merge(store).trees(base, ours, base) == ours and Merge(store).trees(None, ours, ours) == ours)
+
+
+def test_merge_commits(store):
+    world = Platon()
+    world.namespace[0] = verbs = Platon()
+    tag, title = verbs.namespace[0], verbs.namespace[1] = Platon(), Platon()
+    for g in range(2):
+        world.namespace[g + 1] = group = Platon()
+        for i in range(2):
+            group.namespace[i] = node = Platon()
+            node.define(tag, 'base')
+            node.define(title, f"{g}.{i}")
+    base = store.put_commit(Commit(store.put_tree(world)))
+    world.lookup(PlatonID(1, 0)).define(tag, 'a')
+    a = store.put_commit(Commit(store.put_tree(world), [base]))
+    world.lookup(PlatonID(1, 0)).sentences[tag] = ('base',),
+    world.lookup(PlatonID(2, 1)).define(tag, 'b')
+    b = store.put_commit(Commit(store.put_tree(world), [base]))
+    merge = Merge(store)
+    assert(merge.commits(a, base) == a and merge.commits(base, b) == b)
+    ab = merge.commits(a, b, message='merge')
+    assert(store.graph.parents_of(ab) == [a, b] and not merge.conflicts)
+    merged = store.get_tree(store.graph.tree(ab))
+    tag = merged.lookup(PlatonID(0, 0))
+    assert(set(merged.lookup(PlatonID(1, 0)).each(tag)) == {('base',), ('a',)})
+    assert(set(merged.lookup(PlatonID(2, 1)).each(tag)) == {('base',), ('b',)})
+    # A criss-cross merge merges its two bases first
+    ba = Merge(store).commits(b, a)
+    assert(set(store.graph.merge_base(ab, ba)) == {a, b})
+    assert(store.graph.tree(Merge(store).commits(ab, ba)) == store.graph.tree(ab))
@@ -0,0 +1,83 @@
+import pytest
+from objfs.merkle import Merkle
+from objfs.platon import Platon
+from objfs.platon_id import PlatonID
+
+
+@pytest.fixture
+def merkle():
+    merkle = Merkle().install()
+    yield merkle
+    merkle.uninstall()
+
+
+def test_merkle_incremental(merkle):
+    a, b = Platon(), Platon()
+    for root in (a, b):
+        root.namespace[0] = verb = Platon()
+        for g in range(4):
+            root.namespace[g + 1] = group = Platon()
+            for i in range(4):
+                group.namespace[i] = node = Platon()
+                node.define(verb, g, i)
+    merkle.track(a).track(b)
+    assert(merkle.hash(a) == merkle.hash(b) and merkle.hash(a.lookup(PlatonID(1))) != merkle.hash(a.lookup(PlatonID(2))))
+    before = merkle.hash(a)
+    node = a.lookup(PlatonID(2, 3))
+    node.define(a.lookup(PlatonID(0)), 'x')
+    assert(merkle.hash(a) != before and merkle.verify(a) == [])
+    node.define(a.lookup(PlatonID(0)), 'x') # Already there
+    a.lookup(PlatonID(3)).namespace[9] = extra = Platon()
+    extra.define_many([(a.lookup(PlatonID(0)), 1), (a.lookup(PlatonID(0)), 2)])
+    del a.lookup(PlatonID(4)).namespace[0]
+    assert(merkle.verify(a) == [])
+    assert(sorted((str(path), change) for path, change in merkle.diff(a, b)) ==
+        sorted([(str(PlatonID(2, 3)), 'changed'), (str(PlatonID(3, 9)), 'removed'), (str(PlatonID(4, 0)), 'added')]))
+    # Undoing the changes brings back the same hash
+    node.sentences[a.lookup(PlatonID(0))] = (1, 3),
+    merkle.refresh(node)
+    del a.lookup(PlatonID(3)).namespace[9]
+    a.lookup(PlatonID(4)).namespace[0] = moved = a.lookup(PlatonID(1)).namespace.pop(0)
+    assert(merkle.verify(a) == [] and sorted((str(path), change) for path, change in merkle.diff(a, b)) ==
+        [(str(PlatonID(1, 0)), 'added'), (str(PlatonID(4, 0)), 'changed')])
+    a.lookup(PlatonID(1)).namespace[0] = moved
+    b.lookup(PlatonID(4)).namespace.pop(0)
+    assert(merkle.hash(a) == merkle.hash(b) and merkle.verify(a) == merkle.verify(b) == [])
+    assert(list(merkle.diff(a, b)) == [])
+
+
+def test_merkle_untracked(merkle):
+    a = Platon()
+    a.namespace[0] = verb = Platon()
+    for g in range(4):
+        a.namespace[g + 1] = group = Platon()
+        for i in range(4):
+            group.namespace[i] = node = Platon()
+            node.define(verb, g, i)
+    a.lookup(PlatonID(1, 1)).define(verb, 'x')
+    assert(a not in merkle.nodes)
+    merkle.track(a)
+    a.lookup(PlatonID(1, 1)).sentences = None
+    assert(merkle.verify(a) == [a.lookup(PlatonID(1, 1)), a.lookup(PlatonID(1)), a])
+
+
+def test_merkle_references(merkle):
+    p, q = Platon(), Platon()
+    merkle.track(p).track(q)
+    p.define(Platon(), 1)
+    q.define(Platon(), 1)
+    assert(merkle.hash(p) != merkle.hash(q) and list(merkle.diff(p, q)) == [(PlatonID.CURRENT, 'changed')])
+    r = Platon()
+    r.namespace[1] = subject = Platon()
+    r.namespace[2] = verb = Platon()
+    merkle.track(r)
+    subject.define(verb, 'x')
+    r.namespace[5] = verb # Moving the verb changes the path that the sentence refers to
+    assert(merkle.verify(r) == [])
+    del r.namespace[5]
+    assert(merkle.verify(r) == [])
+    subject.namespace[0] = verb
+    assert(merkle.verify(r) == [])
+    r.namespace[3] = subject.namespace.pop(0)
+    subject.namespace.clear()
+    assert(merkle.verify(r) == [])
@@ -0,0 +1,86 @@
+import pytest
+from objfs.kvfs import Filesystem, KVStore
+from objfs.commit import Commit
+from objfs.merkle import Merkle
+from objfs.object_store import ObjectStore
+from objfs.platon import Platon
+from objfs.platon_id import PlatonID
+
+
+@pytest.fixture
+def bridge(tmp_path):
+    return Filesystem(KVStore(id='test', base=str(tmp_path)))
+
+
+def test_object_store_dedup(bridge):
+    store = ObjectStore(bridge)
+    a = store.put(b'hello')
+    assert(store.put(b'hello') == a and len(store) == 1 and a in store)
+    assert(store.get(a) == (b'blob', b'hello') and store.put(b'hello', b'tree') != a)
+    with pytest.raises(KeyError):
+        store.get(bytes(32))
+    store.flush()
+    store.put(b'other')
+    store.flush()
+    reopened = ObjectStore(bridge)
+    assert(len(reopened) == 3 and a in reopened and reopened.segments == 2)
+
+
+def test_object_store_tree(bridge):
+    store = ObjectStore(bridge)
+    digests, sizes = [], []
+    for words in ('abc', 'abc', 'abd'):
+        world = Platon()
+        verb = world.namespace[0] = Platon()
+        for i, word in enumerate(words):
+            world.namespace[i + 1] = node = Platon()
+            for j in range(12): node.define(verb, word, j)
+        digests.append(store.put_tree(world))
+        sizes.append(len(store))
+    one, two, three = digests
+    assert(one == two != three and sizes == [5, 5, 7])
+    root = store.get_tree(one)
+    verb = root.lookup(PlatonID(0))
+    assert(sorted(root.namespace) == [0, 1, 2, 3])
+    assert(sorted(root.lookup(PlatonID(2)).each(verb)) == [('b', j) for j in range(12)])
+    assert(store.put_tree(root) == one)
+
+
+def test_object_store_tree_merkle(bridge, tmp_path):
+    store, merkle = ObjectStore(bridge), Merkle().install()
+    try:
+        world = Platon()
+        verb = world.namespace[0] = Platon()
+        for g in range(4):
+            world.namespace[g + 1] = group = Platon()
+            for i in range(4):
+                group.namespace[i] = node = Platon()
+                node.define(verb, g, i)
+        merkle.track(world)
+        store.put_tree(world)
+        puts, put = [], store.put
+        store.put = lambda *args: puts.append(args) or put(*args)
+        world.lookup(PlatonID(2, 3)).define(verb, 'changed')
+        world.lookup(PlatonID(4)).namespace[9] = Platon()
+        digest = store.put_tree(world)
+        assert(len(puts) == 4) # 2.3, 2, 4 and the root: the empty 4.9 is the same tree as the verb
+    finally:
+        merkle.uninstall()
+    fresh = ObjectStore(Filesystem(KVStore(id='fresh', base=str(tmp_path / 'fresh'))))
+    assert(fresh.put_tree(world) == digest)
+
+
+def test_object_store_commit(bridge):
+    store = ObjectStore(bridge)
+    world = Platon()
+    verb = world.namespace[0] = Platon()
+    world.namespace[1] = node = Platon()
+    node.define(verb, 'a')
+    tree = store.put_tree(world)
+    first = store.put_commit(Commit(tree, author='bob', time=1, message='first'))
+    second = store.put_commit(Commit(tree, [first], author='sally', time=2, message='two\n\nlines'))
+    commit = store.get_commit(second)
+    assert(commit.parents == (first,) and commit.tree == tree and commit.message == 'two\n\nlines' and commit.author == 'sally')
+    assert(Commit.decode(commit.encode()).encode() == commit.encode())
+    with pytest.raises(ValueError):
+        store.get_commit(tree)
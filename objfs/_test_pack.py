@@ -0,0 +1,44 @@
+import pytest, random
+from objfs.kvfs import Filesystem, KVStore
+from objfs.object_store import ObjectStore
+from objfs.pack import make_delta, apply_delta
+from objfs.platon import Platon
+from objfs.platon_id import PlatonID
+
+
+def test_pack_delta():
+    rnd = random.Random(1)
+    base = bytes(rnd.randrange(256) for _ in range(5000))
+    target = base[:1000] + b'inserted' + base[1200:4000] + base[:300]
+    delta = make_delta(base, target)
+    assert(apply_delta(base, delta) == target and len(delta) < 100)
+    assert(apply_delta(b'', make_delta(b'', b'abc')) == b'abc')
+    assert(apply_delta(base, make_delta(base, b'')) == b'')
+    with pytest.raises(ValueError):
+        apply_delta(b'x', delta)
+
+
+def test_pack_repack(tmp_path):
+    bridge = Filesystem(KVStore(id='test', base=str(tmp_path)))
+    store = ObjectStore(bridge)
+    root = Platon()
+    verb = root.namespace[0] = Platon()
+    big = root.namespace[1] = Platon()
+    for i in range(200): big.define(verb, f'sentence number {i}', i)
+    trees = []
+    for version in range(20):
+        big.define(verb, 'version', version)
+        trees.append(store.put_tree(root))
+    store.flush()
+    reader = ObjectStore(bridge) # Another process that opened the store before the repack
+    def size(): return sum(f.stat().st_size for f in tmp_path.rglob('*') if f.is_file())
+    before = size()
+    pack = store.repack(depth=5)
+    assert(len(pack) == len(store) and store.repack() is None)
+    assert(size() * 2 < before)
+    reopened = ObjectStore(bridge)
+    assert(len(reopened.packs) == 1 and len(reopened) == len(store))
+    tree = reopened.get_tree(trees[3])
+    assert(len(list(tree.lookup(PlatonID(1)))) == 204)
+    assert(all(reopened.get(digest) for digest in reopened))
+    assert(not reader.packs and reader.get_tree(trees[5]) and len(reader.packs) == 1)
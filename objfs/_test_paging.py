@@ -0,0 +1,86 @@
+import pytest
+from objfs.kvfs import Filesystem, KVStore
+from objfs.platon import Platon
+from objfs.platon_id import PlatonID
+from objfs.paging import Pager, PagedPlaton
+
+
+def _tree(width=4, depth=3):
+    root = Platon()
+    level = [root]
+    for _ in range(depth):
+        nxt = []
+        for node in level:
+            for key in range(width):
+                node.namespace[key] = child = Platon()
+                nxt.append(child)
+        level = nxt
+    return root
+
+
+@pytest.fixture
+def bridge(tmp_path):
+    return Filesystem(KVStore(id='test', base=str(tmp_path)))
+
+
+def test_paging_roundtrip(bridge):
+    root = _tree()
+    leaf, other = root.lookup(PlatonID(1, 2, 3)), root.lookup(PlatonID(3))
+    leaf.define(other, 'x', 7, None, b'\x00', PlatonID(300))
+    root.define(leaf)
+    Pager(bridge).save(root)
+    pager = Pager(bridge)
+    assert(pager.faults == 0)
+    leaf = pager.root.lookup(PlatonID(1, 2, 3))
+    assert(pager.faults == 3 and leaf.state == PagedPlaton.UNLOADED)
+    [(verb, *objects)] = list(leaf)
+    assert(pager.faults == 4)
+    assert(verb is pager.root.lookup(PlatonID(3)) and objects == ['x', 7, None, b'\x00', PlatonID(300)])
+    assert(list(pager.root.each(leaf)) == [()])
+    assert(isinstance(leaf, PagedPlaton) and leaf.path() == PlatonID(1, 2, 3))
+    assert(not any(node.modified() for node in pager.loaded))
+
+
+def test_paging_evicts(bridge):
+    Pager(bridge).save(_tree(8, 3))
+    pager = Pager(bridge, budget=40 * Pager.NODE_COST)
+    for a in range(8):
+        for b in range(8):
+            pager.root.lookup(PlatonID(a, b)).lookup(PlatonID(1))
+    assert(pager.evictions and pager.used <= pager.budget)
+    held = pager.root.lookup(PlatonID(2, 2, 2))
+    for a in range(8): pager.root.lookup(PlatonID(a, 0))
+    assert(pager.root.lookup(PlatonID(2, 2, 2)) is held)
+
+
+def test_paging_leaves_evictable(bridge):
+    Pager(bridge).save(_tree(2, 2))
+    pager = Pager(bridge, budget=0)
+    cache = Platon.lookup_cache
+    before = len(cache)
+    leaf = pager.root.lookup(PlatonID(1, 1))
+    assert(len(cache) == before)
+    assert(not leaf.namespace and not leaf.modified() and pager.evictable(leaf))
+    leaf.namespace[0] = pager.new()
+    del leaf.namespace[0]
+    assert(not leaf.modified())
+    leaf.namespace[0] = pager.new()
+    assert(leaf.modified())
+
+
+def test_paging_flush(bridge):
+    Pager(bridge).save(_tree(2, 2))
+    pager = Pager(bridge, budget=0)
+    node = pager.root.lookup(PlatonID(1, 0))
+    verb = pager.root.lookup(PlatonID(0))
+    node.define(verb, 'hello')
+    pager.root.lookup(PlatonID(0)).namespace[5] = pager.new()
+    pager.root.lookup(PlatonID(0, 5)).define(verb, 'new')
+    pager.root.namespace[3] = pager.root.lookup(PlatonID(1))
+    for i in range(2): pager.root.lookup(PlatonID(0, i))
+    assert(node.state == PagedPlaton.LOADED)
+    pager.flush()
+    pager = Pager(bridge)
+    assert(list(pager.root.lookup(PlatonID(3, 0)).each(pager.root.lookup(PlatonID(0)))) == [('hello',)])
+    assert(list(pager.root.lookup(PlatonID(0, 5))) == [(pager.root.lookup(PlatonID(0)), 'new')])
+    assert(sorted(pager.root.namespace) == [0, 3])
@@ -1,7 +1,144 @@
+import pytest
+import io
+from objfs.platon import Platon, Namespace, Sentences, platon_graph
+from objfs.platon_id import PlatonID
+
+
+def test_platon_lookup():
+    root, a, b = Platon(), Platon(), Platon()
+    root.namespace[9] = a
+    a.namespace[10] = b
+    assert(root.lookup(PlatonID('a_b')) is b)
+    assert(root.lookup('a') is a)
+    assert(root.lookup('.') is root)
+    with pytest.raises(KeyError):
+        root.lookup('a_c')
+    with pytest.raises(KeyError):
+        root.lookup(None)
+
+
+def test_platon_lookup_deep():
+    root = node = Platon()
+    for i in range(5000):
+        node.namespace[i] = node = Platon()
+    assert(root.lookup(PlatonID(*range(5000))) is node)
+
+
+def test_platon_lookup_cache():
+    root, a, b, c = Platon(), Platon(), Platon(), Platon()
+    root.namespace[1] = a
+    a.namespace[2] = b
+    b.namespace[3] = c
+    cache = Platon.lookup_cache
+    cache.clear()
+    assert(root.lookup(PlatonID(1, 2, 3)) is c)
+    assert(root.lookup(PlatonID(1, 2, 3)) is c and cache.hits == 1)
+    c2 = Platon()
+    b.namespace[3] = c2
+    assert(root.lookup(PlatonID(1, 2, 3)) is c2)
+    a.namespace[4] = Platon() # An unrelated change on the path still invalidates
+    assert(root.lookup(PlatonID(1, 2, 3)) is c2)
+    root.namespace.pop(1)
+    with pytest.raises(KeyError):
+        root.lookup(PlatonID(1, 2, 3))
+    root.namespace = Namespace({1: a})
+    assert(root.lookup(PlatonID(1, 2)) is b)
+    a.namespace = Namespace()
+    with pytest.raises(KeyError):
+        root.lookup(PlatonID(1, 2))
+
+
+def test_platon_parent():
+    root, a, b, c = Platon(), Platon(), Platon(), Platon()
+    root.namespace[1] = a
+    a.namespace[2] = b
+    b.namespace[3] = c
+    assert(c.parent_namespace() is b and c.root() is root and root.parent_namespace() is None)
+    assert(c.path() == PlatonID(1, 2, 3) and a.path() == PlatonID(1) and root.path() == '.')
+    assert(c.lookup(PlatonID('.._.._..', 1, 2)) is b and b.lookup(PlatonID('..', '..', 1)) is a)
+    assert(c.lookup(PlatonID('.._.._..', 1, 2)) is b)
+    root.namespace[4] = b # move
+    assert(2 not in a.namespace and b.parent is root and b.key == 4)
+    assert(c.path() == PlatonID(4, 3) and b.path() == PlatonID(4))
+    assert(c.lookup(PlatonID('.._..', 1)) is a)
+    with pytest.raises(KeyError):
+        c.lookup(PlatonID('.._..', 1, 2))
+    with pytest.raises(KeyError):
+        c.lookup(PlatonID('.._.._..', 1, 2))
+    del root.namespace[4]
+    assert(b.parent is None and c.path() == PlatonID(3) and c.root() is b)
+    a.namespace = {5: b}
+    assert(b.parent is a and c.path() == PlatonID(1, 5, 3))
+    a.namespace = Namespace()
+    assert(b.parent is None)
+    assert(c.path() == PlatonID(3))
+    root.namespace[7] = b # a root with a cached path under it
+    assert(c.path() == PlatonID(7, 3))
+    d = a.namespace.setdefault(6)
+    assert(d.parent is a and d.key == 6 and a.namespace.setdefault(6, b) is d)
+    with pytest.raises(ValueError):
+        d.namespace[1] = root
+    with pytest.raises(ValueError):
+        a.namespace[7] = a
+    with pytest.raises(ValueError):
+        d.namespace = {1: a}
+    assert(a.parent is root and a.root() is root and d.path() == PlatonID(1, 6))
+    d.namespace |= {2: b}
+    assert(b.parent is d and b.key == 2 and c.path() == PlatonID(1, 6, 2, 3))
+
+
+def test_platon_compact():
+    verb, leaf = Platon(), Platon()
+    assert(not hasattr(leaf, '__dict__'))
+    assert(list(leaf) == [] and list(leaf.each(verb)) == [] and leaf._sentences is None)
+    with pytest.raises(KeyError):
+        leaf.lookup(PlatonID(1, 2))
+    assert(leaf._namespace is None)
+    for i in range(Sentences.SMALL):
+        leaf.define(verb, i)
+        leaf.define(verb, i)
+    assert(leaf.sentences[verb] == tuple((i,) for i in range(Sentences.SMALL)))
+    leaf.define(verb, 'x')
+    assert(leaf.sentences[verb] == {(i,) for i in range(Sentences.SMALL)} | {('x',)})
+    assert(len(list(leaf.each(verb))) == Sentences.SMALL + 1)
+
+
 #from .platon import  Platon, Name, UTF8
 
 
 #def test_platon_name():
 #    print(repr(Name))
 #    assert(str(Name) == 'Name')
-    
\ No newline at end of file
+
+
+def test_platon_graph():
+    root = node = Platon()
+    for i in range(5000):
+        node.namespace[0] = node = Platon()
+    root.define(node, root)
+    out = io.StringIO()
+    assert(platon_graph(out, root, max_nodes=10000) == 5001)
+    dot = out.getvalue()
+    assert(dot.startswith('digraph {') and dot.endswith('}\n') and dot.count('style=dashed') == 5000)
+    out = io.StringIO()
+    assert(platon_graph(out, root, max_depth=3) == 4 and 'edges cut' in out.getvalue())
+    wide = Platon()
+    for i in range(100): wide.namespace[i] = Platon()
+    out = io.StringIO()
+    assert(platon_graph(out, wide, collapse=50) == 1 and '100 children' in out.getvalue())
+    assert(platon_graph(io.StringIO(), wide, max_nodes=10, collapse=1000) == 10)
+
+
+def test_platon_define_many():
+    verbs = [Platon() for _ in range(3)]
+    sentences = [(verbs[i % 3], i % 11, 'x') for i in range(40)] + [(verbs[0],), (verbs[1], 3)]
+    one, many = Platon(), Platon()
+    for s in sentences: one.define(*s)
+    many.define(verbs[0], 0, 'x')
+    many.define_many(sentences[:20])
+    many.define_many(iter(sentences[20:]))
+    assert(dict(one.sentences) == dict(many.sentences))
+    assert(all(type(many.sentences[v]) is type(one.sentences[v]) for v in verbs))
+    few = Platon()
+    few.define_many([(verbs[0], 1), (verbs[0], 2), (verbs[0], 1)])
+    assert(few.sentences[verbs[0]] == ((1,), (2,)))
@@ -1,13 +1,15 @@
-import pytest, pytest_asyncio, json
-from objfs.platon_id import PlatonID
+import pytest, pytest_asyncio, json, copy, pickle
+import numpy as np
+from objfs.platon_id import PlatonID, encode_many, decode_many
 
 
 def test_platon_id_size():
     assert(PlatonID.size(bytes([0b00001111])) == 1), f"1 byte"
     assert(PlatonID.size(bytes([0b10001111])) == 2), f"2 byte"
     assert(PlatonID.size(bytes([0b10111111])) == 4), f"4 byte"
-    assert(PlatonID.size(bytes([0b11101111])) == 8), f"2 byte"
-    assert(PlatonID.size(bytes([0b11110111])) == 0), f"2 byte"
+    assert(PlatonID.size(bytes([0b11001111])) == 8), f"8 byte"
+    assert(PlatonID.size(bytes([0b11101111])) == 16), f"16 byte"
+    assert(PlatonID.size(bytes([0b11110111])) == 0), f"reserved"
     assert(PlatonID.size(bytes([0x80,2])) == 2), f"2 byte"
 
 
@@ -22,6 +24,39 @@ def test_platon_id_int():
     assert(str(PlatonID(125)) == '8000')
     assert(PlatonID.to_int(PlatonID(b'\xa0\x00\x00\x00').id) == 8317)
     assert(str(PlatonID(8316)) == '9fff')
+    assert(PlatonID.from_int(8317) == b'\xa0\x00\x00\x00')
+    assert(PlatonID.from_int(-2) == PlatonID.PARENT)
+
+
+def test_platon_id_tiers():
+    for size, prefix, bits, offset in PlatonID.TIERS:
+        for i in (offset, offset + (1<<bits) - 1):
+            b = PlatonID.from_int(i)
+            assert(len(b) == PlatonID.size(b) == size), f"{i} {b.hex()}"
+            assert(PlatonID.to_int(b) == i)
+    assert(PlatonID.from_int(125 + (1<<13) + (1<<29)) == b'\xc0' + bytes(7))
+    assert(PlatonID.from_int(125 + (1<<13) + (1<<29) + (1<<61)) == b'\xe0' + bytes(15))
+    with pytest.raises(OverflowError):
+        PlatonID.from_int(offset + (1<<bits))
+
+
+def test_platon_id_encode_many():
+    ints = [-3, -2, -1, 0, 124, 125, 8316, 8317, 536879228, 536879229, 2**62, 2**63-1]
+    buf = encode_many(np.array(ints))
+    assert(buf == b''.join(map(PlatonID.from_int, ints)))
+    assert(decode_many(buf).tolist() == ints)
+    assert(encode_many(np.array([2**64-1], np.uint64)) == PlatonID.from_int(2**64-1))
+    assert(encode_many([]) == b'' and len(decode_many(b'')) == 0)
+    rnd = np.random.default_rng(1).integers(-3, 2**62, 1000) >> np.random.default_rng(2).integers(0, 62, 1000)
+    assert(decode_many(encode_many(rnd)).tolist() == rnd.tolist())
+
+
+def test_platon_id_decode_many_invalid():
+    for buf in [b'\x80', b'\x01\xa0\x00', b'\xf0', PlatonID.from_int(2**64-1)]:
+        with pytest.raises((ValueError, OverflowError)):
+            decode_many(buf)
+    with pytest.raises(TypeError):
+        encode_many([1.5])
     
 
 def test_platon_id_split():
@@ -47,9 +82,69 @@ def test_platon_id_str():
     assert(str(PlatonID('f', '..', 'a', 'b_c', 13, 14, 15, PlatonID.PARENT, '.._.._f', bytes([0x80,2]), bytearray(b'\xa0\x10\x20\x30'))) == 'a_b_c_f_8002_a0102030')
 
 
+def test_platon_id_parts():
+    id = PlatonID('a_8002_.._c_a0102030')
+    assert(list(PlatonID.part_offsets(id.id)) == [(0, 1), (1, 2), (2, 6)])
+    assert([bytes(p) for p in id.parts()] == [b'\x0a', b'\x0c', b'\xa0\x10\x20\x30'])
+    assert(isinstance(next(id.parts()), memoryview))
+    assert([PlatonID.to_int(id.id, i) for i, _ in PlatonID.part_offsets(id.id)] == [9, 11, 0x102030 + 8317])
+    assert(list(PlatonID('.._1_10').hex_parts()) == ['..', '1', '10'] and str(PlatonID(None)) == '0')
+    with pytest.raises(ValueError):
+        PlatonID(b'\x01\xf0\x01')
+
+
+def test_platon_id_normalize():
+    assert(PlatonID.normalize([b'\x0b', PlatonID.PARENT, PlatonID.PARENT, PlatonID.CURRENT, b'\x0c']) == b'\x7f\x0c')
+    assert(PlatonID.normalize([b'\x0b', PlatonID.PARENT]) == PlatonID.CURRENT)
+    assert(str(PlatonID('a_.')) == 'a')
+    with pytest.raises(ValueError):
+        PlatonID('a_0')
+    deep = PlatonID(*range(10000), *['..']*9999)
+    assert(deep == 0)
+
+
+def test_platon_id_trusted():
+    a = PlatonID('.._a_b')
+    assert(PlatonID.from_trusted(a.id) == a)
+    assert(a / 'c' == '.._a_b_c')
+    assert(a / 12 == '.._a_b_d')
+    assert(a / PlatonID('.._c') == '.._a_c')
+    assert(PlatonID('.') / 'a' == 'a')
+    assert(PlatonID('a_b_c').split()[1].id == PlatonID('b_c').id)
+    tail = PlatonID('a_b_c').split()[1]
+    assert(isinstance(tail.id, memoryview) and tail.split() == (10, 'c') and tail / 'd' == 'b_c_d')
+    assert(hash(tail) == hash(PlatonID('b_c')) and {PlatonID('b_c'): 1}[tail] == 1)
+
+
 def test_platon_id_eq():
     assert(PlatonID('.._a_b') == '.._a_b')
     assert(PlatonID('a') == 9)
     assert(PlatonID('8002') == b'\x80\x02')
     assert(PlatonID('a_d') == PlatonID('a_c_.._d'))
+
+
+def test_platon_id_copy():
+    a = PlatonID('.._a_8002')
+    assert(copy.copy(a) is a and copy.deepcopy([a])[0] is a)
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        b = pickle.loads(pickle.dumps(a, protocol))
+        assert(b == a and type(b.id) is bytes)
     
+
+
+def test_platon_id_intern():
+    assert(PlatonID.intern('a') is not PlatonID.intern('a'))
+    table = PlatonID.set_interning(2)
+    try:
+        a = PlatonID.intern('a')
+        assert(PlatonID.intern('a') is a and PlatonID.intern(a) is a)
+        assert(PlatonID.intern(9) is not a and PlatonID.intern(9) == a)
+        assert(PlatonID.intern(True) == 1 and PlatonID.intern(1) is not PlatonID.intern(True))
+        assert(PlatonID('a_b') == 'a_b' and PlatonID('8002') == bytearray(b'\x80\x02'))
+        assert(len(table) == 2 and table.hits == 4)
+        assert(PlatonID.intern('a') is not a) # evicted
+        with pytest.raises(AttributeError):
+            a.id = b'\x01'
+    finally:
+        PlatonID.set_interning(0)
+    assert(PlatonID.interned is None)
@@ -0,0 +1,71 @@
+import pytest
+import numpy as np
+from objfs.platon_id import PlatonID
+from objfs.platon_id_array import PlatonIDArray, PlatonIDIndex
+
+
+def test_platon_id_array_basic():
+    arr = PlatonIDArray(['a', 'a_b', PlatonID(126), b'\x80\x02'])
+    assert(len(arr) == 4 and arr.sorted)
+    assert(arr[1] == 'a_b' and arr[-1] == '8002')
+    assert([bytes(mv) for mv in arr] == [PlatonID(x).id for x in ['a', 'a_b', 126, '8002']])
+    assert('a_b' in arr and PlatonID('b') not in arr)
+    arr.append('1')
+    assert(not arr.sorted and '1' in arr)
+    with pytest.raises(ValueError):
+        arr.append(None)
+
+
+def test_platon_id_array_sort():
+    ints = np.random.default_rng(0).integers(0, 2**40, 2000) >> np.random.default_rng(1).integers(0, 40, 2000)
+    arr = PlatonIDArray.from_ints(ints)
+    assert(arr[5] == int(ints[5]))
+    arr.sort()
+    assert([PlatonID.to_int(arr.raw(i)) for i in range(len(arr))] == sorted(ints.tolist()))
+    assert(arr.index(int(ints[7])) == sorted(ints.tolist()).index(ints[7]))
+    assert(int(ints[9]) in arr and 2**41 not in arr)
+    paths = PlatonIDArray(['b', 'a_c', 'a', 'a_b_c', '8002', 'a']).sort(unique=True)
+    assert([str(id) for id in paths[:]] == ['a', 'a_b_c', 'a_c', 'b', '8002'])
+
+
+def test_platon_id_array_setops():
+    a = PlatonIDArray(['a', 'b', 'c_d', 'e']).sort()
+    b = PlatonIDArray(['b', 'c_d', 'f', '8002']).sort()
+    assert([str(x) for x in (a | b)[:]] == ['a', 'b', 'c_d', 'e', 'f', '8002'])
+    assert([str(x) for x in (a & b)[:]] == ['b', 'c_d'])
+    assert([str(x) for x in (a - b)[:]] == ['a', 'e'])
+    assert([str(x) for x in a.merge(b)[:]] == ['a', 'b', 'b', 'c_d', 'c_d', 'e', 'f', '8002'])
+    assert(len(a & PlatonIDArray()) == 0 and (a | PlatonIDArray()) == a)
+    assert(a.nbytes < 100)
+
+
+def test_platon_id_array_trailing_zero():
+    a = PlatonIDArray([PlatonID(125), 'a_8000', 'a']).sort()
+    b = PlatonIDArray([PlatonID(125, 125), PlatonID(125)]).sort()
+    assert([str(x) for x in a[:]] == ['a', 'a_8000', '8000'])
+    assert([str(x) for x in (a | b)[:]] == ['a', 'a_8000', '8000', '8000_8000'])
+    assert([str(x) for x in (a & b)[:]] == ['8000'])
+    assert([str(x) for x in (b - a)[:]] == ['8000_8000'])
+
+
+def test_platon_id_index():
+    idx = PlatonIDIndex(['a', 'a_b', 'a_b_c', 'a_8000_1', 'a_c', 'b', '1a', 'a_b_.._d'])
+    idx.add('a_c_e')
+    idx.add(PlatonID(125, 1))
+    assert(len(idx) == 10 and 'a_d' in idx)
+    assert([str(x) for x in idx.descendants('a')] == ['a_b', 'a_b_c', 'a_c', 'a_c_e', 'a_d', 'a_8000_1'])
+    assert([str(x) for x in idx.children('a')] == ['a_b', 'a_c', 'a_d', 'a_8000'])
+    assert([str(x) for x in idx.children('.')] == ['a', 'b', '1a', '8000'])
+    assert(idx.count('a') == 6 and idx.count('a_b') == 1 and idx.count('b') == 0 and idx.count('c') == 0)
+    assert(idx.count('.') == 10 and idx.count(None) == 10)
+    assert([str(x) for x in idx.descendants('8000')] == ['8000_2'])
+
+
+def test_platon_id_array_split_tail():
+    _, tail = PlatonID('1', 'a', 'b').split()
+    _, a = PlatonID('1', 'a').split()
+    arr = PlatonIDArray(['a'])
+    arr.append(tail)
+    assert(arr.sorted and arr[-1] == 'a_b' and tail in arr)
+    idx = PlatonIDIndex(['a', 'a_b', 'a_c'])
+    assert(idx.count(a) == 2 and idx.count(tail) == 0)
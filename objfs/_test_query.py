@@ -0,0 +1,61 @@
+import pytest
+from objfs.platon import Platon
+from objfs.triple_index import TripleIndex
+from objfs.query import Query, Var
+
+
+@pytest.fixture
+def world():
+    Platon.index = TripleIndex()
+    isa, photo, video, comment, author, date = (Platon() for _ in range(6))
+    bob, sally = Platon(), Platon()
+    pics = [Platon() for _ in range(20)]
+    for i, pic in enumerate(pics):
+        pic.define(isa, video if i % 5 == 0 else photo)
+        pic.define(date, 2000 + i)
+        c = Platon()
+        c.define(author, bob if i % 2 else sally)
+        pic.define(comment, c)
+    yield locals()
+    Platon.index = None
+
+
+def test_query_join(world):
+    w = world
+    p, c, d = Var('p'), Var('c'), Var('d')
+    q = Query((c, w['author'], w['bob']), (p, w['comment'], c), (p, w['isa'], w['photo']), (p, w['date'], d))
+    rows = list(q.where(d, lambda year: year < 2010))
+    expect = [pic for i, pic in enumerate(w['pics']) if i % 2 and i % 5 and i < 10]
+    assert(sorted((row[p] for row in rows), key=id) == sorted(expect, key=id))
+    assert(all(len(row) == 3 for row in rows))
+    plan = q.plan()
+    assert(plan[0][0][0] == c or plan[0][0][1] is w['isa'])
+    assert(all(probe for _, _, probe in plan[1:]))
+
+
+def test_query_unbound(world):
+    w = world
+    s, v, o = Var('s'), Var('v'), Var('o')
+    assert(len(list(Query((s, v, o)))) == 80)
+    assert(len(list(Query((w['pics'][0], v, o)))) == 3)
+    assert(len(list(Query((s, w['isa'], o), (s, w['isa'], w['video'])))) == 4)
+    x = Var('x')
+    w['bob'].define(w['author'], w['bob'])
+    assert([row[x] for row in Query((x, w['author'], x))] == [w['bob']])
+
+
+def test_query_hash_join(world):
+    w = world
+    p, q, t = Var('p'), Var('q'), Var('t')
+    rows = list(Query((p, w['isa'], t), (q, w['isa'], t)))
+    assert(len(rows) == 16 * 16 + 4 * 4)
+    Platon.index = None
+    with pytest.raises(ValueError):
+        list(Query((p, w['isa'], t)))
+
+
+def test_query_literal_subject(world):
+    w = world
+    p, d, x = Var('p'), Var('d'), Var('x')
+    assert(list(Query((p, w['date'], d), (d, w['author'], x))) == [])
+    assert(list(Query((2000, w['date'], x))) == [])
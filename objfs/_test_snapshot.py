@@ -0,0 +1,66 @@
+import gc, threading
+import pytest
+from objfs.kvfs import Filesystem, KVStore
+from objfs.db import DB
+from objfs.object_store import ObjectStore
+from objfs.platon import Platon
+from objfs.platon_id import PlatonID
+from objfs.snapshot import Versions
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ObjectStore(Filesystem(KVStore(id='test', base=str(tmp_path))))
+
+
+def test_snapshot_versions(store):
+    db = DB()
+    with pytest.raises(LookupError):
+        db.snapshot()
+    db.namespace[0] = verb = Platon()
+    db.namespace[1], db.namespace[2] = Platon(), Platon()
+    db.lookup(PlatonID(1)).define(verb, 'one')
+    db.lookup(PlatonID(2)).define(verb, 'two')
+    first = db.commit(store)
+    old = db.snapshot()
+    db.lookup(PlatonID(1)).define(verb, 'uno')
+    db.commit(store)
+    new = db.snapshot()
+    assert(list(old.each(PlatonID(1), verb)) == [('one',)] and set(new.each(PlatonID(1), verb)) == {('one',), ('uno',)})
+    # The unchanged subtree is decoded once and shared
+    assert(old.lookup(PlatonID(2)) is new.lookup(PlatonID(2)) and old.lookup(PlatonID(1)) is not new.lookup(PlatonID(1)))
+    assert(sorted(new.root.namespace) == [0, 1, 2] and db.versions.snapshot() is new)
+    nodes = len(db.versions.nodes)
+    del old
+    gc.collect()
+    assert(len(db.versions.nodes) == nodes - 2) # The old root and 1
+    # Another reader can open any commit from the store
+    other = Versions(ObjectStore(store.bridge))
+    other.publish(first)
+    assert(list(other.snapshot().each(PlatonID(2), verb)) == [('two',)])
+
+
+def test_snapshot_concurrent(store):
+    db = DB()
+    db.namespace[0] = verb = Platon()
+    db.namespace[1], db.namespace[2] = a, b = Platon(), Platon()
+    a.sentences[verb] = (0,),
+    b.sentences[verb] = (0,),
+    db.commit(store)
+    done, seen = False, []
+    def reader():
+        while not done:
+            snap = db.snapshot()
+            [(x,)] = snap.each(PlatonID(1), verb)
+            [(y,)] = snap.each(PlatonID(2), verb)
+            seen.append(x == y)
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    for t in readers: t.start()
+    for n in range(1, 20):
+        a.sentences[verb] = (n,),
+        b.sentences[verb] = (n,),
+        db.commit(store)
+    done = True
+    for t in readers: t.join()
+    assert(seen and all(seen))
+    assert(list(db.snapshot().each(PlatonID(1), verb)) == [(19,)])
@@ -0,0 +1,102 @@
+import pytest
+from objfs.kvfs import Filesystem, KVStore
+from objfs.commit import Commit
+from objfs.object_store import ObjectStore
+from objfs.platon import Platon
+from objfs.platon_id import PlatonID
+from objfs.sync import Bloom, Sender, Receiver, sync
+
+
+def _bridge(path):
+    return Filesystem(KVStore(id='test', base=str(path)))
+
+
+def _commit(store, world, parents=()):
+    return store.put_commit(Commit(store.put_tree(world), parents))
+
+
+def test_sync_bloom():
+    digests = [bytes([i % 256, i // 256]) * 16 for i in range(2000)]
+    bloom = Bloom(1000)
+    for digest in digests[:1000]: bloom.add(digest)
+    bloom = Bloom.decode(bloom.encode())
+    assert(all(digest in bloom for digest in digests[:1000]))
+    assert(sum(digest in bloom for digest in digests[1000:]) < 50)
+
+
+def test_sync_incremental(tmp_path):
+    ours, theirs, wire = ObjectStore(_bridge(tmp_path / 'a')), ObjectStore(_bridge(tmp_path / 'b')), _bridge(tmp_path / 'wire')
+    world = Platon()
+    world.namespace[0] = verb = Platon()
+    for g in range(10):
+        world.namespace[g + 1] = group = Platon()
+        for i in range(10):
+            group.namespace[i] = node = Platon()
+            node.define(verb, g, i)
+    first = _commit(ours, world)
+    sender, receiver = Sender(ours, wire, [first]), Receiver(theirs, wire)
+    assert(sync(sender, receiver) == 1)
+    assert(receiver.heads == [first] and len(theirs) == len(ours) == sender.sent and first in theirs.graph)
+    world.lookup(PlatonID(3, 3)).define(verb, 'new')
+    second = _commit(ours, world, [first])
+    sender, receiver = Sender(ours, wire, [second], session='next'), Receiver(theirs, wire, session='next')
+    assert(sync(sender, receiver, [first]) == 1)
+    # The commit, the root, group 3 and node 3.3
+    assert(sender.sent == 4 and len(theirs) == len(ours) and theirs.graph.parents_of(second) == [first])
+    copy = theirs.get_tree(theirs.graph.tree(second))
+    assert(set(copy.lookup(PlatonID(3, 3)).each(copy.lookup(PlatonID(0)))) == {(2, 3), ('new',)})
+    assert(not [p for p in (tmp_path / 'wire').rglob('*') if p.is_file()])
+
+
+def test_sync_false_positives(tmp_path):
+    ours, theirs, wire = ObjectStore(_bridge(tmp_path / 'a')), ObjectStore(_bridge(tmp_path / 'b')), _bridge(tmp_path / 'wire')
+    world = Platon()
+    world.namespace[0] = verb = Platon()
+    for g in range(10):
+        world.namespace[g + 1] = group = Platon()
+        for i in range(10):
+            group.namespace[i] = node = Platon()
+            node.define(verb, g, i)
+    first = _commit(ours, world)
+    sync(Sender(ours, wire, [first]), Receiver(theirs, wire))
+    for g in range(10): world.lookup(PlatonID(g + 1, g)).define(verb, 'changed')
+    second = _commit(ours, world, [first])
+    # A filter of one bit per object has plenty of false positives, which take extra rounds
+    receiver = Receiver(theirs, wire, bits_per_item=1)
+    rounds = sync(Sender(ours, wire, [second], batch_size=64), receiver)
+    assert(rounds > 1 and len(theirs) == len(ours) and receiver.heads == [second])
+    assert(ObjectStore(theirs.bridge).graph.generation(second) == 2)
+
+
+def test_sync_interrupted(tmp_path, monkeypatch):
+    ours, theirs, wire = ObjectStore(_bridge(tmp_path / 'a')), ObjectStore(_bridge(tmp_path / 'b')), _bridge(tmp_path / 'wire')
+    world = Platon()
+    world.namespace[0] = verb = Platon()
+    for g in range(10):
+        world.namespace[g + 1] = group = Platon()
+        for i in range(10):
+            group.namespace[i] = node = Platon()
+            node.define(verb, g, i)
+    first = _commit(ours, world)
+    sync(Sender(ours, wire, [first]), Receiver(theirs, wire))
+    for g in range(10): world.lookup(PlatonID(g + 1, g)).define(verb, 'changed')
+    second = _commit(ours, world, [first])
+    # The connection drops after the first batch: nothing of the session is stored
+    sender, receiver = Sender(ours, wire, [second], session='cut', batch_size=64), Receiver(theirs, wire, session='cut')
+    receiver.request([first])
+    sender.serve()
+    read = wire.read
+    def cut(key, **kwargs):
+        if key.endswith('batch-0-1'): raise ConnectionError(key)
+        return read(key, **kwargs)
+    monkeypatch.setattr(wire, 'read', cut)
+    before = len(theirs)
+    with pytest.raises(ConnectionError):
+        receiver.receive()
+    assert(receiver.received and len(theirs) == before)
+    # What did arrive is written to the store but not published
+    staged = next(iter(receiver.staged))
+    assert(staged not in theirs and theirs.get(staged)[0] in (b'commit', b'tree', b'blob'))
+    monkeypatch.undo()
+    assert(sync(Sender(ours, wire, [second]), Receiver(theirs, wire), [first]) == 1)
+    assert(len(theirs) == len(ours) and theirs.graph.generation(second) == 2)
@@ -0,0 +1,44 @@
+import pytest
+from objfs.platon import Platon
+from objfs.triple_index import TripleIndex
+
+
+@pytest.fixture
+def index():
+    Platon.index = TripleIndex()
+    yield Platon.index
+    Platon.index = None
+
+
+def test_triple_index_define(index):
+    isa, comment, photo, bob, pic, pic2 = (Platon() for _ in range(6))
+    pic.define(isa, photo)
+    pic2.define(isa, photo)
+    pic.define(comment, bob, 'nice')
+    bob.define(isa, photo)
+    assert(index.subjects(isa, photo) == {pic, pic2, bob})
+    assert(index.subjects(comment, bob, 'nice') == {pic})
+    assert(index.subjects(comment, bob) == set())
+    assert(index.verbs(pic, photo) == {isa})
+    assert(index.objects(pic, comment) == {(bob, 'nice')})
+    assert(len(index) == 4)
+
+
+def test_triple_index_load():
+    isa, photo, a, b = (Platon() for _ in range(4))
+    a.define(isa, photo)
+    b.define(isa, photo, 1)
+    loaded = TripleIndex().load_platons([a, b])
+    assert(loaded.subjects(isa, photo) == {a} and loaded.subjects(isa, photo, 1) == {b})
+    loaded.load([(b, isa, photo)])
+    assert(loaded.subjects(isa, photo) == {a, b} and loaded.verbs(b, photo) == {isa})
+
+
+def test_triple_index_grouped(index):
+    isa, photo, video, a, b = (Platon() for _ in range(5))
+    a.define_many({isa: iter([(photo,), (video,)])})
+    b.define_many([(isa, photo), (isa, photo)])
+    assert(len(index.pending) == 2)
+    assert(index.subjects(isa, photo) == {a, b} and index.verbs(a, video) == {isa})
+    assert(not index.pending and len(index) == 3)
+    assert(set(a.each(isa)) == {(photo,), (video,)})
@@ -0,0 +1,32 @@
+import pytest
+from objfs.platon import Platon
+from objfs.triple_store import TripleStore
+
+
+def test_triple_store_platon():
+    store = TripleStore()
+    isa, comment, photo, bob = (Platon() for _ in range(4))
+    pic = Platon()
+    pic.define(isa, photo)
+    store.attach(pic)
+    pic.define(comment, bob, 'nice')
+    pic.define(comment, bob, 'nice')
+    pic.define(comment, bob, 'meh')
+    assert(sorted(pic.each(comment)) == [(bob, 'meh'), (bob, 'nice')])
+    assert(list(pic.each(isa)) == [(photo,)] and list(pic.each(bob)) == [])
+    assert(sorted(pic, key=str) == sorted([(isa, photo), (comment, bob, 'nice'), (comment, bob, 'meh')], key=str))
+    assert(len(pic.sentences) == 2 and comment in pic.sentences and photo not in pic.sentences)
+    assert(len(store) == 3)
+
+
+def test_triple_store_scan():
+    store = TripleStore()
+    isa, photo, video = Platon(), Platon(), Platon()
+    subjects = [Platon() for _ in range(100)]
+    store.load((s, isa, photo if i % 3 else video) for i, s in enumerate(subjects))
+    store.load([(subjects[0], isa, video)])
+    assert(store.count(isa) == 100 and store.count(isa, video) == 34 and store.count(photo) == 0)
+    assert(set(store.subjects_of(isa, video)) == set(subjects[::3]))
+    assert(list(subjects[1].each(isa)) == [(photo,)])
+    assert(sorted(subjects[0], key=id) == sorted([(isa, video)], key=id))
+    assert(sum(1 for _ in store) == 100)
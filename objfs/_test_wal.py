@@ -0,0 +1,108 @@
+import os, pytest, threading
+from objfs.db import DB
+from objfs.kvfs import Filesystem, KVStore
+from objfs.object_store import ObjectStore
+from objfs.platon import Platon
+from objfs.platon_id import PlatonID
+from objfs.wal import WAL
+
+
+def test_wal_replay(tmp_path):
+    wal = WAL(tmp_path, segment_size=100)
+    for i in range(20): wal.append(b'record %d' % i)
+    assert(len(wal.segments()) > 1)
+    wal.close()
+    last = tmp_path / f'{wal.segment}.wal'
+    last.write_bytes(last.read_bytes() + b'\x40\x00\x00\x00torn')
+    assert(list(WAL(tmp_path).replay()) == [b'record %d' % i for i in range(20)])
+    wal = WAL(tmp_path)
+    wal.append(b'more')
+    wal.checkpoint('state')
+    wal.append(b'after')
+    assert(list(WAL(tmp_path).replay()) == [b'after'] and wal.state() == 'state')
+
+
+def test_wal_torn_append(tmp_path):
+    wal = WAL(tmp_path)
+    wal.append(b'one')
+    wal.append(b'two')
+    wal.close()
+    last = tmp_path / f'{wal.segment}.wal'
+    last.write_bytes(last.read_bytes()[:-1])
+    wal = WAL(tmp_path)
+    wal.append(b'three')
+    wal.close()
+    assert(list(WAL(tmp_path).replay()) == [b'one', b'three'])
+
+
+def test_wal_group_commit(tmp_path):
+    wal = WAL(tmp_path)
+    def writer(n):
+        for i in range(50): wal.append(b'%d.%d' % (n, i))
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    records = list(WAL(tmp_path).replay())
+    assert(len(records) == 400 and len(set(records)) == 400)
+    assert(wal.fsyncs <= 400)
+
+
+def test_wal_db(tmp_path):
+    store = ObjectStore(Filesystem(KVStore(id='test', base=str(tmp_path / 'objects'))))
+    db = DB(WAL(tmp_path / 'wal'))
+    verb = Platon()
+    with db.transaction() as tx:
+        tx.insert(db, 0, verb)
+        tx.insert(db, 1)
+        tx.define(PlatonID(1), verb, 'hello', 1)
+    db.checkpoint(store)
+    with db.transaction() as tx:
+        tx.insert(PlatonID(1), 5)
+        tx.define(PlatonID(1, 5), verb, db.lookup(PlatonID(1)))
+    head = db.commit(store, message='first')
+    with pytest.raises(KeyError):
+        db.apply([('insert', db, 2, None), ('define', PlatonID(9), verb)])
+    db.wal.close()
+    back = DB.open(WAL(tmp_path / 'wal'), store)
+    verb = back.lookup(PlatonID(0))
+    assert(list(back.lookup(PlatonID(1)).each(verb)) == [('hello', 1)])
+    assert(list(back.lookup(PlatonID(1, 5))) == [(verb, back.lookup(PlatonID(1)))])
+    assert(back.head == head and store.get_commit(head).message == 'first')
+    assert(sorted(back.namespace) == [0, 1, 2])
+
+
+def test_wal_db_detached(tmp_path):
+    db = DB(WAL(tmp_path))
+    verb, child, grandchild = Platon(), Platon(), Platon()
+    child.namespace[3] = grandchild
+    grandchild.define(verb, 'deep', child)
+    db.apply([('insert', db, 0, verb), ('insert', db, 1, child), ('define', PlatonID(1), verb, grandchild)])
+    bad = Platon()
+    bad.define(verb, 1.5)
+    with pytest.raises(TypeError):
+        db.apply([('insert', db, 2, bad)])
+    assert(2 not in db.namespace and bad.parent is None)
+    with pytest.raises(ValueError):
+        db.apply([('define', PlatonID(1), Platon(), 'x')])
+    db.wal.close()
+    back = DB.open(WAL(tmp_path))
+    verb, child, grandchild = back.lookup(PlatonID(0)), back.lookup(PlatonID(1)), back.lookup(PlatonID(1, 3))
+    assert(verb is not back and not verb.namespace and list(verb) == [])
+    assert(list(grandchild) == [(verb, 'deep', child)] and list(child) == [(verb, grandchild)])
+    assert(sorted(back.namespace) == [0, 1])
+
+
+def test_wal_failed_group(tmp_path, monkeypatch):
+    wal = WAL(tmp_path)
+    wal.append(b'before')
+    first, second = wal.enqueue(b'lost'), wal.enqueue(b'lost too')
+    def fail(fd): raise OSError('disk gone')
+    monkeypatch.setattr(os, 'fsync', fail)
+    with pytest.raises(OSError):
+        wal.wait(first)
+    with pytest.raises(OSError):
+        wal.wait(second)
+    monkeypatch.undo()
+    wal.append(b'after')
+    wal.close()
+    assert(list(WAL(tmp_path).replay())[-1] == b'after')
@@ -0,0 +1,111 @@
+class Closure():
+    ''' The materialized transitive closure of one verb, such as ISA in "UTF8 isa String".
+
+    Only single object sentences are edges: ``subject.define(verb, object)`` means subject -> object.
+    Every term gets a dense number and keeps two bitsets (bytearrays): the numbers of its ancestors and of its descendants.
+    `reaches` is then one byte lookup and bit test, O(1), and adding an edge only rewrites the bitsets that gain bits.
+    The price is memory: up to n bits per term in each direction, O(n²) bits for n terms in a dense hierarchy.
+
+    `install` registers the closure with `Platon.define` so that it stays up to date.
+    '''
+    def __init__(self, verb):
+        self.verb = verb
+        self.ids = {} # {term: number}
+        self.terms = []
+        self.up = [] # ancestor bits of each number
+        self.down = [] # descendant bits of each number
+
+
+    def __len__(self):
+        return len(self.terms)
+
+
+    def install(self):
+        Platon.closures = {**(Platon.closures or {}), self.verb: self}
+        return self
+
+
+    def uninstall(self):
+        if Platon.closures and Platon.closures.get(self.verb) is self:
+            Platon.closures = {k:v for k, v in Platon.closures.items() if v is not self} or None
+
+
+    def load(self, platons):
+        ''' Add the edges that `platons` already define.
+        '''
+        for platon in platons:
+            for objects in platon.each(self.verb): self.add(platon, objects)
+        return self
+
+
+    def number(self, term):
+        if (i := self.ids.get(term)) is None:
+            i = self.ids[term] = len(self.terms)
+            self.terms.append(term)
+            self.up.append(bytearray())
+            self.down.append(bytearray())
+        return i
+
+
+    def add(self, subject, objects):
+        ''' Add the edge subject -> objects[0].
+        '''
+        if len(objects) != 1: return
+        s, o = self.number(subject), self.number(objects[0])
+        up, down = self.up, self.down
+        if _test(up[s], o): return
+        above, below = _int(up[o]) | (1 << o), _int(down[s]) | (1 << s)
+        for i in _bits(below): _union(up[i], above)
+        for i in _bits(above): _union(down[i], below)
+
+
+    def reaches(self, sub, sup):
+        ''' Is there a path of one or more edges from `sub` to `sup`?
+        '''
+        if (s := self.ids.get(sub)) is None or (o := self.ids.get(sup)) is None: return False
+        return _test(self.up[s], o)
+
+
+    def is_a(self, sub, sup):
+        return sub is sup or self.reaches(sub, sup)
+
+
+    def ancestors(self, term):
+        if (i := self.ids.get(term)) is None: return
+        terms = self.terms
+        for j in _bits(_int(self.up[i])): yield terms[j]
+
+
+    def descendants(self, term):
+        if (i := self.ids.get(term)) is None: return
+        terms = self.terms
+        for j in _bits(_int(self.down[i])): yield terms[j]
+
+
+
+def _test(bits, i):
+    return (i >> 3) < len(bits) and bool(bits[i >> 3] & (1 << (i & 7)))
+
+
+def _int(bits):
+    return int.from_bytes(bits, 'little')
+
+
+def _union(bits, mask):
+    ''' bits |= mask, where mask is an int.  Returns whether any bit was added, and leaves `bits` alone if not.
+    '''
+    old = _int(bits)
+    if (merged := old | mask) == old: return False
+    bits[:] = merged.to_bytes(max(len(bits), (merged.bit_length() + 7) >> 3), 'little')
+    return True
+
+
+def _bits(n):
+    while n:
+        low = n & -n
+        yield low.bit_length() - 1
+        n ^= low
+
+
+
+from .platon import Platon
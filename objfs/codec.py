@@ -0,0 +1,213 @@
+''' The binary encoding of sentence terms and `Platon` nodes.
+
+A node record is ``[varint n][namespace section of n bytes][sentences section]`` so that the
+namespace can be decoded without touching the sentences.
+
+========= ==================================================
+Section   Layout
+========= ==================================================
+namespace varint count, then the keys as varints (sorted)
+sentences varint verbs, then per verb: term, varint count, then per objects tuple: varint arity, terms
+========= ==================================================
+
+Terms are tagged with one byte:
+
+=== ===================================================
+Tag Term
+=== ===================================================
+N   None
+T/F True/False
+I   int (zig-zag varint)
+S   str (varint length, utf8)
+B   bytes (varint length)
+D   `PlatonID` (varint length, id)
+P   `Platon` reference by `Platon.path` (varint length, id)
+=== ===================================================
+
+A Platon reference is a path from the root of its hierarchy, like a symbolic link: moving the referenced platon
+after it was encoded leaves the reference pointing at whatever is at the old path now, and nothing detects that.
+A platon that is in no hierarchy has no path, so encoding it raises `ValueError` unless it is the `root` being encoded.
+'''
+
+
+def write_varint(out, n):
+    while n > 0x7f:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def read_varint(buf, i):
+    n = shift = 0
+    while True:
+        b = buf[i]
+        i += 1
+        n |= (b & 0x7f) << shift
+        if b < 0x80: return n, i
+        shift += 7
+
+
+def write_term(out, term, root=None):
+    ''' Append the encoding of `term`.  `root` is the root of the hierarchy that is being encoded, if any.
+    '''
+    if term is None: out += b'N'
+    elif term is True: out += b'T'
+    elif term is False: out += b'F'
+    elif isinstance(term, int):
+        out += b'I'
+        write_varint(out, term << 1 if term >= 0 else (-term << 1) - 1)
+    elif isinstance(term, str):
+        data = term.encode('utf8')
+        out += b'S'
+        write_varint(out, len(data))
+        out += data
+    elif isinstance(term, (bytes, bytearray)):
+        out += b'B'
+        write_varint(out, len(term))
+        out += term
+    elif isinstance(term, PlatonID):
+        out += b'D'
+        write_varint(out, len(term.id))
+        out += term.id
+    elif isinstance(term, Platon):
+        if term.parent is None and term is not root: raise ValueError(f"{term!r} is not in a hierarchy, so it has no path to encode")
+        id = term.path().id
+        out += b'P'
+        write_varint(out, len(id))
+        out += id
+    else:
+        raise TypeError(f"Can not encode {term!r}")
+
+
+def read_term(buf, i, resolve=None):
+    ''' Decode the term at `i`.  `resolve` turns a Platon reference (a `PlatonID`) back into a `Platon`.
+    '''
+    tag = buf[i]
+    i += 1
+    if tag == 78: return None, i # N
+    if tag == 84: return True, i # T
+    if tag == 70: return False, i # F
+    n, i = read_varint(buf, i)
+    if tag == 73: return (n >> 1 if not n & 1 else -((n + 1) >> 1)), i # I
+    data = bytes(buf[i:i+n])
+    if tag == 83: return data.decode('utf8'), i+n # S
+    if tag == 66: return data, i+n # B
+    if tag == 68: return PlatonID.from_trusted(data), i+n # D
+    if tag == 80: # P
+        id = PlatonID.from_trusted(data)
+        return (resolve(id) if resolve else id), i+n
+    raise ValueError(f"Invalid term tag {tag!r}")
+
+
+def encode_sentences(out, sentences, canonical=False, root=None):
+    ''' `canonical` sorts the verbs and objects by their encoding so that equal sentences always encode to the same bytes.
+    '''
+    items = list(sentences.items()) if sentences else []
+    write_varint(out, len(items))
+    if canonical:
+        groups = []
+        for verb, objects in items:
+            write_term(head := bytearray(), verb, root)
+            groups.append((bytes(head), sorted(encode_objects(bytearray(), objs, root) for objs in objects)))
+        for head, objects in sorted(groups):
+            out += head
+            write_varint(out, len(objects))
+            for objs in objects: out += objs
+        return
+    for verb, objects in items:
+        write_term(out, verb, root)
+        objects = list(objects)
+        write_varint(out, len(objects))
+        for objs in objects: encode_objects(out, objs, root)
+
+
+def encode_objects(out, objs, root=None):
+    write_varint(out, len(objs))
+    for term in objs: write_term(out, term, root)
+    return out
+
+
+def decode_sentences(buf, i=0, resolve=None):
+    sentences = Sentences()
+    nverbs, i = read_varint(buf, i)
+    for _ in range(nverbs):
+        verb, i = read_term(buf, i, resolve)
+        count, i = read_varint(buf, i)
+        for _ in range(count):
+            arity, i = read_varint(buf, i)
+            objs = []
+            for _ in range(arity):
+                term, i = read_term(buf, i, resolve)
+                objs.append(term)
+            sentences.add(verb, tuple(objs))
+    return sentences
+
+
+def skip_term(buf, i):
+    ''' The offset of the term after the one at `i`
+    '''
+    tag = buf[i]
+    if tag in b'NTF': return i + 1
+    n, i = read_varint(buf, i + 1)
+    return i if tag == 73 else i + n
+
+
+def decode_sentence_sets(buf, i=0):
+    ''' Decode a sentences section without decoding its terms: {verb term bytes: {objects tuple bytes}}
+    '''
+    sets = {}
+    nverbs, i = read_varint(buf, i)
+    for _ in range(nverbs):
+        start, i = i, skip_term(buf, i)
+        objects = sets.setdefault(bytes(buf[start:i]), set())
+        count, i = read_varint(buf, i)
+        for _ in range(count):
+            start = i
+            arity, i = read_varint(buf, i)
+            for _ in range(arity): i = skip_term(buf, i)
+            objects.add(bytes(buf[start:i]))
+    return sets
+
+
+def encode_sentence_sets(out, sets):
+    ''' The inverse of `decode_sentence_sets`, with the same bytes as ``encode_sentences(canonical=True)``.  Empty sets are left out.
+    '''
+    verbs = sorted(verb for verb, objects in sets.items() if objects)
+    write_varint(out, len(verbs))
+    for verb in verbs:
+        out += verb
+        write_varint(out, len(objects := sets[verb]))
+        for objs in sorted(objects): out += objs
+    return out
+
+
+def encode_node(namespace_keys, sentences, root=None):
+    ''' Encode a node record from its namespace keys and its sentences.
+    '''
+    ns = bytearray()
+    keys = sorted(namespace_keys)
+    write_varint(ns, len(keys))
+    for key in keys: write_varint(ns, key)
+    out = bytearray()
+    write_varint(out, len(ns))
+    out += ns
+    encode_sentences(out, sentences, root=root)
+    return bytes(out)
+
+
+def decode_namespace(record):
+    ''' Return the namespace keys of a node record and the offset of its sentences section.
+    '''
+    size, i = read_varint(record, 0)
+    end = i + size
+    count, i = read_varint(record, i)
+    keys = []
+    for _ in range(count):
+        key, i = read_varint(record, i)
+        keys.append(key)
+    return keys, end
+
+
+
+from .platon import Platon, Sentences
+from .platon_id import PlatonID
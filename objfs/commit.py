@@ -1,4 +1,4 @@
-from .kvfs import Blob
+from .kvfs.storage import Blob
 
 class Commit(Blob):
     ''' A Commit is the same as git. It stores a reference to its predecessor commit and changes some stuff atomically.
@@ -21,4 +21,42 @@ class Commit(Blob):
     Other mutations mutate a specific version.
 
 
-    '''
\ No newline at end of file
+    '''
+
+    def __init__(self, tree, parents=(), *, author='', time=0, message='', bridges=None, **blob):
+        '''
+        Parameters:
+            tree :bytes
+                The digest of the root tree in an `ObjectStore`
+            parents :[bytes]
+                The digests of the predecessor commits.  A merge has more than one.
+        '''
+        super().__init__(bridges=bridges or {}, **blob)
+        self.tree = tree
+        self.parents = tuple(parents)
+        self.author = author
+        self.time = time
+        self.message = message
+
+
+    def __repr__(self):
+        return f"Commit({self.tree.hex()[:12]}, parents=[{', '.join(p.hex()[:12] for p in self.parents)}])"
+
+
+    def encode(self):
+        ''' The git-like text form that is hashed and stored.
+        '''
+        lines = [f"tree {self.tree.hex()}"] + [f"parent {p.hex()}" for p in self.parents]
+        lines += [f"author {self.author}", f"time {self.time}", "", self.message]
+        return '\n'.join(lines).encode('utf8')
+
+
+    @staticmethod
+    def decode(data):
+        head, message = data.decode('utf8').split('\n\n', 1)
+        fields, parents = {}, []
+        for line in head.split('\n'):
+            name, value = line.split(' ', 1) if ' ' in line else (line, '')
+            if name == 'parent': parents.append(bytes.fromhex(value))
+            else: fields[name] = value
+        return Commit(bytes.fromhex(fields['tree']), parents, author=fields.get('author', ''), time=int(fields.get('time', 0)), message=message)
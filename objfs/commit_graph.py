@@ -0,0 +1,177 @@
+class CommitGraph():
+    ''' The shape of the commit history, kept next to an `ObjectStore` so history queries never read a `Commit`.
+
+    Each commit is numbered in the order it was added, and parents are always added before their children.
+    For each commit the graph keeps its digest, the digest of its root tree, its parents' numbers
+    and its generation: 1 for a root commit, otherwise one more than its highest parent.
+    A commit's ancestors all have lower generations, so walks can stop as soon as they go below the commits they look for.
+
+    Like the object index, the graph is persisted in segments: ``commit-graph`` holds the count of segments and
+    each ``commit-graph-<n>`` holds the commits added before a `flush`, as
+    ``digest (32 bytes), tree (32 bytes), uint32 generation, uint16 parent count, uint32 parent numbers``, little endian.
+    '''
+    def __init__(self, bridge, prefix='objects/'):
+        self.bridge = bridge
+        self.prefix = prefix
+        self.positions = {} # {digest: number}
+        self.digests, self.trees, self.parents = [], [], []
+        self.generations = array('I')
+        self.segments = self.flushed = 0
+        self.load()
+
+
+    def __len__(self):
+        return len(self.digests)
+
+
+    def __contains__(self, digest):
+        return digest in self.positions
+
+
+    def load(self):
+        try:
+            self.segments = int(self.bridge.read(f"{self.prefix}commit-graph"))
+        except FileNotFoundError:
+            return
+        for n in range(self.segments):
+            data, i = self.bridge.read(f"{self.prefix}commit-graph-{n}", max_size=1 << 32), 0
+            while i < len(data):
+                digest, tree, generation, count = _ENTRY.unpack_from(data, i)
+                i += _ENTRY.size
+                parents = struct.unpack_from(f'<{count}I', data, i)
+                i += 4 * count
+                self._append(digest, tree, parents, generation)
+        self.flushed = len(self)
+
+
+    def flush(self):
+        ''' Write the commits added since the last flush as a new segment.
+        '''
+        if self.flushed == len(self): return
+        out = bytearray()
+        for n in range(self.flushed, len(self)):
+            parents = self.parents[n]
+            out += _ENTRY.pack(self.digests[n], self.trees[n], self.generations[n], len(parents))
+            out += struct.pack(f'<{len(parents)}I', *parents)
+        self.bridge.write(f"{self.prefix}commit-graph-{self.segments}", bytes(out))
+        self.segments += 1
+        self.bridge.write(f"{self.prefix}commit-graph", str(self.segments).encode('ascii'))
+        self.flushed = len(self)
+
+
+    def add(self, digest, tree, parents=()):
+        ''' Add a commit whose parents are already in the graph and return its number.
+        '''
+        if (n := self.positions.get(digest)) is not None: return n
+        parents = tuple(self.positions[p] for p in parents)
+        generations = self.generations
+        return self._append(digest, tree, parents, 1 + max((generations[p] for p in parents), default=0))
+
+
+    def _append(self, digest, tree, parents, generation):
+        self.positions[digest] = n = len(self.digests)
+        self.digests.append(digest)
+        self.trees.append(tree)
+        self.parents.append(parents)
+        self.generations.append(generation)
+        return n
+
+
+    def tree(self, digest):
+        return self.trees[self.positions[digest]]
+
+
+    def generation(self, digest):
+        return self.generations[self.positions[digest]]
+
+
+    def parents_of(self, digest):
+        return [self.digests[p] for p in self.parents[self.positions[digest]]]
+
+
+    def is_ancestor(self, ancestor, digest):
+        ''' Is `ancestor` reachable from `digest`?  A commit is its own ancestor.
+        '''
+        target, start = self.positions[ancestor], self.positions[digest]
+        floor, generations, parents = self.generations[target], self.generations, self.parents
+        seen, stack = {start}, [start]
+        while stack:
+            if (n := stack.pop()) == target: return True
+            for p in parents[n]:
+                if p not in seen and generations[p] >= floor:
+                    seen.add(p)
+                    stack.append(p)
+        return False
+
+
+    def merge_base(self, *digests):
+        ''' The best common ancestors of the commits: the ones that are not ancestors of another common ancestor.
+        Usually there is one, criss-cross merges can have several.
+        '''
+        if not digests: return []
+        base = [self.positions[digests[0]]]
+        for digest in digests[1:]:
+            base = self._common(base, self.positions[digest])
+        return [self.digests[n] for n in base]
+
+
+    def _common(self, ones, two):
+        ''' Paint the ancestors of `ones` and `two` from the highest generation down.
+        A commit is only popped once all its descendants have been, so its flags are final by then.
+        '''
+        flags, heap, active, found = {}, [], 0, []
+        generations, parents = self.generations, self.parents
+        def paint(n, flag):
+            nonlocal active
+            if (old := flags.get(n)) is None:
+                heapq.heappush(heap, (-generations[n], n))
+                flags[n] = flag
+                if not flag & _STALE: active += 1
+            elif old | flag != old:
+                flags[n] = old | flag
+                if flag & _STALE and not old & _STALE: active -= 1
+        for n in ones: paint(n, _ONE)
+        paint(two, _TWO)
+        while active:
+            _, n = heapq.heappop(heap)
+            flag = flags[n]
+            if not flag & _STALE:
+                active -= 1
+                if flag & _BOTH == _BOTH:
+                    found.append(n)
+                    flag |= _STALE
+            for p in parents[n]: paint(p, flag)
+        return found
+
+
+    def since(self, digest, *bases):
+        ''' The commits reachable from `digest` but not from any of `bases` (git's ``bases..digest``), highest generation first.
+        '''
+        flags, heap, active, out = {}, [], 0, []
+        generations, parents = self.generations, self.parents
+        def paint(n, seen):
+            nonlocal active
+            if (old := flags.get(n)) is None:
+                heapq.heappush(heap, (-generations[n], n))
+                flags[n] = seen
+                if not seen: active += 1
+            elif seen and not old:
+                flags[n] = True
+                active -= 1
+        paint(self.positions[digest], False)
+        for base in bases: paint(self.positions[base], True)
+        while active:
+            _, n = heapq.heappop(heap)
+            if not (seen := flags[n]):
+                active -= 1
+                out.append(self.digests[n])
+            for p in parents[n]: paint(p, seen)
+        return out
+
+
+
+import heapq, struct
+from array import array
+_ENTRY = struct.Struct('<32s32sIH')
+_ONE, _TWO, _STALE = 1, 2, 4
+_BOTH = _ONE | _TWO
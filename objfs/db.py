@@ -3,4 +3,245 @@ from .platon import Platon
 class DB(Platon):
     ''' This is the root of the ID hierarchy.
     It tracks the modifications to the database and maintains its external representation.
+
+    Durable mutations go through `apply` (or a `transaction`), which logs them to a `WAL`.
+    Writers take turns on a database wide lock to apply their ops, but wait for the disk outside of it,
+    so concurrent transactions are group committed.  Platons changed directly, with `Platon.define` and friends, are not logged.
+
+    ====================================== ==================================================
+    Op                                     Effect
+    ====================================== ==================================================
+    ('define', subject, verb, *objects)    ``subject.define(verb, *objects)``
+    ('insert', parent, key, child)         ``parent.namespace[key] = child`` (a new `Platon` if child is None)
+    ('commit', digest)                     Sets `head`
+    ====================================== ==================================================
+
+    Subjects and parents may be `Platon`\\s in this DB or `PlatonID` paths.
+    Other Platon terms are logged by path, so a verb or object that is in no hierarchy raises `ValueError`,
+    and one that is moved without an op is no longer at its logged path on replay.
+
+    When the DB is opened from an image, the new platons of inserts come from its `ImagePager`, so the next
+    `checkpoint_image` lets them be evicted.  A platon that the caller inserts stays in memory, and so do its ancestors.
+
+    Each `commit` is published to `versions`, so readers can take a `snapshot` that writers never block or change.
+    '''
+    __slots__ = 'wal', 'lock', 'head', 'image', 'versions'
+
+    def __init__(self, wal=None):
+        super().__init__()
+        self.wal = wal
+        self.lock = threading.RLock()
+        self.head = None
+        self.image = None # The `ImagePager` this DB was opened from
+        self.versions = None # The `Versions` of the committed states
+
+
+    @staticmethod
+    def open(wal, store=None):
+        ''' Load the last checkpoint and replay the `WAL` since then.
+
+        A `checkpoint` is read back from `store` (an `ObjectStore`).
+        A `checkpoint_image` is mapped and only read as it is touched, so opening it costs the same whatever its size.
+        '''
+        db = DB()
+        if state := wal.state():
+            kind, head, where = state.split(' ', 2)
+            if kind == 'image': db.image = ImagePager(where, root=db)
+            elif store is not None: store.get_tree(bytes.fromhex(where), root=db)
+            else: raise ValueError("The last checkpoint is a tree, which needs its ObjectStore")
+            db.head = bytes.fromhex(head) if head else None
+        for payload in wal.replay():
+            for op in decode_ops(payload, db.lookup): db._apply(op)
+        db.wal = wal
+        if store is not None and db.head is not None:
+            db.versions = Versions(store)
+            db.versions.publish(db.head)
+        return db
+
+
+    def transaction(self):
+        return Transaction(self)
+
+
+    def apply(self, ops):
+        ''' Apply ops in order and return once they are logged.
+
+        Each op is encoded right before it is applied, so Platon objects are logged by the path they had at that point.
+        If an op fails, the ops before it stay applied and are still logged.
+        '''
+        seq = None
+        try:
+            with self.lock:
+                out, done, logged, start = bytearray(), 0, 0, 0
+                try:
+                    for op in ops:
+                        start = len(out)
+                        if self.wal is not None and op[0] == 'insert' and isinstance(op[3], Platon) and op[3].parent is None:
+                            count = self._insert_detached(out, op)
+                        else:
+                            if self.wal is not None: encode_objects(out, op, self)
+                            self._apply(op)
+                            count = 1
+                        done += 1
+                        logged += count
+                finally:
+                    if done < len(ops): del out[start:]
+                    if logged and self.wal is not None:
+                        write_varint(payload := bytearray(), logged)
+                        seq = self.wal.enqueue(bytes(payload + out))
+        finally:
+            if seq is not None: self.wal.wait(seq)
+
+
+    def _insert_detached(self, out, op):
+        ''' Apply an insert of a child that is in no hierarchy, so it has no path to log.
+        It is logged as a new platon, followed by the ops that rebuild its subtree once that has paths.  Returns the number of ops logged.
+        '''
+        _, parent, key, child = op
+        encode_objects(out, ('insert', parent, key, None), self)
+        ns = self._subject(parent).namespace
+        old = ns.get(key)
+        self._apply(op)
+        try:
+            nodes, count = [child], 1
+            for node in nodes:
+                for k, sub in (node._namespace or {}).items():
+                    encode_objects(out, ('insert', node, k, None), self)
+                    nodes.append(sub)
+                    count += 1
+            for node in nodes:
+                for sentence in node:
+                    encode_objects(out, ('define', node, *sentence), self)
+                    count += 1
+        except BaseException:
+            if old is None: del ns[key]
+            else: ns[key] = old
+            raise
+        return count
+
+
+    def _apply(self, op):
+        kind = op[0]
+        if kind == 'define':
+            self._subject(op[1]).define(op[2], *op[3:])
+        elif kind == 'insert':
+            _, parent, key, child = op
+            if child is None: child = Platon() if self.image is None else self.image.new()
+            self._subject(parent).namespace[key] = child
+        elif kind == 'commit':
+            self.head = op[1]
+        else:
+            raise ValueError(f"Unknown op {op!r}")
+
+
+    def _subject(self, subject):
+        return subject if isinstance(subject, Platon) else self.lookup(subject)
+
+
+    def commit(self, store, author='', message=''):
+        ''' Store the whole DB as a `Commit` on top of `head` in `store`, log the new head and publish it to `versions`.
+        Every node is encoded and hashed again unless a `Merkle` tracks the DB, see `ObjectStore.put_tree`.
+        '''
+        with self.lock:
+            tree = store.put_tree(self)
+            digest = store.put_commit(Commit(tree, [self.head] if self.head else [], author=author, time=int(time.time()), message=message))
+            self.apply([('commit', digest)])
+            if self.versions is None or self.versions.store is not store: self.versions = Versions(store)
+            self.versions.publish(digest)
+        return digest
+
+
+    def snapshot(self):
+        ''' The last committed state, as a read-only `Snapshot`
+        '''
+        if self.versions is None: raise LookupError("Nothing is committed yet")
+        return self.versions.snapshot()
+
+
+    def checkpoint(self, store):
+        ''' Save the DB in `store` and drop the log before it.
+        '''
+        with self.lock:
+            tree = store.put_tree(self)
+            store.flush()
+            self.wal.checkpoint(f"tree {self.head.hex() if self.head else ''} {tree.hex()}")
+
+
+    def checkpoint_image(self, path):
+        ''' Save the DB as an image (see `objfs.image`) at `path` and drop the log before it.
+        '''
+        with self.lock:
+            numbers = WeakKeyDictionary() if self.image is not None else None
+            write_image(path, self, numbers)
+            if numbers is not None: self.image.rebase(path, numbers)
+            self.wal.checkpoint(f"image {self.head.hex() if self.head else ''} {Path(path).resolve()}")
+
+
+    def load(self, sentences, batch=1 << 20):
+        ''' Bulk define (subject, verb, *objects) sentences.  A subject may be a `Platon` or a `PlatonID` path from this DB.
+
+        The sentences are taken `batch` at a time and grouped by subject and verb, so every sentence container is
+        extended once per batch and `Platon.index` and `Platon.closures` are updated once per batch.
+        The end state is the same as calling `Platon.define` for each sentence.
+        Returns the number of sentences read.
+        '''
+        sentences, total = iter(sentences), 0
+        while chunk := list(islice(sentences, batch)):
+            total += len(chunk)
+            by_subject, subject = {}, _none
+            for sentence in chunk:
+                if sentence.__class__ is not tuple: sentence = tuple(sentence)
+                # Consecutive sentences usually share their subject (and verb), which saves the dict lookups
+                if sentence[0] is not subject:
+                    if (by_verb := by_subject.get(subject := sentence[0])) is None: by_subject[subject] = by_verb = {}
+                    verb = _none
+                if sentence[1] is not verb:
+                    if (objs := by_verb.get(verb := sentence[1])) is None: by_verb[verb] = objs = []
+                objs.append(sentence[2:])
+            grouped = []
+            for subject, by_verb in by_subject.items():
+                if not isinstance(subject, Platon): subject = self.lookup(subject)
+                subject._define_grouped(by_verb)
+                grouped.append((subject, by_verb))
+            Platon._index_grouped(grouped)
+        return total
+
+
+
+
+
+class Transaction():
+    ''' Collects ops for `DB.apply`, which runs when the ``with`` block ends without an exception.
     '''
+    def __init__(self, db):
+        self.db = db
+        self.ops = []
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, kind, *args):
+        if kind is None: self.db.apply(self.ops)
+
+
+    def define(self, subject, verb, *objects):
+        self.ops.append(('define', subject, verb, *objects))
+
+
+    def insert(self, parent, key, child=None):
+        self.ops.append(('insert', parent, key, child))
+
+
+
+import threading, time
+from itertools import islice
+from .codec import write_varint, encode_objects
+from pathlib import Path
+from weakref import WeakKeyDictionary
+from .commit import Commit
+from .image import ImagePager, write_image
+from .snapshot import Versions
+from .wal import decode_ops
+_none = object()
@@ -0,0 +1,183 @@
+''' Checkpoint images: a whole `Platon` hierarchy in one file that is read in place through `mmap`.
+
+An image is made of these parts, all little endian:
+
+======== ===========================================================================================
+Part     Layout
+======== ===========================================================================================
+header   ``b'OBJI'``, uint32 version, uint64 nodes, uint64 table offset, uint64 verbs, uint64 verb index offset
+records  One `objfs.codec` node record per node
+table    Per node: uint64 record offset, uint32 record size, uint32 first child, uint32 parent
+subjects Per verb: the sorted numbers of the nodes whose sentences use it, as uint32s
+verbs    Per verb, sorted by its encoded term: uint64 offset, uint32 size of the term, uint64 offset, uint32 count of its subjects
+======== ===========================================================================================
+
+Nodes are numbered breadth first from the root (0), each node's children in key order.
+The children of a node are therefore numbered consecutively from its first child and need no table of their own.
+'''
+from .paging import Pager, PagedPlaton
+
+
+
+class ImagePager(Pager):
+    ''' A `Pager` over an image file.  Opening one only reads the header, the rest is faulted in from the mapping as it is touched.
+
+    Nodes are stored by number instead of by path.  The image is read only: modified nodes stay loaded
+    until they are saved in a new image, which `rebase` then moves every live node onto.
+    '''
+    MAGIC, VERSION = b'OBJI', 1
+
+    def __init__(self, path, budget=64 << 20, root=None):
+        '''
+        Parameters:
+            path :str
+                The image file
+            budget :int
+                See `Pager`
+            root :Platon
+                A new, empty `Platon` (like a `DB`) to load the root node into.  By default the root is a lazy `PagedPlaton`.
+        '''
+        super().__init__(None, budget)
+        self._map(path)
+        if root is None:
+            self.root = PagedPlaton(self, 0)
+            return
+        self.root = root
+        record = self.read(0)
+        ns, start = self.namespace(root, record)
+        if ns is not None: root._namespace = ns
+        if start < len(record): root._sentences = decode_sentences(record, start, self.resolve)
+
+
+    def _map(self, path):
+        self.path = str(path)
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self.table, self.verbs, self.verb_index = _HEADER.unpack_from(self.map, 0)
+        if magic != ImagePager.MAGIC: raise ValueError(f"{path} is not an image")
+        if version != ImagePager.VERSION: raise ValueError(f"{path} is an image version {version}")
+        self.view = memoryview(self.map)
+
+
+    def __len__(self):
+        return self.count
+
+
+    def rebase(self, path, numbers):
+        ''' Read from the image at `path` from now on.  `numbers` is {PagedPlaton: number} as filled in by `write_image`.
+
+        The live nodes that were written take their new numbers and are no longer modified, so they can be evicted again.
+        Live nodes that were not written (they left the hierarchy) are read in from the old image first, and stay loaded.
+        '''
+        for node in list(self.nodes.values()):
+            if node not in numbers and node.stored is not None:
+                if not node.state: self.fault(node)
+                if node.raw is not None: self.decode(node)
+                node.stored, node.dirty = None, True
+        self._map(path)
+        self.nodes = WeakValueDictionary()
+        for node, n in numbers.items():
+            if node.pager is not self: continue
+            ns = _namespace_slot.__get__(node)
+            node.stored, node.dirty = n, False
+            node.loaded_version = ns.version if ns is not None else None
+            self.nodes[n] = node
+
+
+    def read(self, n):
+        offset, size, _, _ = _NODE.unpack_from(self.map, self.table + n * _NODE.size)
+        return self.view[offset:offset+size]
+
+
+    def children(self, node, keys):
+        n = 0 if node is self.root else node.stored
+        first = _NODE.unpack_from(self.map, self.table + n * _NODE.size)[2]
+        return range(first, first + len(keys))
+
+
+    def write(self, node, everything=False):
+        raise io.UnsupportedOperation("An image is read only.  Save a new one with write_image.")
+
+
+    def node(self, n):
+        ''' The node numbered `n`, or None if it is no longer where the image had it.
+        '''
+        path = []
+        while (node := self.root if n == 0 else self.nodes.get(n)) is None:
+            path.append(n)
+            n = _NODE.unpack_from(self.map, self.table + n * _NODE.size)[3]
+        for n in reversed(path):
+            node._namespace # Faulting the parent in registers its children
+            if (node := self.nodes.get(n)) is None: return None
+        return node
+
+
+    def subjects(self, verb):
+        ''' The nodes whose sentences used `verb` when the image was written, from the image's verb index.
+        '''
+        write_term(key := bytearray(), verb, self.root)
+        lo, hi = 0, self.verbs
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            offset, size, _, _ = _VERB.unpack_from(self.map, self.verb_index + mid * _VERB.size)
+            if self.map[offset:offset+size] < key: lo = mid + 1
+            else: hi = mid
+        if lo == self.verbs: return []
+        offset, size, subjects, count = _VERB.unpack_from(self.map, self.verb_index + lo * _VERB.size)
+        if self.map[offset:offset+size] != key: return []
+        return [node for n in struct.unpack_from(f'<{count}I', self.map, subjects) if (node := self.node(n)) is not None]
+
+
+
+def write_image(path, root, numbers=None):
+    ''' Write the hierarchy under `root` as an image.
+    The file is replaced atomically, so anyone who still has the old image mapped keeps reading the old one.
+    `numbers`, a `WeakKeyDictionary`, gets the number of every `PagedPlaton` that is written, for `ImagePager.rebase`.
+    '''
+    tmp = f"{path}.tmp"
+    nodes, table, verbs = [root], bytearray(), {}
+    with open(tmp, 'wb') as f:
+        f.write(bytes(_HEADER.size))
+        offset, parents = _HEADER.size, [0]
+        for n, node in enumerate(nodes):
+            nodes[n] = None # Let go of nodes that are written, in case they are paged
+            if numbers is not None and node.__class__ is PagedPlaton: numbers[node] = n
+            ns, sentences = node._namespace, node._sentences
+            keys = sorted(ns) if ns else []
+            first = len(nodes)
+            nodes.extend(ns[key] for key in keys)
+            parents.extend(n for _ in keys)
+            record = encode_node(keys, sentences, root)
+            f.write(record)
+            table += _NODE.pack(offset, len(record), first, parents[n])
+            offset += len(record)
+            for verb, _ in (sentences.items() if sentences else ()):
+                write_term(term := bytearray(), verb, root)
+                verbs.setdefault(bytes(term), []).append(n)
+        start = offset
+        f.write(table)
+        offset += len(table)
+        index = bytearray()
+        for term in sorted(verbs):
+            subjects = verbs[term]
+            f.write(term)
+            f.write(struct.pack(f'<{len(subjects)}I', *subjects))
+            index += _VERB.pack(offset, len(term), offset + len(term), len(subjects))
+            offset += len(term) + 4 * len(subjects)
+        f.write(index)
+        f.seek(0)
+        f.write(_HEADER.pack(ImagePager.MAGIC, ImagePager.VERSION, len(nodes), start, len(verbs), offset))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return len(nodes)
+
+
+
+import io, mmap, os, struct
+from weakref import WeakValueDictionary
+from .codec import decode_sentences, encode_node, write_term
+from .paging import _namespace_slot
+_HEADER = struct.Struct('<4sIQQQQ')
+_NODE = struct.Struct('<QIII')
+_VERB = struct.Struct('<QIQI')
@@ -45,15 +45,21 @@ class Filesystem(Bridge):
 
 
     def _open_write(self, key, size, chunk_size):
-        return open(Path(self.store.base) / key, 'wb')
+        path = Path(self.store.base) / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return open(path, 'wb')
 
 
     def read(self, key, max_size=None):
         if max_size == None: max_size = 4096
+        chunks, left = [], max_size + 1
         with self._open_read(key, max_size) as f:
-            chunk = f.read(max_size)
-            if f.read(1): raise ValueError(f"Data is larger than the maximum size of {max_size}")
-        return chunk
+            # Read in pieces so that a generous max_size doesn't allocate max_size bytes up front
+            while left and (chunk := f.read(min(left, 1 << 20))):
+                chunks.append(chunk)
+                left -= len(chunk)
+        if not left: raise ValueError(f"Data is larger than the maximum size of {max_size}")
+        return b''.join(chunks)
 
 
     def write(self, key, data):
@@ -61,6 +67,16 @@ class Filesystem(Bridge):
             f.write(data)
 
 
+    def read_range(self, key, offset, size):
+        with self._open_read(key, size) as f:
+            f.seek(offset)
+            return f.read(size)
+
+
+    def delete(self, key):
+        (Path(self.store.base) / key).unlink(missing_ok=True)
+
+
     def read_stream(self, key, chunk_size=None):
         if chunk_size == None: chunk_size = 4096
         with self._open_read(key, chunk_size) as f:
@@ -83,6 +99,7 @@ class SFTP(Filesystem):
         super().__init__(store)
         self.sftp = None
         self.hkey = None
+        self.dirs = set() # Remote directories known to exist
         self.ssh_args = ssh_args
         ssh_args.setdefault('look_for_keys',False)
         ssh_args.setdefault('allow_agent', False)
@@ -97,6 +114,35 @@ class SFTP(Filesystem):
         return self.sftp.open(str(Path(self.store.base) / key), mode='rb', bufsize=chunk_size)
 
 
+    def _open_write(self, key, size, chunk_size):
+        path = Path(self.store.base) / key
+        self._mkdirs(path.parent)
+        return self.sftp.open(str(path), mode='wb', bufsize=chunk_size)
+
+
+    def _mkdirs(self, path):
+        # Like mkdir(parents=True, exist_ok=True), remembering what exists to save round trips
+        missing = []
+        while path not in self.dirs:
+            try:
+                self.sftp.stat(str(path))
+            except FileNotFoundError:
+                missing.append(path)
+                path = path.parent
+                continue
+            self.dirs.add(path)
+            break
+        for path in reversed(missing): self.sftp.mkdir(str(path))
+        self.dirs.update(missing)
+
+
+    def delete(self, key):
+        try:
+            self.sftp.remove(str(Path(self.store.base) / key))
+        except FileNotFoundError:
+            pass
+
+
     def get_pkey(self):
         pkey = self.pkey_file.split(' ')
         if len(pkey) == 2: pkey.append(None)
@@ -0,0 +1,60 @@
+class LRU():
+    ''' A bounded mapping that forgets the least recently used entry.
+
+    `hits` and `misses` count `get` calls so that `maxsize` can be tuned.
+    '''
+    __slots__ = 'maxsize', 'data', 'hits', 'misses'
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+    def __repr__(self):
+        return f"LRU({len(self)}/{self.maxsize}, hit_rate={self.hit_rate():.2f})"
+
+
+    def __len__(self):
+        return len(self.data)
+
+
+    def __contains__(self, key):
+        return key in self.data
+
+
+    def get(self, key, default=None):
+        try:
+            value = self.data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+
+    def pop(self, key, default=None):
+        return self.data.pop(key, default)
+
+
+    def clear(self):
+        self.data.clear()
+        self.hits = self.misses = 0
+
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+
+from collections import OrderedDict
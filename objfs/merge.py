@@ -0,0 +1,132 @@
+from collections import namedtuple
+
+Conflict = namedtuple('Conflict', ('kind', 'path', 'verb', 'base', 'ours', 'theirs'))
+
+
+
+class Merge():
+    ''' A three-way merge of `ObjectStore` trees, and of the `Commit`\\s that point at them.
+
+    Each node is merged as two sets against the merge base: its namespace {key: subtree} and its sentences {(verb, objects)}.
+    What a side changed is what it added to and removed from the base, and the result is the base with both sides' changes.
+    Subtrees are compared by digest before they are read, so only the nodes that changed on either side (and their ancestors)
+    are touched, and the cost of a merge follows the size of the changes, not of the DB.
+
+    Conflicts never stop the merge.  They are collected in `conflicts` and the merged tree keeps one version of the conflicting part:
+
+    ============== =====================================================================================
+    Kind           Meaning
+    ============== =====================================================================================
+    modify/delete  We changed the subtree at `path` and they deleted it.  Ours is kept.
+    delete/modify  We deleted the subtree at `path` and they changed it.  Theirs is kept.
+    value          Both sides changed the objects of a `single` valued `verb` at `path` differently.  Ours are kept.
+    ============== =====================================================================================
+
+    `base`, `ours` and `theirs` are tree digests for the first two kinds and sets of objects tuples for ``value``.
+    Platon references in conflicts are `PlatonID` paths.
+    '''
+    def __init__(self, store, single=()):
+        '''
+        Parameters:
+            store :ObjectStore
+                Where the trees are read from and the merged ones written to
+            single :[term]
+                Verbs that hold one value, where two different changes conflict instead of adding up.
+                A `Platon` verb is matched by its path.
+        '''
+        self.store = store
+        self.single = set()
+        for verb in single:
+            write_term(term := bytearray(), verb)
+            self.single.add(bytes(term))
+        self.conflicts = []
+        self.reads = 0 # The number of tree objects read
+
+
+    def commits(self, ours, theirs, *, author='', time=0, message=''):
+        ''' Merge commit `theirs` into `ours`.  Return a new merge commit, or one of the two if it already contains the other.
+        '''
+        graph = self.store.graph
+        if graph.is_ancestor(theirs, ours): return ours
+        if graph.is_ancestor(ours, theirs): return theirs
+        tree = self.trees(self.base(graph.merge_base(ours, theirs)), graph.tree(ours), graph.tree(theirs))
+        return self.store.put_commit(Commit(tree, [ours, theirs], author=author, time=time, message=message))
+
+
+    def base(self, bases):
+        ''' The tree of the merge base.  Several bases (after criss-cross merges) are merged into a virtual one, like git's recursive strategy.
+        Conflicts in the virtual base are not reported.
+        '''
+        if not bases: return None
+        graph, conflicts = self.store.graph, self.conflicts
+        tree = graph.tree(bases[0])
+        for other in bases[1:]:
+            self.conflicts = []
+            tree = self.trees(self.base(graph.merge_base(bases[0], other)), tree, graph.tree(other))
+        self.conflicts = conflicts
+        return tree
+
+
+    def trees(self, base, ours, theirs):
+        ''' Merge tree `theirs` into `ours` and return the digest of the merged tree.  `base` is None for unrelated trees.
+        '''
+        return self._merge(b'', base, ours, theirs)
+
+
+    def _merge(self, path, base, ours, theirs):
+        if ours == theirs or theirs == base: return ours
+        if ours == base: return theirs
+        if ours is None or theirs is None:
+            self.conflicts.append(Conflict('delete/modify' if ours is None else 'modify/delete', PlatonID.from_trusted(path), None, base, ours, theirs))
+            return ours or theirs
+        (bns, bv), (ons, ov), (tns, tv) = self._read(base), self._read(ours), self._read(theirs)
+        children = {}
+        for key in bns.keys() | ons.keys() | tns.keys():
+            b, o, t = bns.get(key), ons.get(key), tns.get(key)
+            if o == t or t == b: child = o
+            elif o == b: child = t
+            else: child = self._merge(path + PlatonID.from_int(key), b, o, t)
+            if child is not None: children[key] = child
+        sentences = {}
+        for verb in bv.keys() | ov.keys() | tv.keys():
+            b, o, t = bv.get(verb, _empty), ov.get(verb, _empty), tv.get(verb, _empty)
+            if o == t or t == b: sentences[verb] = o
+            elif o == b: sentences[verb] = t
+            elif verb in self.single:
+                self.conflicts.append(Conflict('value', PlatonID.from_trusted(path), read_term(verb, 0)[0], *map(_objects, (b, o, t))))
+                sentences[verb] = o
+            else:
+                sentences[verb] = (b & o & t) | (o - b) | (t - b)
+        return self.store.put(encode_tree_sets(children, sentences), b'tree')
+
+
+    def _read(self, digest):
+        if digest is None: return {}, {}
+        self.reads += 1
+        kind, payload = self.store.get(digest)
+        if kind != b'tree': raise ValueError(f"Object {digest.hex()} is a {kind.decode()}, not a tree")
+        children, start = decode_tree(payload)
+        return children, decode_sentence_sets(payload, start)
+
+
+
+def _objects(encoded):
+    ''' Decode a set of encoded objects tuples
+    '''
+    out = set()
+    for objs in encoded:
+        arity, i = read_varint(objs, 0)
+        terms = []
+        for _ in range(arity):
+            term, i = read_term(objs, i)
+            terms.append(term)
+        out.add(tuple(terms))
+    return out
+
+
+
+from .codec import read_term, read_varint, write_term, decode_sentence_sets
+from .commit import Commit
+from .object_store import decode_tree, encode_tree_sets
+from .platon_id import PlatonID
+_empty = frozenset()
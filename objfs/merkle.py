@@ -0,0 +1,212 @@
+class Merkle():
+    ''' Merkle hashes of `Platon` hierarchies, kept up to date as they change.
+
+    The hash of a node covers its sentences and, through their hashes, everything under it:
+
+        hash = sha256(sentences sum, children sum)
+
+    where the sentences sum is the sum (mod 2**256) of ``sha256(encode_objects((verb, *objects)))`` over its sentences
+    and the children sum is the sum of ``sha256(varint key + child hash)`` over its namespace.
+    Sums don't depend on order, so a change only replaces its own term: `define` and namespace inserts and deletes
+    update the changed node and then each of its ancestors in O(depth).
+
+    Platon terms are hashed by path, like `objfs.codec` encodes them, so equal hierarchies hash the same.
+    A platon that is in no hierarchy has no path and is hashed by its identity instead.
+    Every platon that sentences refer to remembers its subjects, so when it is inserted, moved or deleted
+    through its `Namespace` (or one of its ancestors is) those subjects are rehashed.
+
+    `install` registers the hashes with `Platon.define`, `Platon.define_many` and `Namespace`.  Other changes
+    (like assigning `Platon.sentences` or `Platon.namespace`) are picked up by `refresh`.
+    Two hierarchies with the same hash hold the same data, so `diff` only descends into subtrees whose hashes differ.
+    '''
+    def __init__(self):
+        self.nodes = {} # {Platon: [sentences sum, children sum, hash]}
+        self.refs = {} # {Platon: {subject}} The subjects whose sentences refer to a platon, which may be out of date
+
+
+    def install(self):
+        Platon.merkle = self
+        return self
+
+
+    def uninstall(self):
+        if Platon.merkle is self: Platon.merkle = None
+
+
+    def track(self, root):
+        ''' Hash the hierarchy under `root` and keep it up to date from now on
+        '''
+        self._compute(root)
+        return self
+
+
+    def hash(self, platon):
+        return self.nodes[platon][2]
+
+
+    def refresh(self, platon):
+        ''' Rehash `platon` and everything under it from scratch, then update its ancestors
+        '''
+        old = self.nodes[platon][2]
+        self._drop(platon)
+        self._compute(platon)
+        self._propagate(platon, old)
+
+
+    def touch(self, platon):
+        ''' Rehash the sentences of `platon` after they changed in bulk
+        '''
+        if (entry := self.nodes.get(platon)) is None: return
+        entry[0] = self._sentences_sum(platon)
+        self._update(platon, entry)
+
+
+    def define(self, subject, verb, objects):
+        ''' Account for a sentence that is about to be defined
+        '''
+        if (entry := self.nodes.get(subject)) is None: return
+        if (sentences := subject._sentences) is not None and objects in (sentences.get(verb) or ()): return
+        entry[0] = (entry[0] + self._sentence(subject, verb, objects)) & _MASK
+        self._update(subject, entry)
+
+
+    def link(self, parent, key, child):
+        ''' Account for `child` having been inserted into the namespace of `parent`
+        '''
+        if (entry := self.nodes.get(parent)) is not None:
+            if child not in self.nodes: self._compute(child)
+            entry[1] = (entry[1] + _child(key, self.nodes[child][2])) & _MASK
+            self._update(parent, entry)
+        self._moved(child)
+
+
+    def unlink(self, parent, key, child, drop=True):
+        ''' Account for `child` having left the namespace of `parent`.  `drop` forgets its hashes unless it is moving elsewhere.
+        '''
+        if (entry := self.nodes.get(parent)) is not None and child in self.nodes:
+            entry[1] = (entry[1] - _child(key, self.nodes[child][2])) & _MASK
+            if drop: self._drop(child)
+            self._update(parent, entry)
+        if drop: self._moved(child)
+
+
+    def diff(self, a, b):
+        ''' Yield (path, change) for every node that differs between the hierarchies under `a` and `b`.
+        A change is 'changed' (its sentences differ), 'added' (only under `b`) or 'removed' (only under `a`).
+        Paths are relative `PlatonID`\\s and subtrees with equal hashes are skipped.
+        '''
+        nodes = self.nodes
+        stack = [(b'', a, b)]
+        while stack:
+            path, a, b = stack.pop()
+            ea, eb = nodes[a], nodes[b]
+            if ea[2] == eb[2]: continue
+            if ea[0] != eb[0]: yield PlatonID.from_trusted(path) if path else PlatonID.CURRENT, 'changed'
+            if ea[1] == eb[1]: continue
+            na, nb = a._namespace or {}, b._namespace or {}
+            for key in na.keys() | nb.keys():
+                sub = path + PlatonID.from_int(key)
+                if key not in nb: yield PlatonID.from_trusted(sub), 'removed'
+                elif key not in na: yield PlatonID.from_trusted(sub), 'added'
+                else: stack.append((sub, na[key], nb[key]))
+
+
+    def verify(self, root):
+        ''' Rehash the hierarchy under `root` from scratch and return the `Platon`\\s whose kept hash is wrong.
+        '''
+        fresh = Merkle()._compute(root)
+        return [platon for platon, entry in fresh.items() if self.nodes.get(platon) != entry]
+
+
+    def _moved(self, root):
+        ''' Rehash the subjects that refer to a platon under `root`, whose paths changed
+        '''
+        refs, stack = self.refs, [root]
+        while stack:
+            node = stack.pop()
+            if ns := node._namespace: stack.extend(ns.values())
+            if (subjects := refs.pop(node, None)) is None: continue
+            for subject in subjects:
+                if subject in self.nodes: self.touch(subject)
+
+
+    def _update(self, platon, entry):
+        old = entry[2]
+        entry[2] = _hash(entry)
+        self._propagate(platon, old)
+
+
+    def _propagate(self, platon, old):
+        nodes = self.nodes
+        while (parent := platon.parent) is not None and (entry := nodes.get(parent)) is not None:
+            new = nodes[platon][2]
+            if new == old: return
+            entry[1] = (entry[1] - _child(platon.key, old) + _child(platon.key, new)) & _MASK
+            old = entry[2]
+            entry[2] = _hash(entry)
+            platon = parent
+
+
+    def _compute(self, root):
+        nodes, fresh, stack = self.nodes, {}, [(root, False)]
+        while stack:
+            node, done = stack.pop()
+            ns = node._namespace or {}
+            if not done:
+                stack.append((node, True))
+                stack.extend((child, False) for child in ns.values())
+                continue
+            children = 0
+            for key, child in ns.items(): children += _child(key, fresh[child][2])
+            entry = [self._sentences_sum(node), children & _MASK, None]
+            entry[2] = _hash(entry)
+            fresh[node] = nodes[node] = entry
+        return fresh
+
+
+    def _sentence(self, subject, verb, objects):
+        out = bytearray()
+        write_varint(out, len(objects) + 1)
+        for term in (verb, *objects):
+            if isinstance(term, Platon):
+                if (subjects := self.refs.get(term)) is None: self.refs[term] = subjects = set()
+                subjects.add(subject)
+                if term.parent is None:
+                    out += b'@'
+                    write_varint(out, id(term))
+                    continue
+            write_term(out, term)
+        return int.from_bytes(sha256(out).digest(), 'big')
+
+
+    def _sentences_sum(self, platon):
+        total = 0
+        for verb, objects in (platon._sentences.items() if platon._sentences else ()):
+            for objs in objects: total += self._sentence(platon, verb, objs)
+        return total & _MASK
+
+
+    def _drop(self, root):
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if self.nodes.pop(node, None) is not None: stack.extend((node._namespace or {}).values())
+
+
+
+def _hash(entry):
+    return sha256(entry[0].to_bytes(32, 'big') + entry[1].to_bytes(32, 'big')).digest()
+
+
+def _child(key, digest):
+    out = bytearray()
+    write_varint(out, key)
+    return int.from_bytes(sha256(out + digest).digest(), 'big')
+
+
+
+from hashlib import sha256
+from .codec import write_term, write_varint
+from .platon import Platon
+from .platon_id import PlatonID
+_MASK = (1 << 256) - 1
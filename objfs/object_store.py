@@ -0,0 +1,312 @@
+class ObjectStore():
+    ''' A git-like, content addressed store of objects kept in a `KVStore` through its `Bridge`.
+
+    An object is a kind (``blob``, ``tree`` or ``commit``) and a payload.  It is keyed by
+    ``sha256(kind + b' ' + len + b'\\0' + payload)``, so equal payloads are stored once no matter who adds them.
+    Objects are never deleted.
+
+    Every stored digest is kept in an in-memory set, so `in` never touches the bridge.
+    `flush` persists the digests added since the last flush as a new index segment.
+
+    Trees are `Platon` hierarchies: each node is stored as its own ``tree`` object, which references its children by digest.
+    Unchanged subtrees therefore hash to the same object and are shared between commits.
+    `put_tree` still encodes and hashes every node, unless a `Merkle` is installed and tracks the hierarchy: then a
+    subtree with the Merkle hash of a tree this store wrote before is reused without being visited.  Changes that the
+    Merkle hashes don't see (see `Merkle.refresh`) must be refreshed before `put_tree`.
+
+    Every commit is also added to a `CommitGraph`, which answers history questions without reading commits.
+
+    New objects are written loose, one key each.  `repack` moves them into a `Pack` where versions of the
+    same node are stored as deltas against each other.
+    '''
+    def __init__(self, bridge, prefix='objects/'):
+        '''
+        Parameters:
+            bridge :Bridge
+                Where the objects are read from and written to
+            prefix :str
+                Prepended to every key
+        '''
+        self.bridge = bridge
+        self.prefix = prefix
+        self.index = set()
+        self.new = [] # Digests that are not in an index segment yet
+        self.segments = 0
+        self.packs = []
+        self.paths = {} # {digest: path} of the trees written by `put_tree` in this process, so `repack` can find versions of a node
+        self.cache = LRU(256) # Recently read raw objects from packs, which are likely delta bases
+        self.trees = {} # {Merkle hash: digest} of the Merkle-tracked nodes written by `put_tree`
+        self.load_index()
+        self.graph = CommitGraph(bridge, prefix)
+
+
+    def __len__(self):
+        return len(self.index)
+
+
+    def __contains__(self, digest):
+        return digest in self.index
+
+
+    def __iter__(self):
+        return iter(self.index)
+
+
+    @staticmethod
+    def hash(kind, payload):
+        return sha256(b'%s %d\0' % (kind, len(payload)) + payload).digest()
+
+
+    def key(self, digest):
+        hex = digest.hex()
+        return f"{self.prefix}{hex[:2]}/{hex[2:]}"
+
+
+    def put(self, payload, kind=b'blob'):
+        ''' Store `payload` unless it is already stored and return its digest.
+        '''
+        digest = self.stage(payload, kind)
+        self.publish(digest)
+        return digest
+
+
+    def stage(self, payload, kind=b'blob'):
+        ''' Write `payload` as a loose object but leave it out of the index, so it is not `in` the store until `publish`.
+        Returns its digest.  A staged object that is never published is only wasted space.
+        '''
+        raw = b'%s %d\0' % (kind, len(payload)) + payload
+        digest = sha256(raw).digest()
+        if digest not in self.index: self.bridge.write(self.key(digest), zlib.compress(raw, 1))
+        return digest
+
+
+    def publish(self, digest):
+        ''' Add a staged object to the index
+        '''
+        if digest in self.index: return
+        self.index.add(digest)
+        self.new.append(digest)
+
+
+    def get(self, digest):
+        ''' Return the (kind, payload) of an object.  The payload is checked against the digest.
+        '''
+        raw = self.raw(digest)
+        if sha256(raw).digest() != digest: raise ValueError(f"Object {digest.hex()} is corrupt")
+        header, payload = raw.split(b'\0', 1)
+        return header.split(b' ', 1)[0], payload
+
+
+    def raw(self, digest):
+        ''' The stored bytes (header and payload) of an object, loose or packed.
+        '''
+        if (raw := self.cache.get(digest)) is not None: return raw
+        try:
+            return zlib.decompress(self.bridge.read(self.key(digest), max_size=1 << 32))
+        except FileNotFoundError:
+            pass
+        chain = []
+        while True:
+            for pack in self.packs:
+                if (entry := pack.entry(digest)) is not None: break
+            else:
+                # Another process may have packed it since the packs were loaded
+                if not self.load_packs(): raise KeyError(f"Object {digest.hex()} is not stored")
+                continue
+            type, data = entry
+            if type == 0:
+                raw = zlib.decompress(data)
+                break
+            chain.append((digest, data[32:]))
+            digest = data[:32]
+            if (raw := self.cache.get(digest)) is not None: break
+        self.cache[digest] = raw
+        for digest, delta in reversed(chain):
+            raw = apply_delta(raw, zlib.decompress(delta))
+            self.cache[digest] = raw
+        return raw
+
+
+    def flush(self):
+        ''' Write the digests added since the last flush as a new index segment, and the new part of the `graph`.
+        '''
+        self.graph.flush()
+        if not self.new: return
+        self.bridge.write(f"{self.prefix}index-{self.segments}", b''.join(self.new))
+        self.segments += 1
+        self.bridge.write(f"{self.prefix}index", str(self.segments).encode('ascii'))
+        self.new = []
+
+
+    def load_packs(self):
+        ''' Open the packs that were added since the last call.  Return True if there were any.
+        '''
+        try:
+            names = self.bridge.read(f"{self.prefix}packs", max_size=1 << 32).decode('ascii').split()
+        except FileNotFoundError:
+            names = []
+        have = {pack.key for pack in self.packs}
+        new = [Pack(self.bridge, key) for name in names if (key := f"{self.prefix}pack/{name}") not in have]
+        for pack in new:
+            self.packs.append(pack)
+            self.index.update(pack)
+        return bool(new)
+
+
+    def load_index(self):
+        self.load_packs()
+        try:
+            self.segments = int(self.bridge.read(f"{self.prefix}index"))
+        except FileNotFoundError:
+            return
+        for n in range(self.segments):
+            data = self.bridge.read(f"{self.prefix}index-{n}", max_size=1 << 32)
+            self.index.update(data[i:i+32] for i in range(0, len(data), 32))
+
+
+    def repack(self, depth=50, window=10):
+        ''' Move every loose object into a new pack and delete the loose copies.
+
+        Objects are sorted by kind, path (as remembered by `put_tree`) and size, so versions of a node end up next to each other.
+        Each object is stored as the smallest delta against one of the `window` objects before it, if that saves at least half,
+        as long as the base's delta chain is shorter than `depth`.
+        Other processes can keep reading the store, since a missing object makes them look for new packs,
+        but nothing else may write to it until this returns.  Paths are only known for the trees stored by this `ObjectStore`.
+        Returns the new `Pack`, or None if there were no loose objects.
+        '''
+        loose = [digest for digest in list(self.index) if not any(digest in pack for pack in self.packs)]
+        if not loose: return None
+        objects = []
+        for digest in loose:
+            raw = self.raw(digest)
+            objects.append((raw[:raw.index(b' ')], self.paths.get(digest, b''), len(raw), digest, raw))
+        objects.sort(reverse=True)
+        entries, depths = [], {}
+        for i, (kind, _, size, digest, raw) in enumerate(objects):
+            best = None
+            for bkind, _, _, base, braw in objects[max(0, i - window):i]:
+                if bkind != kind or depths[base] >= depth: continue
+                delta = make_delta(braw, raw)
+                if len(delta) * 2 < size and (best is None or len(delta) < len(best[1])): best = base, delta
+            if best is None:
+                entries.append((digest, 0, zlib.compress(raw)))
+                depths[digest] = 0
+            else:
+                entries.append((digest, 1, best[0] + zlib.compress(best[1])))
+                depths[digest] = depths[best[0]] + 1
+        name = 'pack-' + sha256(b''.join(sorted(loose))).hexdigest()
+        pack = Pack.write(self.bridge, f"{self.prefix}pack/{name}", entries)
+        self.packs.append(pack)
+        self.bridge.write(f"{self.prefix}packs", ' '.join(p.key.rsplit('/', 1)[1] for p in self.packs).encode('ascii'))
+        for digest in loose: self.bridge.delete(self.key(digest))
+        return pack
+
+
+    def put_tree(self, platon):
+        ''' Store the hierarchy under `platon`, which should be a root, and return the digest of its tree.
+        '''
+        tracked = Platon.merkle.nodes if Platon.merkle is not None else {}
+        digests, stack, trees = {}, [(platon, False)], self.trees
+        while stack:
+            node, done = stack.pop()
+            entry = tracked.get(node)
+            if not done:
+                if entry is not None and (digest := trees.get(entry[2])) is not None:
+                    digests[node] = digest
+                    continue
+                stack.append((node, True))
+                stack.extend((child, False) for child in (node._namespace or {}).values())
+                continue
+            ns = node._namespace or {}
+            digests[node] = digest = self.put(encode_tree({key: digests.pop(child) for key, child in ns.items()}, node._sentences, platon), b'tree')
+            self.paths[digest] = b'' if node is platon else node.path().id
+            if entry is not None: trees[entry[2]] = digest
+        return digests[platon]
+
+
+    def get_tree(self, digest, factory=None, root=None):
+        ''' Rebuild the hierarchy of a tree into `root` and return it.  Every new node is made with `factory`, which defaults to `Platon`.
+        '''
+        factory = factory or Platon
+        if root is None: root = factory()
+        stack, sentences = [(root, digest)], []
+        while stack:
+            node, digest = stack.pop()
+            kind, payload = self.get(digest)
+            if kind != b'tree': raise ValueError(f"Object {digest.hex()} is a {kind.decode()}, not a tree")
+            children, start = decode_tree(payload)
+            for key, child in children.items():
+                node.namespace[key] = platon = factory()
+                stack.append((platon, child))
+            sentences.append((node, payload, start))
+        for node, payload, start in sentences:
+            if payload[start:start+1] not in (b'', b'\0'): node.sentences = decode_sentences(payload, start, root.lookup)
+        return root
+
+
+    def put_commit(self, commit):
+        ''' Store `commit` and add it to the `graph`.  Its parents must be stored already.
+        '''
+        head = self.put(commit.encode(), b'commit')
+        stack = [(head, commit)]
+        while stack:
+            digest, commit = stack[-1]
+            if missing := [p for p in commit.parents if p not in self.graph]:
+                stack.extend((p, self.get_commit(p)) for p in missing)
+                continue
+            stack.pop()
+            self.graph.add(digest, commit.tree, commit.parents)
+        return head
+
+
+    def get_commit(self, digest):
+        kind, payload = self.get(digest)
+        if kind != b'commit': raise ValueError(f"Object {digest.hex()} is a {kind.decode()}, not a commit")
+        return Commit.decode(payload)
+
+
+
+def encode_tree(children, sentences, root=None):
+    ''' A tree payload: varint count, then (varint key, 32 byte digest) per child in key order, then the sentences section.
+    '''
+    out = _encode_children(children)
+    encode_sentences(out, sentences, canonical=True, root=root)
+    return bytes(out)
+
+
+def encode_tree_sets(children, sets):
+    ''' `encode_tree` with the sentences given as from `objfs.codec.decode_sentence_sets`
+    '''
+    return bytes(encode_sentence_sets(_encode_children(children), sets))
+
+
+def _encode_children(children):
+    out = bytearray()
+    write_varint(out, len(children))
+    for key in sorted(children):
+        write_varint(out, key)
+        out += children[key]
+    return out
+
+
+def decode_tree(payload):
+    ''' Return {key: digest} and the offset of the sentences section.
+    '''
+    count, i = read_varint(payload, 0)
+    children = {}
+    for _ in range(count):
+        key, i = read_varint(payload, i)
+        children[key] = bytes(payload[i:i+32])
+        i += 32
+    return children, i
+
+
+
+import zlib
+from hashlib import sha256
+from .codec import write_varint, read_varint, encode_sentences, decode_sentences, encode_sentence_sets
+from .commit import Commit
+from .commit_graph import CommitGraph
+from .lru import LRU
+from .pack import Pack, make_delta, apply_delta
+from .platon import Platon
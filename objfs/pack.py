@@ -0,0 +1,153 @@
+''' Pack files: many objects in one file, most of them stored as a delta against a similar object.
+
+A pack ``<name>.pack`` is a sequence of entries:
+
+===== =====================================================
+Type  Entry
+===== =====================================================
+0     zlib(raw object)
+1     32 byte digest of the base object, zlib(delta)
+===== =====================================================
+
+Its sidecar ``<name>.idx`` is ``b'OPIX'``, a uint32 count, the sorted digests (32 bytes each)
+and then a (uint64 offset, uint32 size) pair per digest, all big endian.
+A lookup is a binary search over the digests and one ranged read of the pack.
+
+A delta is ``varint len(base), varint len(target)`` and then ops: ``0, varint n, n bytes`` inserts
+and ``1, varint offset, varint n`` copies from the base.
+'''
+
+
+class Pack():
+    ''' A read-only pack and its index.
+    '''
+    MAGIC = b'OPIX'
+
+    def __init__(self, bridge, key):
+        '''
+        Parameters:
+            bridge :Bridge
+                Where the pack lives.  It must support `read_range`.
+            key :str
+                The key of the pack without the ``.pack`` or ``.idx`` suffix
+        '''
+        self.bridge = bridge
+        self.key = key
+        idx = bridge.read(key + '.idx', max_size=1 << 32)
+        if idx[:4] != Pack.MAGIC: raise ValueError(f"{key}.idx is not a pack index")
+        self.count = int.from_bytes(idx[4:8], 'big')
+        self.digests = idx[8:8 + 32 * self.count]
+        self.locations = idx[8 + 32 * self.count:]
+
+
+    def __len__(self):
+        return self.count
+
+
+    def __iter__(self):
+        digests = self.digests
+        return (digests[i:i+32] for i in range(0, len(digests), 32))
+
+
+    def __contains__(self, digest):
+        return self.find(digest) >= 0
+
+
+    def find(self, digest):
+        ''' The position of `digest` in the index, or -1
+        '''
+        digests, lo, hi = self.digests, 0, self.count
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            if digests[mid*32:mid*32+32] < digest: lo = mid + 1
+            else: hi = mid
+        return lo if lo < self.count and digests[lo*32:lo*32+32] == digest else -1
+
+
+    def entry(self, digest):
+        ''' Return (type, data) of the entry of `digest`, or None if it is not in this pack.
+        '''
+        if (i := self.find(digest)) < 0: return None
+        offset, size = _LOCATION.unpack_from(self.locations, i * _LOCATION.size)
+        data = self.bridge.read_range(self.key + '.pack', offset, size)
+        return data[0], data[1:]
+
+
+    @staticmethod
+    def write(bridge, key, entries):
+        ''' Write [(digest, type, data)] as a new pack and return it.
+        '''
+        pack, locations = bytearray(), {}
+        for digest, type, data in entries:
+            locations[digest] = (len(pack), 1 + len(data))
+            pack.append(type)
+            pack += data
+        order = sorted(locations)
+        idx = bytearray(Pack.MAGIC + len(order).to_bytes(4, 'big'))
+        for digest in order: idx += digest
+        for digest in order: idx += _LOCATION.pack(*locations[digest])
+        bridge.write(key + '.pack', bytes(pack))
+        bridge.write(key + '.idx', bytes(idx))
+        return Pack(bridge, key)
+
+
+
+def make_delta(base, target, block=16):
+    ''' Encode `target` as copies from `base` and inserts.
+    '''
+    out = bytearray()
+    write_varint(out, len(base))
+    write_varint(out, len(target))
+    blocks = {}
+    for offset in range(0, len(base) - block + 1, block):
+        blocks.setdefault(base[offset:offset+block], offset)
+    i = start = 0
+    end = len(target)
+    while i + block <= end:
+        if (offset := blocks.get(target[i:i+block])) is None:
+            i += 1
+            continue
+        while i > start and offset > 0 and base[offset-1] == target[i-1]:
+            i -= 1
+            offset -= 1
+        n = block
+        while i + n < end and offset + n < len(base) and base[offset+n] == target[i+n]: n += 1
+        _insert(out, target[start:i])
+        out.append(1)
+        write_varint(out, offset)
+        write_varint(out, n)
+        i = start = i + n
+    _insert(out, target[start:])
+    return bytes(out)
+
+
+def apply_delta(base, delta):
+    size, i = read_varint(delta, 0)
+    if size != len(base): raise ValueError("The delta is for a different base")
+    size, i = read_varint(delta, i)
+    out = bytearray()
+    while i < len(delta):
+        op = delta[i]
+        if op == 0:
+            n, i = read_varint(delta, i + 1)
+            out += delta[i:i+n]
+            i += n
+        else:
+            offset, i = read_varint(delta, i + 1)
+            n, i = read_varint(delta, i)
+            out += base[offset:offset+n]
+    if len(out) != size: raise ValueError("The delta is corrupt")
+    return bytes(out)
+
+
+def _insert(out, data):
+    if not data: return
+    out.append(0)
+    write_varint(out, len(data))
+    out += data
+
+
+
+import struct
+from .codec import write_varint, read_varint
+_LOCATION = struct.Struct('>QI')
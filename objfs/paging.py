@@ -0,0 +1,264 @@
+from .platon import Platon, Namespace
+
+
+
+class PagedPlaton(Platon):
+    ''' A `Platon` whose namespace and sentences live in a `Pager` and are only read when first touched.
+
+    `lookup`, `each` and iteration read through the private ``_namespace`` and ``_sentences`` slots,
+    which this class turns into properties that fault the node in.
+    The sentences section of a node is only decoded when the sentences themselves are touched, so walking a path is cheap.
+
+    A node is modified when its namespace changes or its public `sentences` are asked for (`define` does that).
+    Modified nodes are never evicted.  `Pager.flush` writes them back.
+
+    Paged nodes are kept out of the shared `Platon.lookup_cache`, whose strong references would keep them from being evicted.
+    '''
+    __slots__ = 'pager', 'stored', 'state', 'dirty', 'loaded_version', 'raw', '__weakref__'
+    UNLOADED, LOADED = 0, 1
+    lookup_cache = None
+
+    def __init__(self, pager, stored=None):
+        self.pager = pager
+        self.stored = stored # The raw path where this node's record lives, or None if it was never written
+        self.state = PagedPlaton.UNLOADED if stored is not None else PagedPlaton.LOADED
+        self.dirty = stored is None
+        self.loaded_version = self.raw = None
+        super().__init__()
+        if stored is None:
+            pager.loaded[self] = pager.NODE_COST
+            pager.used += pager.NODE_COST
+
+
+    def _get_namespace(self):
+        if self.state: self.pager.loaded.move_to_end(self)
+        else: self.pager.fault(self)
+        return _namespace_slot.__get__(self)
+
+
+    def _set_namespace(self, namespace):
+        if namespace is not None and not self.state: self.pager.fault(self)
+        _namespace_slot.__set__(self, namespace)
+
+
+    def _get_sentences(self):
+        if self.state: self.pager.loaded.move_to_end(self)
+        else: self.pager.fault(self)
+        if self.raw is not None: self.pager.decode(self)
+        return _sentences_slot.__get__(self)
+
+
+    def _set_sentences(self, sentences):
+        if sentences is not None:
+            if self._get_sentences() is not sentences: self.dirty = True
+        _sentences_slot.__set__(self, sentences)
+
+
+    _namespace = property(_get_namespace, _set_namespace)
+    _sentences = property(_get_sentences, _set_sentences)
+
+
+    @property
+    def sentences(self):
+        ''' The `Sentences`.  Asking for them marks this node as modified because the caller may change them.
+        '''
+        sentences = Platon.sentences.fget(self)
+        self.dirty = True
+        return sentences
+
+
+    @sentences.setter
+    def sentences(self, sentences):
+        self._sentences = sentences
+
+
+    def modified(self):
+        # A leaf gets an empty namespace as soon as `namespace` is read, which is not a change while it stays empty
+        if self.dirty: return True
+        if (ns := _namespace_slot.__get__(self)) is None or ns.version == self.loaded_version: return False
+        return bool(ns) or self.loaded_version is not None
+
+
+
+class Pager():
+    ''' Loads a `PagedPlaton` hierarchy from a `KVStore`, through its `Bridge`, one node at a time.
+
+    Every node is one record (see `objfs.codec`) stored under ``prefix + path.hex()``, and the root under ``prefix + 'root'``.
+    Loaded nodes are kept in least recently used order.
+    When the bytes of the loaded records (plus `NODE_COST` each) go over `budget`, the oldest unmodified
+    nodes with no loaded children are unloaded again.
+    Live nodes are shared through a weak map, so a platon that is still referenced keeps its identity when its parent is reloaded.
+
+    Platon references in sentences are stored by path, like symbolic links.
+    '''
+    NODE_COST = 256
+
+    def __init__(self, bridge, budget=64 << 20, prefix='nodes/'):
+        '''
+        Parameters:
+            bridge :Bridge
+                Where the records are read from and written to
+            budget :int
+                The approximate number of bytes of loaded records to keep in memory
+            prefix :str
+                Prepended to every record key
+        '''
+        self.bridge = bridge
+        self.budget = budget
+        self.prefix = prefix
+        self.used = 0
+        self.faults = self.evictions = 0
+        self.loaded = OrderedDict() # {PagedPlaton: cost}
+        self.busy = [] # Nodes that are being faulted in or decoded and must not be evicted
+        self.nodes = WeakValueDictionary() # {stored path: PagedPlaton}
+        self.root = PagedPlaton(self, b'')
+
+
+    def __repr__(self):
+        return f"Pager({len(self.loaded)} loaded, {self.used}/{self.budget} bytes, {self.faults} faults, {self.evictions} evictions)"
+
+
+    def new(self):
+        ''' A new, empty node for this hierarchy.  It is written by the next `flush` once it is in a namespace.
+        '''
+        return PagedPlaton(self)
+
+
+    def key(self, raw):
+        return self.prefix + (raw.hex() or 'root')
+
+
+    def read(self, raw):
+        try:
+            return self.bridge.read(self.key(raw), max_size=1 << 32)
+        except FileNotFoundError:
+            return b''
+
+
+    def fault(self, node):
+        ''' Read the record of `node` and build its namespace.  The sentences are decoded later by `decode`.
+        '''
+        record = self.read(node.stored)
+        node.state = PagedPlaton.LOADED
+        self.faults += 1
+        self.busy.append(node)
+        if record:
+            ns, start = self.namespace(node, record)
+            if ns is not None:
+                _namespace_slot.__set__(node, ns)
+                node.loaded_version = ns.version
+            if start < len(record): node.raw = memoryview(record)[start:]
+        cost = len(record) + self.NODE_COST
+        self.loaded[node] = cost
+        self.used += cost
+        if self.used > self.budget: self.evict()
+        self.busy.pop()
+
+
+    def namespace(self, node, record):
+        ''' Build the `Namespace` of `node` from its record, reusing live children.  Return it (or None) and the offset of the sentences.
+        '''
+        keys, start = decode_namespace(record)
+        if not keys: return None, start
+        ns = Namespace(owner=node)
+        for key, stored in zip(keys, self.children(node, keys)):
+            if (child := self.nodes.get(stored)) is None or child.parent is not node:
+                child = self.nodes[stored] = PagedPlaton(self, stored)
+                child.parent, child.key = node, key
+            dict.__setitem__(ns, key, child)
+        return ns, start
+
+
+    def children(self, node, keys):
+        ''' Where the records of the children `keys` of `node` are stored
+        '''
+        stored = node.stored
+        return [stored + PlatonID.from_int(key) for key in keys]
+
+
+    def decode(self, node):
+        raw, node.raw = node.raw, None
+        self.busy.append(node)
+        try:
+            _sentences_slot.__set__(node, decode_sentences(raw, 0, self.resolve))
+        finally:
+            self.busy.pop()
+
+
+    def resolve(self, id):
+        try:
+            return self.root.lookup(id)
+        except KeyError:
+            return id
+
+
+    def evict(self):
+        ''' Unload the least recently used nodes until the budget is met.
+        '''
+        loaded = self.loaded
+        left = len(loaded)
+        while left and self.used > self.budget:
+            left -= 1
+            node, cost = loaded.popitem(last=False)
+            loaded[node] = cost
+            if node is not self.root and self.evictable(node):
+                self.unload(node)
+                # Its parent may only have been held by it, so look at that next
+                if (parent := node.parent) is not None and parent in loaded:
+                    loaded.move_to_end(parent, last=False)
+                    left += 1
+
+
+    def evictable(self, node):
+        if node.stored is None or node.modified() or node in self.busy: return False
+        ns = _namespace_slot.__get__(node)
+        return ns is None or not any(child.__class__ is not PagedPlaton or child.state for child in ns.values())
+
+
+    def unload(self, node):
+        ''' Forget the namespace and sentences of `node`.  Its children keep their parent link.
+        '''
+        self.used -= self.loaded.pop(node)
+        self.evictions += 1
+        _namespace_slot.__set__(node, None)
+        _sentences_slot.__set__(node, None)
+        node.raw = node.loaded_version = None
+        node.state = PagedPlaton.UNLOADED
+
+
+    def flush(self):
+        ''' Write every modified node that is in this hierarchy back to the bridge.
+        '''
+        for node in [node for node in self.loaded if node.modified() and node.root() is self.root]:
+            self.write(node)
+
+
+    def save(self, platon):
+        ''' Write a whole in-memory hierarchy as the root of this pager.  Reopen a `Pager` to read it.
+        '''
+        self.write(platon, everything=True)
+
+
+    def write(self, node, everything=False):
+        ''' Write the record of `node`, and of every child under it that is new or has moved.
+        '''
+        stack, root = [node], node.root()
+        while stack:
+            node = stack.pop()
+            raw = b'' if node.parent is None else node.path().id
+            ns, sentences = node._namespace, node._sentences
+            self.bridge.write(self.key(raw), encode_node(ns.keys() if ns else (), sentences, root))
+            if node.__class__ is PagedPlaton:
+                if node.stored != raw: self.nodes[raw] = node
+                node.stored, node.dirty = raw, False
+                node.loaded_version = ns.version if ns is not None else None
+            for child in (ns or {}).values():
+                if everything or child.__class__ is not PagedPlaton or child.stored != child.path().id: stack.append(child)
+
+
+
+from collections import OrderedDict
+from weakref import WeakValueDictionary
+from .codec import decode_namespace, decode_sentences, encode_node
+from .platon_id import PlatonID
+_namespace_slot, _sentences_slot = Platon._namespace, Platon._sentences
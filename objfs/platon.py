@@ -1,26 +1,260 @@
+from .lru import LRU
+
+
+
+def platon_graph(out, *roots, max_depth=None, max_nodes=1000, collapse=50):
+    ''' Write a DOT graph of the platons reachable from `roots` to `out`, which only needs a `write` method.
+
+    The graph is walked breadth first and each line is written as soon as it is known, so memory stays O(max_nodes).
+    Namespace edges are dashed and sentence edges are labelled with their verb.
+
+    Parameters:
+        max_depth :int
+            The number of hops from the roots to show.  None is unlimited.
+        max_nodes :int
+            Stop adding platons after this many.  Edges to the rest are counted in a summary node.
+        collapse :int
+            A namespace with more children than this is shown as one summary node.
+
+    Returns the number of platons written.
+    '''
+    write = out.write
+    write('digraph {\nfontname="Helvetica";\nnode [shape=rectangle];\n')
+    seen, queue, hidden = set(), deque(), 0
+    def _add(node, depth):
+        nonlocal hidden
+        if id(node) in seen: return True
+        if len(seen) >= max_nodes or (max_depth is not None and depth > max_depth):
+            hidden += 1
+            return False
+        seen.add(id(node))
+        queue.append((node, depth))
+        write(f'n{id(node)} [label=<{_gviz_label(node)}>];\n')
+        return True
+    for node in roots: _add(node, 0)
+    while queue:
+        node, depth = queue.popleft()
+        if (ns := node._namespace):
+            if len(ns) > collapse:
+                write(f'n{id(node)}_ns [shape=folder, label="{len(ns)} children"];\nn{id(node)} -> n{id(node)}_ns [style=dashed];\n')
+            else:
+                for child in ns.values():
+                    if _add(child, depth + 1): write(f'n{id(node)} -> n{id(child)} [style=dashed];\n')
+        for verb, *objects in node:
+            label = html.escape(_gviz_term(verb), quote=True)
+            for obj in objects:
+                if isinstance(obj, Platon) and _add(obj, depth + 1): write(f'n{id(node)} -> n{id(obj)} [label="{label}"];\n')
+    if hidden: write(f'more [shape=note, label="{hidden} edges cut by the limits"];\n')
+    write('}\n')
+    return len(seen)
+
+
+
+def _gviz_path(node, limit=4):
+    # Only the last `limit` parts of the path so that deep hierarchies don't make huge labels
+    keys = []
+    while node.parent is not None and len(keys) < limit:
+        keys.append(str(PlatonID.from_trusted(PlatonID.from_int(node.key))))
+        node = node.parent
+    return ('…_' if node.parent is not None else '') + ('_'.join(reversed(keys)) or '.')
+
+
+
+def _gviz_term(term):
+    if isinstance(term, Platon): return _gviz_path(term)
+    text = repr(term)
+    return text if len(text) <= 30 else text[:29] + '…'
+
+
+
+def _gviz_label(node):
+    return f'<font point-size="12" color="gray">{html.escape(_gviz_path(node))}</font><br/><font point-size="14">{html.escape(repr(node))}</font>'
+
+
+
+class Sentences(dict):
+    ''' The default sentence storage of a `Platon`: {verb: objects-tuples}
+
+    Most verbs only have a few objects so they are kept in a tuple, which is promoted to a set past `SMALL` entries.
+    Other storage (like `ColumnarSentences`) must provide `add`, `get`, `items` and `__len__`, and may provide `add_many`.
+    '''
+    __slots__ = ()
+    SMALL = 8
+
+    def add(self, verb, objects):
+        if (objs := self.get(verb)) is None:
+            self[verb] = objects,
+        elif objs.__class__ is tuple:
+            if objects in objs: return
+            self[verb] = objs + (objects,) if len(objs) < Sentences.SMALL else {*objs, objects}
+        else:
+            objs.add(objects)
+
+
+    def add_many(self, verb, objects):
+        ''' `add` every objects tuple of a list in one step.
+        '''
+        if (objs := self.get(verb)) is None:
+            objs = dict.fromkeys(objects)
+        elif objs.__class__ is tuple:
+            objs = dict.fromkeys((*objs, *objects))
+        else:
+            objs.update(objects)
+            return
+        self[verb] = tuple(objs) if len(objs) <= Sentences.SMALL else set(objs)
+
+
+
+class Namespace(dict):
+    ''' The children of a `Platon`: {key: Platon}
+
+    Every mutation gives the namespace a new, globally unique `version` so that caches
+    built on top of it (like `Platon.lookup_cache`) can tell exactly when they are stale.
+
+    Inserting a child sets its `Platon.parent` and `Platon.key` back-references.
+    A child has one parent, so inserting it somewhere else moves it.
+    '''
+    __slots__ = 'version', 'owner'
+
+    def __init__(self, items=(), owner=None):
+        super().__init__()
+        self.owner = owner
+        self.version = next(_versions)
+        self.update(items)
+
+
+    def __setitem__(self, key, child):
+        node = self.owner
+        while node is not None:
+            if node is child: raise ValueError(f"Inserting {child!r} under itself would make a cycle")
+            node = node.parent
+        merkle = Platon.merkle
+        if (old := self.get(key)) is not None and old is not child:
+            self._orphan(old)
+            if merkle is not None: merkle.unlink(self.owner, key, old)
+        if child.parent is not None and (child.parent is not self.owner or child.key != key):
+            if merkle is not None: merkle.unlink(child.parent, child.key, child, drop=False)
+            dict.__delitem__(old_ns := child.parent._namespace, child.key)
+            old_ns.version = next(_versions)
+            Platon.moves += 1
+        elif child.parent is None and child._namespace:
+            Platon.moves += 1 # The paths cached under a root change when it is inserted
+        super().__setitem__(key, child)
+        child.parent, child.key = self.owner, key
+        self.version = next(_versions)
+        if merkle is not None and old is not child: merkle.link(self.owner, key, child)
+
+
+    def __delitem__(self, key):
+        child = self[key]
+        self._orphan(child)
+        super().__delitem__(key)
+        self.version = next(_versions)
+        if Platon.merkle is not None: Platon.merkle.unlink(self.owner, key, child)
+
+
+    def pop(self, key, *default):
+        if key not in self: return super().pop(key, *default)
+        child = self[key]
+        del self[key]
+        return child
+
+
+    def popitem(self):
+        key, child = super().popitem()
+        self._orphan(child)
+        self.version = next(_versions)
+        if Platon.merkle is not None: Platon.merkle.unlink(self.owner, key, child)
+        return key, child
+
+
+    def setdefault(self, key, default=None):
+        ''' Like `dict.setdefault`, but a missing `default` inserts a new empty `Platon`.
+        '''
+        if key not in self: self[key] = Platon() if default is None else default
+        return self[key]
+
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+
+    def update(self, *args, **kwargs):
+        for key, child in dict(*args, **kwargs).items():
+            self[key] = child
+
+
+    def clear(self):
+        items = list(self.items())
+        for _, child in items: self._orphan(child)
+        super().clear()
+        self.version = next(_versions)
+        if Platon.merkle is not None:
+            for key, child in items: Platon.merkle.unlink(self.owner, key, child)
+
+
+    def adopt(self, owner):
+        self.owner = owner
+        for key, child in self.items():
+            child.parent, child.key = owner, key
+        Platon.moves += 1
+
+
+    @staticmethod
+    def _orphan(child):
+        child.parent = child.key = None
+        Platon.moves += 1
 
-def platon_graph(*roots):
-    lines = ['digraph {','fontname="Helvetica";', 'node [shape=rectangle];',]
-    seen = set()
-    def _add_node(node):
-        if node in seen: return
-        seen.add(node)
-        lines.append(f'n{id(node)} [label=<{node.gviz_label()}>];')
-        for fwd in node.fwd:
-            _add_node(fwd)
-            lines.append(f'n{id(node)} -> n{id(fwd)};')
-            print(f"Edge n{id(node)} ({node!r}) -> n{id(fwd)} ({fwd!r})")
-    for node in roots: _add_node(node)
-    return lines + ['}']
 
-    
 
 class Platon():
     ''' An abstract base class describing what abilities a platon is expected to have.
     '''
+    index = None # An optional global `TripleIndex` that `define` keeps up to date
+    closures = None # An optional {verb: Closure} that `define` keeps up to date
+    merkle = None # An optional `Merkle` that `define` and `Namespace` keep up to date
+    lookup_cache = LRU(4096) # {(root, PlatonID): (Platon, ((platon, namespace version), ...))} or None
+    moves = 0 # Counts re-parenting so that cached paths know when they are stale
+
+    __slots__ = 'parent', 'key', '_path', '_namespace', '_sentences'
+
     def __init__(self):
-        self.namespace = {}
-        self.sentences = {}
+        self.parent = self.key = self._path = self._namespace = self._sentences = None
+
+
+    @property
+    def namespace(self):
+        ''' The `Namespace`, which is only allocated when it is first asked for.
+        '''
+        if self._namespace is None: self._namespace = Namespace(owner=self)
+        return self._namespace
+
+
+    @namespace.setter
+    def namespace(self, namespace):
+        children, node = {id(child) for child in dict(namespace).values()}, self
+        while node is not None:
+            if id(node) in children: raise ValueError(f"Adopting {node!r} under itself would make a cycle")
+            node = node.parent
+        if not isinstance(namespace, Namespace): namespace = Namespace(namespace)
+        for key, child in (self._namespace or {}).items():
+            if namespace.get(key) is not child: Namespace._orphan(child)
+        namespace.adopt(self)
+        self._namespace = namespace
+
+
+    @property
+    def sentences(self):
+        ''' The `Sentences`, which are only allocated when they are first asked for.
+        '''
+        if self._sentences is None: self._sentences = Sentences()
+        return self._sentences
+
+
+    @sentences.setter
+    def sentences(self, sentences):
+        self._sentences = sentences
 
 
     def __str__(self):
@@ -39,35 +273,120 @@ class Platon():
 
     def lookup(self, id):
         ''' Given an `PlatonID` you should be able to return a `Platon` object.
+
+        Resolved paths are remembered in `lookup_cache` along with the version of every namespace
+        they went through.  A hit is only used if none of those namespaces have changed since.
+        A class can opt its platons out by setting `lookup_cache` to None (see `objfs.paging.PagedPlaton`).
         '''
-        if id == PlatonID.CURRENT: return self
-        key, next_id = id.split()
-        if key == -1: next = None
-        elif key == -2: next = self.parent_namespace()
-        elif key == -3: next = self
-        else: next = self.namespace.get(id)
-        if next == None: raise KeyError(f'Platon:{id} was not found in {self!r}')
-        return next if next_id == '0' else next.lookup(next_id)
+        if not isinstance(id, PlatonID): id = PlatonID.intern(id)
+        if (cache := self.lookup_cache) is not None and (hit := cache.get((self, id))) is not None:
+            node, deps = hit
+            for platon, version in deps:
+                if (ns := platon._namespace) is None or ns.version != version: break
+            else:
+                return node
+        node, raw, deps = self, id.id, []
+        for start, _ in PlatonID.part_offsets(raw):
+            key = PlatonID.to_int(raw, start)
+            if key >= 0:
+                if (ns := node._namespace) is None: next = None
+                else:
+                    deps.append((node, ns.version))
+                    next = ns.get(key)
+            elif key == -2:
+                if (next := node.parent) is not None: deps.append((next, next._namespace.version))
+            elif key == -3: next = node
+            else: next = None
+            if next is None: raise KeyError(f'Platon:{id} was not found in {self!r}')
+            node = next
+        if cache is not None and len(deps) > 1 and node.lookup_cache is not None: cache[self, id] = node, tuple(deps)
+        return node
 
 
     def define(self, verb, *objects):
         ''' Define a new sentence with this platon as the subject.
         '''
-        self.sentences.setdefault(verb,set())
-        self.sentences[verb].add(objects)
+        if Platon.merkle is not None: Platon.merkle.define(self, verb, objects)
+        self.sentences.add(verb, objects)
+        if Platon.index is not None: Platon.index.add(self, verb, objects)
+        if Platon.closures is not None and (closure := Platon.closures.get(verb)) is not None: closure.add(self, objects)
+
+
+    def define_many(self, sentences):
+        ''' Define many sentences with this platon as the subject.
+        `sentences` is an iterable of (verb, *objects) or, quicker still, a {verb: [objects tuple]} mapping.
+
+        The end state is the same as calling `define` for each sentence, but each verb's container is extended
+        once and `index` and `closures` get the whole batch at once.
+        '''
+        if isinstance(sentences, dict):
+            by_verb = {verb: list(objects) for verb, objects in sentences.items()}
+        else:
+            by_verb = {}
+            for sentence in sentences:
+                if sentence.__class__ is not tuple: sentence = tuple(sentence)
+                if (objs := by_verb.get(verb := sentence[0])) is None: by_verb[verb] = objs = []
+                objs.append(sentence[1:])
+        self._define_grouped(by_verb)
+        Platon._index_grouped([(self, by_verb)])
+
+
+    def _define_grouped(self, by_verb):
+        sentences = self.sentences
+        if (add_many := getattr(sentences, 'add_many', None)) is not None:
+            for verb, objects in by_verb.items(): add_many(verb, objects)
+        else:
+            for verb, objects in by_verb.items():
+                for objs in objects: sentences.add(verb, objs)
+
+
+    @staticmethod
+    def _index_grouped(batch):
+        # Bring `index`, `closures` and `merkle` up to date with [(subject, {verb: [objects]})]
+        if Platon.index is not None: Platon.index.load_grouped(batch)
+        if Platon.merkle is not None:
+            for subject, _ in batch: Platon.merkle.touch(subject)
+        if Platon.closures is not None:
+            for subject, by_verb in batch:
+                for verb, objects in by_verb.items():
+                    if (closure := Platon.closures.get(verb)) is None: continue
+                    for objs in objects: closure.add(subject, objs)
 
 
     def parent_namespace(self):
         ''' Return the parent platon in the namespace hierarchy.
-        This might be computationally expensive
         '''
-        raise NotImplementedError()
+        return self.parent
+
+
+    def root(self):
+        node = self
+        while node.parent is not None: node = node.parent
+        return node
+
+
+    def path(self):
+        ''' The `PlatonID` of this platon from the `root` of its namespace hierarchy.
+
+        Paths are cached on each platon and stay valid until any platon is moved or removed.
+        '''
+        moves, chain, node = Platon.moves, [], self
+        while node.parent is not None and ((cached := node._path) is None or cached[0] != moves):
+            chain.append(node)
+            node = node.parent
+        if not chain: return node._path[1] if node.parent is not None else PlatonID.from_trusted(PlatonID.CURRENT)
+        raw = b'' if node.parent is None else node._path[1].id
+        for node in reversed(chain):
+            raw += PlatonID.from_int(node.key)
+            node._path = moves, PlatonID.from_trusted(raw)
+        return self._path[1]
 
 
     def __iter__(self):
         ''' Yield every sentence (verb, *objects)
         '''
-        for verb, objects in self.sentences.items():
+        if self._sentences is None: return
+        for verb, objects in self._sentences.items():
             for objs in objects:
                 yield (verb, *objs)
     
@@ -75,7 +394,7 @@ class Platon():
     def each(self, verb):
         ''' Yield every sentence from the given verb
         '''
-        yield from self.sentences.get(verb, [])
+        if self._sentences is not None: yield from self._sentences.get(verb, ())
 
 
     #def gviz_label(self):
@@ -112,6 +431,10 @@ class Blob(Platon):
 
 from functools import reduce
 import html
+from itertools import count
+from collections import deque
+from .platon_id import PlatonID
+_versions = count()
 
 
 def named(txt):
@@ -23,15 +23,27 @@ class PlatonID():
 
     __slots__ = 'id',
 
+    interned = None # The `LRU` used by `intern` (see `set_interning`)
+
     NULL = bytes([0])
     PARENT = bytes([127])
     CURRENT = bytes([126])
+    SPECIAL = NULL, PARENT, CURRENT # to_int() of -1, -2, -3
+
+    # (size, prefix, value bits, first int) of each multi-byte tier
+    TIERS = (
+        (2, 0x8000, 13, 125),
+        (4, 0xa0000000, 29, 125 + (1<<13)),
+        (8, 0xc0 << 56, 61, 125 + (1<<13) + (1<<29)),
+        (16, 0xe0 << 120, 124, 125 + (1<<13) + (1<<29) + (1<<61)),
+    )
+
+    # The part size given its first byte (0 for reserved)
+    SIZES = bytes(1 if b < 0x80 else 0 if b >= 0xf0 else 2 << ((b>>5) & 3) for b in range(256))
 
     @staticmethod
     def size(bytes):
-        if not bytes[0] & 0x80: return 1
-        if s := (((bytes[0]>>5) + 1) << 1) & 0x7: return s
-        return 8 if bytes[0]>>4 == 0xe else 0
+        return PlatonID.SIZES[bytes[0]]
 
 
     @staticmethod
@@ -51,32 +63,99 @@ class PlatonID():
     
     @staticmethod
     def from_int(idx):
+        if idx < 0:
+            if idx < -3: raise ValueError(f"Invalid ID: {idx}")
+            return PlatonID.SPECIAL[-1-idx]
         if idx < 125: return bytes([idx+1])
-        if idx < 0x2000 + 125: return ((idx-125)|0x8000).to_bytes(2,'big')
-        if idx < 0x20000000 + 0x2000 + 125: return ((idx-125-0x20000)|0xa0000000).to_bytes(4,'big')
-        raise NotImplementedError()
+        for size, prefix, bits, offset in PlatonID.TIERS:
+            if idx - offset < 1 << bits: return ((idx-offset)|prefix).to_bytes(size,'big')
+        raise OverflowError(f"ID is too large: {idx}")
 
 
     @staticmethod
-    def to_int(part):
-        if p := {PlatonID.NULL:-1, PlatonID.PARENT:-2, PlatonID.CURRENT:-3}.get(part, None):
-            return p
-        size = PlatonID.size(part)
-        if size == 1: return part[0]-1
-        if size == 2: return (int.from_bytes(part,'big')&0x1fff) + 125
-        if size == 4: return (int.from_bytes(part,'big')&0x1fffffff) + 0x2000 + 125
-        raise NotImplementedError()
+    def to_int(id, start=0):
+        ''' Decode the part of `id` that begins at offset `start`.
+        '''
+        b = id[start]
+        size = PlatonID.SIZES[b]
+        if size == 1:
+            if b == 0: return -1
+            return b - 129 if b >= 126 else b - 1
+        for tsize, prefix, bits, offset in PlatonID.TIERS:
+            if tsize == size: return (int.from_bytes(memoryview(id)[start:start+size],'big') & ((1<<bits)-1)) + offset
+        raise ValueError(f'Invalid ID: {bytes(id[start:]).hex()}')
 
 
     @staticmethod
-    def each_part(id):
-        i = 0
-        while i < len(id):
-            s = PlatonID.size(id[i:])
-            yield id[i:i+s]
+    def part_offsets(id):
+        ''' Yield the (start, end) offsets of each part of `id`.
+        '''
+        i, n, sizes = 0, len(id), PlatonID.SIZES
+        while i < n:
+            s = sizes[id[i]] or n - i
+            yield i, i+s
             i += s
 
 
+    @staticmethod
+    def each_part(id):
+        ''' Yield a memoryview of each part of `id`.
+        '''
+        mv = memoryview(id)
+        for i, j in PlatonID.part_offsets(id):
+            yield mv[i:j]
+
+
+    @staticmethod
+    def normalize(parts):
+        ''' Join verified parts into a path, collapsing ``.`` and ``..`` in a single pass.
+        '''
+        stack = []
+        for part in parts:
+            b = part[0]
+            if b == 126: continue # CURRENT
+            if b == 127: # PARENT
+                if stack and stack[-1][0] != 127:
+                    stack.pop()
+                    continue
+            elif b == 0: # NULL
+                if len(parts) == 1: return PlatonID.NULL
+                raise ValueError(f"No NULL allowed in a PlatonID path")
+            stack.append(part)
+        return b''.join(stack) if stack else PlatonID.CURRENT
+
+
+    @staticmethod
+    def from_trusted(id):
+        ''' Wrap bytes that are already a verified and normalized path without checking them again.
+        '''
+        self = PlatonID.__new__(PlatonID)
+        object.__setattr__(self, 'id', id)
+        return self
+
+
+    @staticmethod
+    def set_interning(maxsize):
+        ''' Turn on the `intern` table with room for `maxsize` IDs, or turn it off with 0.
+        '''
+        PlatonID.interned = LRU(maxsize) if maxsize else None
+        return PlatonID.interned
+
+
+    @staticmethod
+    def intern(raw):
+        ''' Return a shared `PlatonID` for a raw str, int or bytes value.
+
+        Without an intern table this is just ``PlatonID(raw)``.
+        '''
+        if isinstance(raw, PlatonID): return raw
+        if (table := PlatonID.interned) is None: return PlatonID(raw)
+        if isinstance(raw, bytearray): raw = bytes(raw)
+        key = raw.__class__, raw
+        if (id := table.get(key)) is None: table[key] = id = PlatonID(raw)
+        return id
+
+
     def __init__(self, *parts):
         ids = []
         for part in parts:
@@ -90,23 +169,23 @@ class PlatonID():
                 ids.append(PlatonID.NULL)
             else:
                 ids.extend(PlatonID.from_hex(s) for s in str(part).split('_'))
-        if not ids or len(ids) == 1 and ids[0] == PlatonID.NULL:
-            self.id = PlatonID.NULL
-        else:
-            # Collapse .. and .
-            i = 0
-            while i < len(ids)-1:
-                if ids[i] == PlatonID.NULL: raise ValueError(f"No NULL allowed in a PlatonID path")
-                if ids[i] == PlatonID.CURRENT:
-                    ids[i:i+1] = []
-                    continue
-                if ids[i] != PlatonID.PARENT and ids[i+1] == PlatonID.PARENT:
-                    ids[i:i+2] = []
-                    if i: i -= 1
-                    continue
-                i += 1
-            if not ids: ids = [PlatonID.CURRENT]
-            self.id = reduce(lambda a,b: a+b, ids)
+        object.__setattr__(self, 'id', PlatonID.normalize(ids) if ids else PlatonID.NULL)
+
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PlatonID is immutable")
+
+
+    def __reduce__(self):
+        return PlatonID.from_trusted, (bytes(self.id),)
+
+
+    def __copy__(self):
+        return self
+
+
+    def __deepcopy__(self, memo):
+        return self
             
 
     def __str__(self):
@@ -122,17 +201,27 @@ class PlatonID():
 
 
     def __eq__(self, other):
-        if not isinstance(other, PlatonID): other = PlatonID(other)
-        return self.id == other.id
+        if other is self: return True
+        if isinstance(other, PlatonID): return self.id == other.id
+        if isinstance(other, (bytes, bytearray)) and self.id == other: return True
+        return self.id == PlatonID.intern(other).id
 
 
     def __truediv__(self, other):
-        return PlatonID(self, other)
+        # Appending to a normalized path stays normalized unless `other` starts with . or ..
+        if isinstance(other, int) and other >= 0: other = PlatonID.from_int(other)
+        elif isinstance(other, PlatonID): other = other.id
+        else: return PlatonID(self, other)
+        if other[0] in (0, 126, 127) or self.id[0] in (0, 126): return PlatonID(self, other)
+        return PlatonID.from_trusted(b''.join((self.id, other)))
 
 
     def split(self):
-        s = PlatonID.size(self.id)
-        return PlatonID.to_int(self.id[:s]), PlatonID(self.id[s:])
+        ''' The first part as an int and the rest as a `PlatonID` whose id is a memoryview of this one, so nothing is copied.
+        '''
+        id = self.id
+        s = PlatonID.SIZES[id[0]]
+        return PlatonID.to_int(id), PlatonID.from_trusted(memoryview(id)[s:] if len(id) > s else PlatonID.NULL)
 
 
     def parts(self):
@@ -140,10 +229,102 @@ class PlatonID():
 
 
     def hex_parts(self):
-        for part in self.parts():
-            if part == PlatonID.CURRENT: yield '.'
-            elif part == PlatonID.PARENT: yield '..'
-            else: yield hex(int(part.hex(),16))[2:]
+        id = self.id
+        mv = memoryview(id)
+        for i, j in PlatonID.part_offsets(id):
+            if id[i] == 126: yield '.'
+            elif id[i] == 127: yield '..'
+            else: yield mv[i:j].hex().lstrip('0') or '0'
+
+
+
+def encode_many(ints):
+    ''' Pack an integer array into one buffer of `PlatonID` parts.
+
+    This is ``b''.join(map(PlatonID.from_int, ints))`` without a Python loop per ID.
+    '''
+    import numpy as np
+    ints = np.asarray(ints).ravel()
+    if not len(ints): return b''
+    if ints.dtype.kind not in 'iu': raise TypeError(f"Expected an integer array, not {ints.dtype}")
+    special = ints < 0
+    if special.any() and ints.min() < -3: raise ValueError(f"Invalid ID: {ints.min()}")
+    vals = np.where(special, 0, ints).astype(np.uint64)
+    offsets = np.array([t[3] for t in PlatonID.TIERS], np.uint64)
+    tier = np.searchsorted(offsets, vals, side='right')
+    sizes = np.array([1, 2, 4, 8, 16])[tier]
+    starts = np.cumsum(sizes) - sizes
+    out = np.zeros(int(starts[-1] + sizes[-1]), np.uint8)
+    one = tier == 0
+    out[starts[one]] = vals[one] + np.uint64(1)
+    if special.any(): out[starts[special]] = np.array([0, 127, 126])[-1-ints[special]]
+    for t, (size, prefix, bits, offset) in enumerate(PlatonID.TIERS, 1):
+        if not (sel := tier == t).any(): continue
+        if size == 16:
+            lo = vals[sel] - np.uint64(offset)
+            hi = np.full(len(lo), prefix >> 64, np.uint64)
+            enc = np.stack([hi, lo], 1).astype('>u8').view(np.uint8).reshape(-1, 16)
+        else:
+            enc = ((vals[sel] - np.uint64(offset)) | np.uint64(prefix)).astype('>u8').view(np.uint8).reshape(-1, 8)[:, 8-size:]
+        out[starts[sel][:,None] + np.arange(size)] = enc
+    return out.tobytes()
+
+
+
+def part_starts(buf):
+    ''' Return an int64 array with the offset of every `PlatonID` part in a packed buffer.
+    '''
+    import numpy as np
+    data = np.frombuffer(buf, np.uint8)
+    n = len(data)
+    if not n: return np.zeros(0, np.int64)
+    sizes = np.array([PlatonID.size(bytes([b])) for b in range(256)])[data]
+    # Pointer doubling: each round doubles both the known starts and the jump length
+    jump = np.arange(n+1) + np.append(sizes, 0)
+    jump[(jump > n) | (np.append(sizes, 0) == 0)] = n
+    starts = np.zeros(1, np.int64)
+    while True:
+        more = jump[starts]
+        more = more[more < n]
+        starts = np.concatenate([starts, more])
+        if len(more) < len(starts) - len(more): break
+        jump = jump[jump]
+    if not sizes[starts].all() or starts[-1] + sizes[starts[-1]] != n: raise ValueError(f"Invalid ID buffer")
+    return starts
+
+
+
+def decode_many(buf):
+    ''' Unpack a buffer of `PlatonID` parts into an int64 array.
+
+    This is the inverse of `encode_many`.  NULL, PARENT and CURRENT decode to -1, -2 and -3 like `PlatonID.to_int`.
+    '''
+    import numpy as np
+    data = np.frombuffer(buf, np.uint8)
+    if not len(data): return np.zeros(0, np.int64)
+    starts = part_starts(buf)
+    size = np.diff(np.append(starts, len(data)))
+    first = data[starts].astype(np.int64)
+    out = first - 1
+    out[first == 0] = -1
+    out[first == 127] = -2
+    out[first == 126] = -3
+    for tsize, prefix, bits, offset in PlatonID.TIERS:
+        if not (sel := size == tsize).any(): continue
+        idx = starts[sel][:,None]
+        if tsize == 16:
+            hi = data[idx + np.arange(8)].view('>u8').ravel()
+            lo = data[idx + np.arange(8, 16)].view('>u8').ravel()
+            if (hi != np.uint64(prefix >> 64)).any() or (lo > np.uint64((1<<63) - 1 - offset)).any():
+                raise OverflowError("ID does not fit in int64")
+            vals = lo
+        else:
+            full = np.zeros((len(idx), 8), np.uint8)
+            full[:, 8-tsize:] = data[idx + np.arange(tsize)]
+            vals = full.view('>u8').ravel() & np.uint64((1<<bits) - 1)
+        out[sel] = (vals + np.uint64(offset)).astype(np.int64)
+    return out
+
 
 
-from functools import reduce
+from .lru import LRU
@@ -0,0 +1,288 @@
+class PlatonIDArray():
+    ''' Many `PlatonID`\\s packed into one contiguous buffer plus an offsets array.
+
+    A PlatonID object costs ~80 bytes.  Here an ID costs its own length plus an 8 byte offset.
+    Sorted arrays (see `sort`) have O(log n) membership and support the set operations.
+
+    The NULL ID can not be stored.
+    '''
+    __slots__ = 'buf', 'offsets', 'sorted'
+
+    def __init__(self, ids=()):
+        self.buf = bytearray()
+        self.offsets = array('Q', [0])
+        self.sorted = True
+        for id in ids: self.append(id)
+
+
+    @staticmethod
+    def from_buffer(buf, offsets, sorted=False):
+        ''' Wrap a packed buffer of IDs.  `offsets` has one more entry than there are IDs.
+        '''
+        self = PlatonIDArray()
+        self.buf = bytearray(buf)
+        self.offsets = array('Q', offsets)
+        self.sorted = sorted
+        return self
+
+
+    @staticmethod
+    def from_ints(ints):
+        ''' Build an array of single part IDs from an integer array using `encode_many`.
+        '''
+        buf = encode_many(ints)
+        return PlatonIDArray.from_buffer(buf, [*part_starts(buf).tolist(), len(buf)])
+
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+    def __repr__(self):
+        return f"PlatonIDArray([{', '.join(str(id) for id in self[:8])}{', ...' if len(self) > 8 else ''}])"
+
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0: idx += len(self)
+        return PlatonID.from_trusted(bytes(self.buf[self.offsets[idx]:self.offsets[idx+1]]))
+
+
+    def __iter__(self):
+        ''' Yield a memoryview of each ID.  The array can not grow until the views are released.
+        '''
+        mv, o = memoryview(self.buf), self.offsets
+        for i in range(len(self)):
+            yield mv[o[i]:o[i+1]]
+
+
+    def __eq__(self, other):
+        return isinstance(other, PlatonIDArray) and self.offsets == other.offsets and self.buf == other.buf
+
+
+    def __contains__(self, id):
+        id = _raw(id)
+        if self.sorted:
+            i = self.bisect(id)
+            return i < len(self) and self.raw(i) == id
+        return any(part == id for part in self)
+
+
+    @property
+    def nbytes(self):
+        return len(self.buf) + self.offsets.itemsize * len(self.offsets)
+
+
+    def raw(self, idx):
+        return bytes(self.buf[self.offsets[idx]:self.offsets[idx+1]])
+
+
+    def append(self, id):
+        id = _raw(id)
+        if id == PlatonID.NULL: raise ValueError("A PlatonIDArray can not hold NULL")
+        if self.sorted and len(self) and self.raw(len(self)-1) > id: self.sorted = False
+        self.buf += id
+        self.offsets.append(len(self.buf))
+
+
+    def extend(self, ids):
+        for id in ids: self.append(id)
+
+
+    def bisect(self, id):
+        ''' The index of the first ID >= `id` in a sorted array.
+        '''
+        id, buf, o = _raw(id), self.buf, self.offsets
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            if buf[o[mid]:o[mid+1]] < id: lo = mid + 1
+            else: hi = mid
+        return lo
+
+
+    def index(self, id):
+        if not self.sorted: raise ValueError("PlatonIDArray.index() needs a sorted array")
+        i = self.bisect(id)
+        if i == len(self) or self.raw(i) != _raw(id): raise ValueError(f"{PlatonID.from_trusted(_raw(id))} is not in the array")
+        return i
+
+
+    def sort(self, unique=False):
+        ''' Sort in byte order, which is also `PlatonID.to_int` order within a namespace.
+        '''
+        import numpy as np
+        fixed, lens = self._fixed()
+        if unique:
+            fixed, idx = np.unique(fixed, return_index=True)
+        else:
+            idx = np.argsort(fixed, kind='stable')
+            fixed = fixed[idx]
+        return self._set_fixed(fixed, lens[idx])
+
+
+    def merge(self, other):
+        ''' Return a new sorted array with the IDs of both arrays, keeping duplicates.
+        '''
+        import numpy as np
+        fixed, lens = self._concat(other)
+        idx = np.argsort(fixed, kind='stable')
+        return PlatonIDArray()._set_fixed(fixed[idx], lens[idx])
+
+
+    def union(self, other):
+        import numpy as np
+        fixed, lens = self._concat(other)
+        fixed, idx = np.unique(fixed, return_index=True)
+        return PlatonIDArray()._set_fixed(fixed, lens[idx])
+
+
+    def intersect(self, other):
+        import numpy as np
+        (a, alens), (b, _) = self._pair(other)
+        fixed, idx, _ = np.intersect1d(a, b, return_indices=True)
+        return PlatonIDArray()._set_fixed(fixed, alens[idx])
+
+
+    def difference(self, other):
+        import numpy as np
+        (a, alens), (b, _) = self._pair(other)
+        fixed, idx = np.unique(a, return_index=True)
+        keep = ~np.isin(fixed, b)
+        return PlatonIDArray()._set_fixed(fixed[keep], alens[idx][keep])
+
+
+    __or__, __and__, __sub__ = union, intersect, difference
+
+
+    def _pair(self, other):
+        if not isinstance(other, PlatonIDArray): other = PlatonIDArray(other)
+        width = max(self._width(), other._width())
+        return self._fixed(width), other._fixed(width)
+
+
+    def _concat(self, other):
+        import numpy as np
+        (a, alens), (b, blens) = self._pair(other)
+        return np.concatenate([a, b]), np.concatenate([alens, blens])
+
+
+    def _width(self):
+        import numpy as np
+        return int(np.diff(np.frombuffer(self.offsets, np.uint64)).max(initial=1))
+
+
+    def _fixed(self, width=None):
+        # A zero padded fixed width copy that numpy can sort and compare, plus the real lengths.
+        # Padding keeps byte order and never makes two IDs equal because no part after the first can start with 0.
+        import numpy as np
+        width = width or self._width()
+        o = np.frombuffer(self.offsets, np.uint64).astype(np.int64)
+        lens = np.diff(o)
+        data = np.frombuffer(bytes(self.buf) + bytes(width), np.uint8)
+        mat = data[o[:-1,None] + np.arange(width)]
+        mat[np.arange(width) >= lens[:,None]] = 0
+        return mat.view(f'S{width}').ravel(), lens
+
+
+    def _set_fixed(self, fixed, lens):
+        import numpy as np
+        width = fixed.dtype.itemsize
+        mat = np.ascontiguousarray(fixed).view(np.uint8).reshape(-1, width)
+        self.buf = bytearray(mat[np.arange(width) < lens[:,None]].tobytes())
+        self.offsets = array('Q', np.concatenate([[0], np.cumsum(lens)]).astype(np.uint64).tobytes())
+        self.sorted = True
+        return self
+
+
+
+class PlatonIDIndex():
+    ''' An ordered set of `PlatonID` paths that answers subtree queries with range scans.
+
+    Every part of a path is self-delimiting, so all descendants of a path share its bytes as a prefix
+    and sort right after it.  No valid part starts with a byte >= 0xf0, so ``prefix + b'\\xf0'`` bounds the subtree.
+    Plain byte order is also `PlatonID.to_int` order within a namespace, so no sort key is needed.
+    '''
+    END = b'\xf0'
+
+    def __init__(self, ids=()):
+        self.ids = PlatonIDArray(ids).sort(unique=True)
+        self.pending = PlatonIDArray()
+
+
+    def __len__(self):
+        return len(self.sorted())
+
+
+    def __contains__(self, id):
+        return id in self.sorted()
+
+
+    def __iter__(self):
+        ids = self.sorted()
+        return (ids[i] for i in range(len(ids)))
+
+
+    def add(self, id):
+        ''' Adding is cheap.  The additions are merged in bulk by the next query.
+        '''
+        self.pending.append(id)
+
+
+    def sorted(self):
+        if len(self.pending):
+            self.ids = self.ids | self.pending
+            self.pending = PlatonIDArray()
+        return self.ids
+
+
+    def range(self, prefix):
+        ''' The index range [lo, hi) of the strict descendants of `prefix`.
+        '''
+        ids, prefix = self.sorted(), _prefix(prefix)
+        lo = ids.bisect(prefix)
+        if prefix and lo < len(ids) and ids.raw(lo) == prefix: lo += 1
+        return lo, ids.bisect(prefix + self.END)
+
+
+    def count(self, prefix):
+        lo, hi = self.range(prefix)
+        return hi - lo
+
+
+    def descendants(self, prefix):
+        ids = self.sorted()
+        return (ids[i] for i in range(*self.range(prefix)))
+
+
+    def children(self, prefix):
+        ''' Yield the paths one part below `prefix` that have themselves or a descendant in the index.
+        
+        Each child costs one bisect to skip over its subtree.
+        '''
+        ids, prefix = self.sorted(), _prefix(prefix)
+        lo, hi = self.range(prefix)
+        while lo < hi:
+            id = ids.raw(lo)
+            child = id[:len(prefix) + PlatonID.size(id[len(prefix):])]
+            yield PlatonID.from_trusted(child)
+            lo = ids.bisect(child + self.END)
+
+
+
+def _prefix(id):
+    id = _raw(id)
+    return b'' if id in (PlatonID.CURRENT, PlatonID.NULL) else id
+
+
+
+def _raw(id):
+    if isinstance(id, PlatonID): return id.id if id.id.__class__ is bytes else bytes(id.id)
+    if isinstance(id, (bytes, bytearray, memoryview)): return bytes(id)
+    return PlatonID.intern(id).id
+
+
+
+from array import array
+from .platon_id import PlatonID, encode_many, part_starts
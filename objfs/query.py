@@ -0,0 +1,194 @@
+''' Conjunctive queries over sentences.
+
+>>> p, c = Var('p'), Var('c')
+>>> for row in Query((p, ISA, Photo), (p, Comment, c), (c, Author, bob)): print(row[p])
+
+A pattern is ``(subject, verb, *objects)`` where any term may be a `Var`.
+Every pattern must match a sentence with the same number of objects.
+'''
+
+
+class Var():
+    ''' A query variable.  Two `Var`\\s with the same name are the same variable.
+    '''
+    __slots__ = 'name'
+
+    def __init__(self, name):
+        self.name = name
+
+
+    def __repr__(self):
+        return f"?{self.name}"
+
+
+    def __eq__(self, other):
+        return other.__class__ is Var and other.name == self.name
+
+
+    def __hash__(self):
+        return hash((Var, self.name))
+
+
+
+class Query():
+    ''' A join of sentence patterns that streams every consistent binding of its variables as a {Var: value} dict.
+
+    The patterns are ordered greedily: the cheapest pattern first and then, repeatedly, the cheapest one given the
+    variables bound so far.  A pattern that can be answered by a direct lookup once its shared variables are bound
+    is joined by probing (an index nested loop join).  Any other pattern is evaluated once, on first use, into a hash
+    table keyed by its shared variables (a hash join).  Only those hash tables are materialized.
+
+    Subjects are probed through `Platon.each`.  Patterns with an unbound subject need a `TripleIndex`.
+    '''
+    def __init__(self, *patterns, index=None):
+        '''
+        Parameters:
+            patterns :(subject, verb, *objects)
+                Terms may be `Var`\\s
+            index :TripleIndex
+                Defaults to `Platon.index`
+        '''
+        self.patterns = [tuple(pattern) for pattern in patterns]
+        self.index = index if index is not None else Platon.index
+        self.filters = {}
+
+
+    def where(self, var, predicate):
+        ''' Only keep bindings where `predicate(value of var)` is true.  It is checked as soon as `var` is bound.
+        '''
+        self.filters.setdefault(var, []).append(predicate)
+        return self
+
+
+    def __iter__(self):
+        stream = iter(({},))
+        for pattern, bound, probe in self.plan():
+            new = [var for var in _vars(pattern) if var not in bound]
+            filters = [(var, f) for var in new for f in self.filters.get(var, ())]
+            join = self._probe if probe else self._hash
+            stream = join(stream, pattern, [var for var in _vars(pattern) if var in bound], filters)
+        return stream
+
+
+    def plan(self):
+        ''' The patterns in join order as (pattern, variables bound before it, probe) tuples.
+        '''
+        todo, bound, plan = list(self.patterns), set(), []
+        while todo:
+            cost, i = min((self._estimate(pattern, bound), i) for i, pattern in enumerate(todo))
+            pattern = todo.pop(i)
+            plan.append((pattern, frozenset(bound), self._probes(pattern, bound)))
+            bound.update(_vars(pattern))
+        return plan
+
+
+    def _probes(self, pattern, bound):
+        # Can the pattern be answered with a direct lookup once `bound` is substituted?
+        s, v, *objs = pattern
+        if _bound(s, bound): return True
+        return all(_bound(o, bound) for o in objs)
+
+
+    def _estimate(self, pattern, bound):
+        # A rough number of rows per input binding
+        s, v, *objs = pattern
+        objs = tuple(objs)
+        if s.__class__ is not Var:
+            if not isinstance(s, Platon) or s._sentences is None: return 0
+            if v.__class__ is not Var: return len(s._sentences.get(v, ()))
+            return len(s._sentences)
+        if s in bound: return 2
+        index = self.index
+        if index is None: return _HUGE
+        consts = not any(o.__class__ is Var for o in objs)
+        if v.__class__ is not Var:
+            if consts: return len(index.subjects(v, *objs))
+            if all(_bound(o, bound) for o in objs): return 1
+            return len(index.pos.get(v, ())) or 1
+        if consts: return len(index.osp.get(objs, ()))
+        if all(_bound(o, bound) for o in objs): return 1
+        return _HUGE
+
+
+    def _matches(self, s, v, objs):
+        # Every (subject, verb, objects) that might match the substituted pattern
+        if s.__class__ is not Var:
+            if not isinstance(s, Platon) or s._sentences is None: return
+            if v.__class__ is not Var:
+                for o in s.each(v): yield s, v, o
+            else:
+                for verb, *o in s: yield s, verb, tuple(o)
+            return
+        index = self.index
+        if index is None: raise ValueError(f"A pattern with an unbound subject needs a TripleIndex: {(s, v, *objs)}")
+        bound = not any(o.__class__ is Var for o in objs)
+        if v.__class__ is not Var:
+            if bound:
+                for subject in index.subjects(v, *objs): yield subject, v, objs
+            else:
+                for o, subjects in index.pos.get(v, {}).items():
+                    if len(o) == len(objs):
+                        for subject in subjects: yield subject, v, o
+        elif bound:
+            for subject, verbs in index.osp.get(objs, {}).items():
+                for verb in verbs: yield subject, verb, objs
+        else:
+            for verb, by_objects in index.pos.items():
+                for o, subjects in by_objects.items():
+                    if len(o) == len(objs):
+                        for subject in subjects: yield subject, verb, o
+
+
+    def _bind(self, pattern, binding, filters):
+        s, v, *objs = (binding.get(t, t) if t.__class__ is Var else t for t in pattern)
+        objs = tuple(objs)
+        for subject, verb, o in self._matches(s, v, objs):
+            if len(o) != len(objs): continue
+            if (out := _unify(pattern, (subject, verb, *o), binding)) is None: continue
+            if all(f(out[var]) for var, f in filters): yield out
+
+
+    def _probe(self, stream, pattern, shared, filters):
+        for binding in stream:
+            yield from self._bind(pattern, binding, filters)
+
+
+    def _hash(self, stream, pattern, shared, filters):
+        table = None
+        for binding in stream:
+            if table is None:
+                table = {}
+                for row in self._bind(pattern, {}, ()):
+                    table.setdefault(tuple(row[var] for var in shared), []).append(row)
+            for row in table.get(tuple(binding[var] for var in shared), ()):
+                out = dict(binding)
+                out.update(row)
+                if all(f(out[var]) for var, f in filters): yield out
+
+
+
+def _vars(pattern):
+    return [t for t in pattern if t.__class__ is Var]
+
+
+def _bound(term, bound):
+    return term.__class__ is not Var or term in bound
+
+
+def _unify(pattern, values, binding):
+    out = binding
+    for term, value in zip(pattern, values):
+        if term.__class__ is Var:
+            if (have := out.get(term, _unbound)) is _unbound:
+                if out is binding: out = dict(binding)
+                out[term] = value
+                continue
+            term = have
+        if term is not value and (term.__class__ is not value.__class__ or term != value): return None
+    return out
+
+
+
+from .platon import Platon
+_unbound = object()
+_HUGE = 1 << 62
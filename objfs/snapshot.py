@@ -0,0 +1,114 @@
+class Versions():
+    ''' The published versions of a DB, for readers that must not wait for writers.
+
+    A version is a `Snapshot` of a commit in an `ObjectStore`.  Its trees are immutable, so a snapshot never changes
+    and reading it takes no lock.  The single writer builds the next snapshot and then publishes it with one assignment,
+    so a reader gets either the old version or the new one, never a mix.
+
+    A version lives as long as a reader holds it: nodes are decoded once per tree digest and shared by every snapshot
+    that has the same subtree, through a weak map, so memory goes back as soon as the last reader of a version lets go.
+    Other processes can read the same commits from their own `ObjectStore` on the same bridge.
+    '''
+    def __init__(self, store):
+        self.store = store
+        self.nodes = WeakValueDictionary() # {tree digest: Frozen}
+        self.current = None
+
+
+    def publish(self, commit):
+        ''' Make the commit the version that new readers get
+        '''
+        self.current = Snapshot(self, commit)
+
+
+    def snapshot(self):
+        ''' The current version.  Hold on to it for as long as the reads must agree with each other.
+        '''
+        if (current := self.current) is None: raise LookupError("No version is published yet")
+        return current
+
+
+    def node(self, digest):
+        if (node := self.nodes.get(digest)) is None:
+            kind, payload = self.store.get(digest)
+            if kind != b'tree': raise ValueError(f"Object {digest.hex()} is a {kind.decode()}, not a tree")
+            node = self.nodes.setdefault(digest, Frozen(self, digest, payload))
+        return node
+
+
+
+class Snapshot():
+    ''' A read-only view of the DB at a commit.  Platon references read from it are `PlatonID` paths.
+    '''
+    def __init__(self, versions, commit):
+        self.versions = versions
+        self.commit = commit
+        graph = versions.store.graph
+        self.root = versions.node(graph.tree(commit) if commit in graph else versions.store.get_commit(commit).tree)
+
+
+    def __repr__(self):
+        return f"Snapshot({self.commit.hex()[:12]})"
+
+
+    def lookup(self, id):
+        ''' The `Frozen` node at the path `id`
+        '''
+        if not isinstance(id, PlatonID): id = PlatonID.intern(id)
+        node, raw = self.root, id.id
+        for start, _ in PlatonID.part_offsets(raw):
+            if (key := PlatonID.to_int(raw, start)) < 0: raise KeyError(f"Snapshots only look up forward paths, not {id}")
+            node = node.child(key)
+        return node
+
+
+    def each(self, id, verb):
+        ''' The objects tuples of `verb` at the path `id`.  A `Platon` verb is matched by its path.
+        '''
+        if isinstance(verb, Platon): verb = verb.path()
+        return iter(self.lookup(id).sentences.get(verb, ()))
+
+
+
+class Frozen():
+    ''' An immutable node of a tree.  Its children are decoded as they are reached and its sentences when first read.
+    '''
+    __slots__ = 'versions', 'digest', 'children', 'payload', 'start', 'kids', '_sentences', '__weakref__'
+
+    def __init__(self, versions, digest, payload):
+        self.versions = versions
+        self.digest = digest
+        self.children, self.start = decode_tree(payload)
+        self.payload = payload
+        self.kids = {} # {key: Frozen} Holds on to the children that were reached
+        self._sentences = None
+
+
+    def __repr__(self):
+        return f"Frozen({self.digest.hex()[:12]})"
+
+
+    @property
+    def namespace(self):
+        return self.children.keys()
+
+
+    def child(self, key):
+        if (node := self.kids.get(key)) is None:
+            node = self.kids.setdefault(key, self.versions.node(self.children[key]))
+        return node
+
+
+    @property
+    def sentences(self):
+        if (sentences := self._sentences) is None:
+            self._sentences = sentences = decode_sentences(self.payload, self.start)
+        return sentences
+
+
+
+from weakref import WeakValueDictionary
+from .codec import decode_sentences
+from .object_store import decode_tree
+from .platon import Platon
+from .platon_id import PlatonID
@@ -0,0 +1,259 @@
+''' Syncing commits between two `ObjectStore`\\s through a `Bridge` that both sides can reach, like an SFTP directory.
+
+The receiver sums up what it has and the sender works out what is missing from that, so only missing objects cross the bridge.
+A session lives under ``prefix + session + '/'`` and is made of these keys:
+
+=============== ============ =============================================================================
+Key             Written by   Content
+=============== ============ =============================================================================
+have            receiver     Its heads and a `Bloom` filter of every digest it has
+batch-<r>-<n>   sender       zlib of (varint size, raw object) for a batch of objects of round <r>
+sent-<r>        sender       The number of batches of round <r>, then the heads being sent, written last
+want-<r>        receiver     The digests that were still missing after round <r-1>
+=============== ============ =============================================================================
+
+The sender sends every commit that is not an ancestor of the receiver's heads, and walks their trees from the root,
+sending each tree or blob that the filter does not have.  A subtree the filter has is skipped as a whole:
+trees are content addressed, so having a tree means having everything under it.
+A false positive of the filter shows up as a missing child of a received tree, which the receiver asks for in another round.
+To keep that true, received objects are staged in the store (written, but not in its index) until nothing is missing,
+and then published children first, so a session that is cut off part way leaves no incomplete trees behind.
+'''
+
+
+class Bloom():
+    ''' A Bloom filter of digests.  Digests are already uniformly random, so the probes are taken from their bytes.
+    '''
+    def __init__(self, count, bits_per_item=10):
+        self.size = max(64, count * bits_per_item)
+        self.probes = max(1, round(bits_per_item * 0.69))
+        self.bits = bytearray((self.size + 7) >> 3)
+
+
+    def __contains__(self, digest):
+        bits, size = self.bits, self.size
+        h, step = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:16], 'little') | 1
+        for _ in range(self.probes):
+            bit = h % size
+            if not bits[bit >> 3] & (1 << (bit & 7)): return False
+            h += step
+        return True
+
+
+    def add(self, digest):
+        bits, size = self.bits, self.size
+        h, step = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:16], 'little') | 1
+        for _ in range(self.probes):
+            bit = h % size
+            bits[bit >> 3] |= 1 << (bit & 7)
+            h += step
+
+
+    def encode(self):
+        out = bytearray()
+        write_varint(out, self.size)
+        write_varint(out, self.probes)
+        return bytes(out + self.bits)
+
+
+    @staticmethod
+    def decode(data, i=0):
+        bloom = Bloom(0)
+        bloom.size, i = read_varint(data, i)
+        bloom.probes, i = read_varint(data, i)
+        bloom.bits = bytearray(data[i:i + ((bloom.size + 7) >> 3)])
+        return bloom
+
+
+
+class Sender():
+    ''' The side that has the commits.  Call `serve` whenever the receiver has written a request.
+    '''
+    def __init__(self, store, bridge, heads, session='default', prefix='sync/', batch_size=1 << 20):
+        '''
+        Parameters:
+            store :ObjectStore
+                Where the objects come from
+            bridge :Bridge
+                Shared with the receiver
+            heads :[bytes]
+                The commits to send, with everything they reach
+            batch_size :int
+                The approximate uncompressed size of a batch
+        '''
+        self.store = store
+        self.bridge = bridge
+        self.heads = list(heads)
+        self.prefix = f"{prefix}{session}/"
+        self.batch_size = batch_size
+        self.round = 0
+        self.bloom = None
+        self.seen = set() # Digests already sent
+        self.sent = self.bytes = 0
+
+
+    def serve(self):
+        ''' Answer the receiver's latest request: the first `have`, or the `want` of a later round.
+        '''
+        if self.round == 0:
+            self._send(self.missing(self.bridge.read(self.prefix + 'have', max_size=1 << 40)))
+        else:
+            data = self.bridge.read(f"{self.prefix}want-{self.round}", max_size=1 << 40)
+            self._send(self._walk(data[i:i+32] for i in range(0, len(data), 32)))
+        self.round += 1
+
+
+    def missing(self, have):
+        ''' Yield the digests that the receiver, as summed up by `have`, is missing: commits oldest first, each followed by its new trees.
+        '''
+        count, i = read_varint(have, 0)
+        theirs = [have[i + 32*n:i + 32*n + 32] for n in range(count)]
+        self.bloom = Bloom.decode(have, i + 32 * count)
+        graph = self.store.graph
+        bases = [head for head in theirs if head in graph]
+        commits = {}
+        for head in self.heads:
+            for commit in graph.since(head, *bases): commits[commit] = graph.generation(commit)
+        return self._walk(commit for commit in sorted(commits, key=commits.get) if commit not in self.bloom)
+
+
+    def _walk(self, digests):
+        ''' Yield each digest and then, depth first, everything it refers to that the receiver does not have
+        '''
+        for digest in digests:
+            stack = [digest]
+            while stack:
+                digest = stack.pop()
+                if digest in self.seen: continue
+                self.seen.add(digest)
+                yield digest
+                kind, payload = self.store.get(digest)
+                if kind == b'commit': children = [Commit.decode(payload).tree]
+                elif kind == b'tree': children = decode_tree(payload)[0].values()
+                else: continue
+                stack.extend(child for child in children if child not in self.bloom)
+
+
+    def _send(self, digests):
+        batch, n = bytearray(), 0
+        for digest in digests:
+            raw = self.store.raw(digest)
+            write_varint(batch, len(raw))
+            batch += raw
+            self.sent += 1
+            if len(batch) >= self.batch_size:
+                self._write(f"batch-{self.round}-{n}", zlib.compress(batch, 1))
+                batch, n = bytearray(), n + 1
+        if batch:
+            self._write(f"batch-{self.round}-{n}", zlib.compress(batch, 1))
+            n += 1
+        sent = bytearray()
+        write_varint(sent, n)
+        self._write(f"sent-{self.round}", bytes(sent) + b''.join(self.heads))
+
+
+    def _write(self, key, data):
+        self.bridge.write(self.prefix + key, data)
+        self.bytes += len(data)
+
+
+
+class Receiver():
+    ''' The side that wants the commits.  Call `request`, then `receive` each time the sender has served, until it returns True.
+    '''
+    def __init__(self, store, bridge, session='default', prefix='sync/', bits_per_item=10):
+        self.store = store
+        self.bridge = bridge
+        self.prefix = f"{prefix}{session}/"
+        self.bits_per_item = bits_per_item
+        self.round = 0
+        self.heads = [] # The heads that were sent, once they are complete
+        self.commits = [] # Received commits, added to the commit graph once nothing is missing
+        self.refs = set() # Digests that objects received since the last `missing` refer to
+        self.staged = {} # {digest: None} Received objects in the order they came, published once nothing is missing
+        self.keys = ['have'] # Keys of the session, deleted at the end
+        self.received = self.bytes = 0
+
+
+    def request(self, heads=()):
+        ''' Write the summary of what this side has.  `heads` are the local branch heads, the sender skips everything they reach.
+        '''
+        bloom = Bloom(len(self.store), self.bits_per_item)
+        for digest in self.store: bloom.add(digest)
+        out = bytearray()
+        heads = list(heads)
+        write_varint(out, len(heads))
+        self._write('have', bytes(out) + b''.join(heads) + bloom.encode())
+
+
+    def receive(self):
+        ''' Store the objects of the last round.  Return True when everything is here, otherwise ask for what is still missing and return False.
+        '''
+        sent = self.bridge.read(f"{self.prefix}sent-{self.round}", max_size=1 << 32)
+        batches, i = read_varint(sent, 0)
+        if self.round == 0: self.heads = [sent[j:j+32] for j in range(i, len(sent), 32)]
+        self.keys.append(f"sent-{self.round}")
+        for n in range(batches):
+            self.keys.append(key := f"batch-{self.round}-{n}")
+            batch = zlib.decompress(self.bridge.read(self.prefix + key, max_size=1 << 40))
+            i = 0
+            while i < len(batch):
+                size, i = read_varint(batch, i)
+                self._store(batch[i:i+size])
+                i += size
+        self.round += 1
+        if missing := self.missing():
+            self.keys.append(key := f"want-{self.round}")
+            self._write(key, b''.join(missing))
+            return False
+        # Objects arrive parents first, so in reverse every tree is published after everything under it
+        for digest in reversed(self.staged): self.store.publish(digest)
+        self.staged = {}
+        for payload in self.commits: self.store.put_commit(Commit.decode(payload))
+        self.store.flush()
+        for key in self.keys: self.bridge.delete(self.prefix + key)
+        return True
+
+
+    def _store(self, raw):
+        header, payload = raw.split(b'\0', 1)
+        kind = header.split(b' ', 1)[0]
+        self.received += 1
+        if (digest := ObjectStore.hash(kind, payload)) in self.store or digest in self.staged: return
+        self.staged[self.store.stage(payload, kind)] = None
+        if kind == b'commit':
+            self.commits.append(payload)
+            commit = Commit.decode(payload)
+            self.refs.update((commit.tree, *commit.parents))
+        elif kind == b'tree':
+            self.refs.update(decode_tree(payload)[0].values())
+
+
+    def missing(self):
+        ''' The digests that received objects refer to but that are neither stored nor received.
+        '''
+        store, staged = self.store, self.staged
+        self.refs = missing = {d for d in self.refs if d not in store and d not in staged}
+        return sorted(missing | {head for head in self.heads if head not in store and head not in staged})
+
+
+    def _write(self, key, data):
+        self.bridge.write(self.prefix + key, data)
+        self.bytes += len(data)
+
+
+
+def sync(sender, receiver, heads=()):
+    ''' Run a whole session in this process.  Return the number of rounds.
+    '''
+    receiver.request(heads)
+    while True:
+        sender.serve()
+        if receiver.receive(): return receiver.round
+
+
+
+import zlib
+from .codec import read_varint, write_varint
+from .commit import Commit
+from .object_store import ObjectStore, decode_tree
@@ -0,0 +1,108 @@
+class TripleIndex():
+    ''' A global reverse index of sentences, maintained by `Platon.define` once installed as `Platon.index`.
+
+    Each `Platon` already keeps its own sentences in subject, verb, objects (SPO) order.
+    The index adds the two other permutations so that reverse lookups cost O(result):
+
+    ===== ============================ ==================================
+    Order Layout                       Answers
+    ===== ============================ ==================================
+    SPO   `Platon.sentences`           what does the subject say?
+    POS   {verb: {objects: {subject}}} who has (verb, *objects)?
+    OSP   {objects: {subject: {verb}}} how does subject relate to objects?
+    ===== ============================ ==================================
+
+    Objects are the whole tuple of objects of a sentence, just like in `Platon.define`.
+
+    Batches from `load_grouped` are only merged in by the next read of `pos` or `osp`.
+    '''
+    def __init__(self):
+        self._pos = {}
+        self._osp = {}
+        self.pending = [] # [[(subject, {verb: [objects]})]]
+
+
+    @property
+    def pos(self):
+        if self.pending: self.merge()
+        return self._pos
+
+
+    @property
+    def osp(self):
+        if self.pending: self.merge()
+        return self._osp
+
+
+    def __len__(self):
+        return sum(len(subjects) for objs in self.pos.values() for subjects in objs.values())
+
+
+    def add(self, subject, verb, objects):
+        self._pos.setdefault(verb, {}).setdefault(objects, set()).add(subject)
+        self._osp.setdefault(objects, {}).setdefault(subject, set()).add(verb)
+
+
+    def load(self, sentences):
+        ''' Bulk load (subject, verb, *objects) sentences.
+        '''
+        pos, osp = defaultdict(lambda: defaultdict(set)), defaultdict(lambda: defaultdict(set))
+        for subject, verb, *objects in sentences:
+            objects = tuple(objects)
+            pos[verb][objects].add(subject)
+            osp[objects][subject].add(verb)
+        for src, dst in ((pos, self._pos), (osp, self._osp)):
+            for k, inner in src.items():
+                dinner = dst.setdefault(k, {})
+                for k2, vals in inner.items():
+                    if k2 in dinner: dinner[k2] |= vals
+                    else: dinner[k2] = vals
+        return self
+
+
+    def load_grouped(self, batch):
+        ''' Queue [(subject, {verb: [objects]})], as built by `Platon.define_many` and `DB.load`, for the next `merge`.
+        '''
+        self.pending.append(batch)
+        return self
+
+
+    def merge(self):
+        pos, osp, pending, self.pending = self._pos, self._osp, self.pending, []
+        for subject, by_verb in (item for batch in pending for item in batch):
+            for verb, objects in by_verb.items():
+                if (by_objects := pos.get(verb)) is None: pos[verb] = by_objects = {}
+                for objs in objects:
+                    if (subjects := by_objects.get(objs)) is None: by_objects[objs] = {subject}
+                    else: subjects.add(subject)
+                    if (by_subject := osp.get(objs)) is None: osp[objs] = {subject: {verb}}
+                    elif (verbs := by_subject.get(subject)) is None: by_subject[subject] = {verb}
+                    else: verbs.add(verb)
+
+
+    def load_platons(self, platons):
+        ''' Bulk load every sentence of each `Platon`.
+        '''
+        return self.load((platon, *sentence) for platon in platons for sentence in platon)
+
+
+    def subjects(self, verb, *objects):
+        ''' The subjects that define (verb, *objects)
+        '''
+        return self.pos.get(verb, {}).get(objects, frozenset())
+
+
+    def verbs(self, subject, *objects):
+        ''' The verbs that subject uses with the objects
+        '''
+        return self.osp.get(objects, {}).get(subject, frozenset())
+
+
+    def objects(self, subject, verb):
+        ''' The objects tuples of (subject, verb, ...) sentences
+        '''
+        return set(subject.each(verb))
+
+
+
+from collections import defaultdict
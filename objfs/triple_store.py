@@ -0,0 +1,206 @@
+class Dictionary():
+    ''' Maps hashable terms to dense integers and back.
+    '''
+    __slots__ = 'ids', 'terms'
+
+    def __init__(self):
+        self.ids = {}
+        self.terms = []
+
+
+    def __len__(self):
+        return len(self.terms)
+
+
+    def __getitem__(self, idx):
+        return self.terms[idx]
+
+
+    def get(self, term):
+        return self.ids.get(term)
+
+
+    def encode(self, term):
+        if (idx := self.ids.get(term)) is None:
+            idx = self.ids[term] = len(self.terms)
+            self.terms.append(term)
+        return idx
+
+
+
+class TripleStore():
+    ''' A columnar sentence store shared by many `Platon`\\s.
+
+    Verbs and objects tuples are dictionary encoded to integers, subjects are numbered as they are attached, and the sentences
+    are kept as three sorted, de-duplicated uint32 columns (subject, verb, objects).
+    New sentences go to a pending buffer that is merged into the columns, in bulk, by the next read.
+    That suits bulk loaded, read-mostly data; interleaving single writes with reads re-sorts often.
+
+    `attach` swaps a Platon's `Sentences` for a `ColumnarSentences` view so that
+    `Platon.define`, `Platon.each` and iteration keep working unchanged.
+    '''
+    def __init__(self):
+        import numpy as np
+        self.subjects = []
+        self.verbs = Dictionary()
+        self.objects = Dictionary()
+        self.s = self.v = self.o = np.zeros(0, np.uint32)
+        self.pending = array('I')
+
+
+    def __len__(self):
+        self.compact()
+        return len(self.s)
+
+
+    def __iter__(self):
+        ''' Yield every (subject, verb, *objects)
+        '''
+        self.compact()
+        subjects, verbs, objects = self.subjects, self.verbs.terms, self.objects.terms
+        for s, v, o in zip(self.s.tolist(), self.v.tolist(), self.o.tolist()):
+            yield (subjects[s], verbs[v], *objects[o])
+
+
+    @property
+    def nbytes(self):
+        return self.s.nbytes + self.v.nbytes + self.o.nbytes + self.pending.itemsize * len(self.pending)
+
+
+    def attach(self, platon):
+        ''' Move the sentences of `platon` into this store.
+        '''
+        if isinstance(platon.sentences, ColumnarSentences) and platon.sentences.store is self: return platon
+        sentences = ColumnarSentences(self, len(self.subjects))
+        self.subjects.append(platon)
+        for verb, objects in platon.sentences.items():
+            for objs in objects: sentences.add(verb, objs)
+        platon.sentences = sentences
+        return platon
+
+
+    def add(self, subject, verb, objects):
+        self.pending.extend((subject, self.verbs.encode(verb), self.objects.encode(objects)))
+
+
+    def load(self, sentences):
+        ''' Bulk load (subject, verb, *objects) sentences.  The subjects are attached.
+        '''
+        pending, vencode, oencode = self.pending, self.verbs.encode, self.objects.encode
+        for subject, verb, *objects in sentences:
+            view = subject.sentences
+            if view.__class__ is not ColumnarSentences or view.store is not self: view = self.attach(subject).sentences
+            pending.extend((view.subject, vencode(verb), oencode(tuple(objects))))
+        return self
+
+
+    def compact(self):
+        ''' Merge the pending sentences into the sorted columns.
+        '''
+        if not self.pending: return
+        import numpy as np
+        new = np.frombuffer(self.pending, np.uint32).reshape(-1, 3)
+        s, v, o = (np.concatenate([col, new[:,i]]) for i, col in enumerate((self.s, self.v, self.o)))
+        order = np.lexsort((o, v, s))
+        s, v, o = s[order], v[order], o[order]
+        keep = np.ones(len(s), bool)
+        keep[1:] = (s[1:] != s[:-1]) | (v[1:] != v[:-1]) | (o[1:] != o[:-1])
+        self.s, self.v, self.o = s[keep], v[keep], o[keep]
+        self.pending = array('I')
+
+
+    def rows(self, subject, verb=None):
+        ''' The [lo, hi) row range of an encoded subject (and verb)
+        '''
+        import numpy as np
+        self.compact()
+        lo, hi = np.searchsorted(self.s, subject), np.searchsorted(self.s, subject, 'right')
+        if verb is None: return int(lo), int(hi)
+        v = self.v[lo:hi]
+        return int(lo + np.searchsorted(v, verb)), int(lo + np.searchsorted(v, verb, 'right'))
+
+
+    def scan(self, verb=None, *objects):
+        ''' A vectorized full scan.  Returns a boolean row mask of the sentences that use `verb`
+        (and exactly `objects` when given).  Use it to index `s`, `v` and `o`.
+        '''
+        import numpy as np
+        self.compact()
+        mask = np.ones(len(self.s), bool)
+        if verb is not None:
+            if (vid := self.verbs.get(verb)) is None: return np.zeros(len(self.s), bool)
+            mask &= self.v == vid
+        if objects:
+            if (oid := self.objects.get(objects)) is None: return np.zeros(len(self.s), bool)
+            mask &= self.o == oid
+        return mask
+
+
+    def count(self, verb=None, *objects):
+        return int(self.scan(verb, *objects).sum())
+
+
+    def subjects_of(self, verb, *objects):
+        ''' Every subject with the sentence (verb, *objects)
+        '''
+        subjects = self.subjects
+        return [subjects[s] for s in self.s[self.scan(verb, *objects)].tolist()]
+
+
+
+class ColumnarSentences():
+    ''' The sentences of one subject in a `TripleStore`.  It has the parts of the `Sentences` interface that `Platon` uses.
+    '''
+    __slots__ = 'store', 'subject'
+
+    def __init__(self, store, subject):
+        self.store = store
+        self.subject = subject
+
+
+    def __len__(self):
+        # The number of verbs, like `Sentences`.  Rows are sorted by verb within a subject.
+        lo, hi = self.store.rows(self.subject)
+        if lo == hi: return 0
+        v = self.store.v
+        return int((v[lo+1:hi] != v[lo:hi-1]).sum()) + 1
+
+
+    def __contains__(self, verb):
+        if (vid := self.store.verbs.get(verb)) is None: return False
+        lo, hi = self.store.rows(self.subject, vid)
+        return lo < hi
+
+
+    def add(self, verb, objects):
+        self.store.add(self.subject, verb, objects)
+
+
+    def add_many(self, verb, objects):
+        store, subject = self.store, self.subject
+        vid, encode, pending = store.verbs.encode(verb), store.objects.encode, store.pending
+        for objs in objects: pending.extend((subject, vid, encode(objs)))
+
+
+    def get(self, verb, default=None):
+        if (vid := self.store.verbs.get(verb)) is None: return default
+        lo, hi = self.store.rows(self.subject, vid)
+        if lo == hi: return default
+        terms = self.store.objects.terms
+        return [terms[o] for o in self.store.o[lo:hi].tolist()]
+
+
+    def items(self):
+        store = self.store
+        lo, hi = store.rows(self.subject)
+        verbs, objects = store.verbs.terms, store.objects.terms
+        v, o = store.v[lo:hi].tolist(), store.o[lo:hi].tolist()
+        start = 0
+        for i in range(1, len(v) + 1):
+            if i == len(v) or v[i] != v[start]:
+                yield verbs[v[start]], [objects[x] for x in o[start:i]]
+                start = i
+
+
+
+from array import array
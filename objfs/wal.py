@@ -0,0 +1,199 @@
+class WAL():
+    ''' An append-only write-ahead log with group commit.
+
+    The log is a directory of segments ``<n>.wal``.  Each record is ``uint32 length, uint32 crc32, payload``.
+    A torn record at the end of the last segment (from a crash mid-write) is cut off when the log is opened again.
+
+    `append` hands a record to the log and waits until it is on disk.  Whichever waiting writer gets there first
+    writes every queued record and fsyncs once for all of them, so many concurrent transactions share one fsync.
+
+    `checkpoint` starts a new segment and forgets the old ones once their effects are saved somewhere else.
+    '''
+    def __init__(self, path, segment_size=64 << 20, sync=True):
+        '''
+        Parameters:
+            path :str
+                The directory of the segments
+            segment_size :int
+                Start a new segment once the current one is bigger than this
+            sync :bool
+                fsync every group.  Only turn this off for tests and benchmarks.
+        '''
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.segment_size = segment_size
+        self.sync = sync
+        self.lock = threading.Lock()
+        self.done = threading.Condition(self.lock)
+        self.queue = []
+        self.queued = self.written = 0 # Sequence numbers of the last queued and last written (or failed) record
+        self.writing = False
+        self.failed = [] # (first, last, error) for every group that could not be written
+        self.fsyncs = 0
+        segments = self.segments()
+        self.segment = segments[-1] if segments else self.checkpointed()
+        if segments:
+            last = self.path / f'{self.segment}.wal'
+            data, end = last.read_bytes(), 0
+            for _, end in _records(data): pass
+            if end < len(data): os.truncate(last, end)
+        self.file = open(self.path / f'{self.segment}.wal', 'ab')
+
+
+    def close(self):
+        self.file.close()
+
+
+    def segments(self):
+        ''' The numbers of the segments since the last checkpoint, in order.
+        '''
+        start = self.checkpointed()
+        return sorted(n for p in self.path.glob('*.wal') if (n := int(p.stem)) >= start)
+
+
+    def checkpointed(self):
+        ''' The first segment after the last checkpoint
+        '''
+        try:
+            return int((self.path / 'checkpoint').read_text().split('\n', 1)[0])
+        except FileNotFoundError:
+            return 0
+
+
+    def state(self):
+        ''' The `state` given to the last `checkpoint`
+        '''
+        try:
+            return (self.path / 'checkpoint').read_text().split('\n', 1)[1]
+        except FileNotFoundError:
+            return ''
+
+
+    def enqueue(self, payload):
+        ''' Queue a record and return its sequence number for `wait`.
+        '''
+        with self.lock:
+            self.queue.append(_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+            self.queued += 1
+            return self.queued
+
+
+    def wait(self, seq):
+        ''' Return once record `seq` is durable.  One of the waiting threads writes the group.
+        Raises the write's error in every thread waiting on a group that failed.  Some of that group may still have reached
+        the disk and will come back from `replay`.
+        '''
+        with self.lock:
+            while self.written < seq:
+                if self.writing:
+                    self.done.wait()
+                    continue
+                self.writing = True
+                group, self.queue, first, last, error = self.queue, [], self.written + 1, self.queued, None
+                self.lock.release()
+                try:
+                    self.file.write(b''.join(group))
+                    self.file.flush()
+                    if self.sync: os.fsync(self.file.fileno())
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    self.lock.acquire()
+                    self.writing = False
+                    self.written = last
+                    if error is None:
+                        self.fsyncs += 1
+                        if self.file.tell() > self.segment_size: self._rotate()
+                    else:
+                        self.failed.append((first, last, error))
+                        self._abandon()
+                    self.done.notify_all()
+            for first, last, error in self.failed:
+                if first <= seq <= last: raise error
+
+
+    def append(self, payload):
+        self.wait(self.enqueue(payload))
+
+
+    def _rotate(self):
+        self.file.close()
+        self.segment += 1
+        self.file = open(self.path / f'{self.segment}.wal', 'ab')
+
+
+    def _abandon(self):
+        # A failed group may have left a torn record behind.  Later groups go in a new segment so replay still reaches them.
+        try:
+            self.file.close()
+        except OSError:
+            pass
+        self.segment += 1
+        self.file = open(self.path / f'{self.segment}.wal', 'ab')
+
+
+    def checkpoint(self, state=''):
+        ''' Start a new segment and delete the ones before it.  Call it once everything logged so far is saved elsewhere.
+        `state` is a string that says where, for whoever replays the log.
+        '''
+        self.wait(self.queued)
+        with self.lock:
+            while self.writing: self.done.wait()
+            self._rotate()
+            tmp = self.path / 'checkpoint.tmp'
+            tmp.write_text(f"{self.segment}\n{state}")
+            tmp.replace(self.path / 'checkpoint')
+            for n in [n for n in (int(p.stem) for p in self.path.glob('*.wal')) if n < self.segment]:
+                (self.path / f'{n}.wal').unlink()
+
+
+    def replay(self):
+        ''' Yield the payload of every record since the last checkpoint.
+        '''
+        for n in self.segments():
+            for payload, _ in _records((self.path / f'{n}.wal').read_bytes()):
+                if payload: yield payload
+
+
+
+def _records(data):
+    ''' Yield the payload and end offset of each record of a segment, up to the first torn one
+    '''
+    i = 0
+    while i + _HEADER.size <= len(data):
+        size, crc = _HEADER.unpack_from(data, i)
+        payload = data[i + _HEADER.size:i + _HEADER.size + size]
+        if len(payload) != size or zlib.crc32(payload) != crc: return
+        i += _HEADER.size + size
+        yield payload, i
+
+
+
+def encode_ops(ops, root=None):
+    ''' A transaction payload: varint count, then each op as a tuple of `objfs.codec` terms.  Platon terms are paths from `root`.
+    '''
+    out = bytearray()
+    write_varint(out, len(ops))
+    for op in ops: encode_objects(out, op, root)
+    return bytes(out)
+
+
+def decode_ops(payload, resolve=None):
+    ''' Yield each op.  An op is only decoded after the previous one was used, so `resolve` sees its effects.
+    '''
+    count, i = read_varint(payload, 0)
+    for _ in range(count):
+        arity, i = read_varint(payload, i)
+        op = []
+        for _ in range(arity):
+            term, i = read_term(payload, i, resolve)
+            op.append(term)
+        yield tuple(op)
+
+
+
+import os, struct, threading, zlib
+from pathlib import Path
+from .codec import write_varint, read_varint, read_term, encode_objects
+_HEADER = struct.Struct('<II')
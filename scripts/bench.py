@@ -0,0 +1,418 @@
+from cli import CLI
+
+
+
+def _time(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number
+
+
+def _report(name, *timings):
+    print(f"{name:<40}" + ''.join(f"{t*1e6:>14.1f}us" for t in timings) + (f"{timings[0]/timings[1]:>10.1f}x" if len(timings) == 2 else ''))
+
+
+def _legacy_normalize(ids):
+    # The splice-and-reduce normalizer PlatonID used before the stack based one
+    i = 0
+    while i < len(ids)-1:
+        if ids[i] == PlatonID.CURRENT:
+            ids[i:i+1] = []
+            continue
+        if ids[i] != PlatonID.PARENT and ids[i+1] == PlatonID.PARENT:
+            ids[i:i+2] = []
+            if i: i -= 1
+            continue
+        i += 1
+    return reduce(lambda a,b: a+b, ids) if ids else PlatonID.CURRENT
+
+
+@CLI()
+def platon_id(*, depth__d=1000, number__n=20):
+    ''' Time PlatonID normalization, `/` and `Platon.lookup` on deep paths
+
+    Parameters:
+        --depth <int>, -d <int>
+            The number of parts in the path
+        --number <int>, -n <int>
+            How many times to run each timing
+    '''
+    parts = [PlatonID.from_int(i) for i in range(depth__d)]
+    dots = parts + [PlatonID.PARENT, PlatonID.CURRENT] * (depth__d//2)
+    print(f"{'depth='+str(depth__d):<40}{'before':>16}{'after':>16}{'gain':>11}")
+    _report('normalize (no ..)', _time(lambda: _legacy_normalize(list(parts)), number__n), _time(lambda: PlatonID.normalize(parts), number__n))
+    _report('normalize (half ..)', _time(lambda: _legacy_normalize(list(dots)), number__n), _time(lambda: PlatonID.normalize(dots), number__n))
+    def divide(div):
+        id = PlatonID('.')
+        for i in range(depth__d): id = div(id, i)
+        return id
+    _report('repeated /', _time(lambda: divide(lambda a, b: PlatonID(a, b)), 1), _time(lambda: divide(PlatonID.__truediv__), 1))
+    ids = [PlatonID(i % 64) for i in range(depth__d)]
+    def compare(): return sum(id == 9 for id in ids) + sum(id == 'a_b' for id in ids)
+    before = _time(compare, number__n)
+    table = PlatonID.set_interning(1024)
+    _report('== int/str (interned)', before, _time(compare, number__n))
+    print(f"  intern {table}")
+    PlatonID.set_interning(0)
+    root = node = Platon()
+    for i in range(depth__d):
+        node.namespace[i] = node = Platon()
+    path = PlatonID(*range(depth__d))
+    cache, Platon.lookup_cache = Platon.lookup_cache, None
+    uncached = _time(lambda: root.lookup(path), number__n)
+    Platon.lookup_cache = cache
+    _report('Platon.lookup (cached)', uncached, _time(lambda: root.lookup(path), number__n))
+
+
+
+@CLI()
+def triple_store(*, subjects__s=200000, sentences__n=5):
+    ''' Compare the memory and full scan speed of `Sentences` and a `TripleStore`
+
+    Parameters:
+        --subjects <int>, -s <int>
+            The number of subject platons
+        --sentences <int>, -n <int>
+            The number of sentences per subject
+    '''
+    verbs = [Platon() for _ in range(8)]
+    objects = [Platon() for _ in range(1000)]
+    rnd = random.Random(0)
+    sentences = [[(rnd.choice(verbs), rnd.choice(objects), rnd.randrange(100)) for _ in range(sentences__n)] for _ in range(subjects__s)]
+    dict_platons = [Platon() for _ in range(subjects__s)]
+    col_platons = [Platon() for _ in range(subjects__s)]
+    def define():
+        for p, ss in zip(dict_platons, sentences):
+            for verb, *objs in ss: p.define(verb, *objs)
+    def load():
+        store.load((p, *s) for p, ss in zip(col_platons, sentences) for s in ss)
+        store.compact()
+    store = TripleStore()
+    dict_mem, col_mem = _memory(define), _memory(load)
+    verb, obj, n = sentences[0][0][0], sentences[0][0][1:], sentences[0][0][2]
+    def dict_scan(): return sum(1 for p in dict_platons for objs in p.each(verb) if objs == obj)
+    def col_scan(): return store.count(verb, *obj)
+    assert(dict_scan() == col_scan())
+    print(f"{len(store)} sentences{'':<14}{'Sentences':>16}{'TripleStore':>16}{'gain':>11}")
+    print(f"{'memory (MB)':<40}{dict_mem/1e6:>16.1f}{col_mem/1e6:>16.1f}{dict_mem/col_mem:>10.1f}x")
+    _report('full scan for (verb, *objects)', _time(dict_scan, 1), _time(col_scan, 1))
+
+
+
+@CLI()
+def define_many(*, subjects__s=20000, sentences__n=20):
+    ''' Compare `Platon.define` one sentence at a time with `Platon.define_many` and `DB.load`, with a `TripleIndex` installed
+
+    Parameters:
+        --subjects <int>, -s <int>
+            The number of subject platons
+        --sentences <int>, -n <int>
+            The number of sentences per subject
+    '''
+    verbs = [Platon() for _ in range(8)]
+    rnd = random.Random(0)
+    sentences = [(i, rnd.choice(verbs), rnd.randrange(1000)) for i in range(subjects__s) for _ in range(sentences__n)]
+    def fresh():
+        Platon.index = TripleIndex()
+        return [Platon() for _ in range(subjects__s)]
+    def define():
+        subjects = fresh()
+        for s, verb, obj in sentences: subjects[s].define(verb, obj)
+    grouped = [{} for _ in range(subjects__s)]
+    for s, verb, obj in sentences: grouped[s].setdefault(verb, []).append((obj,))
+    def many():
+        subjects = fresh()
+        for i in range(subjects__s): subjects[i].define_many(s[1:] for s in sentences[i*sentences__n:(i+1)*sentences__n])
+    def many_grouped():
+        for subject, by_verb in zip(fresh(), grouped): subject.define_many(by_verb)
+    def load():
+        subjects = fresh()
+        DB().load((subjects[s], verb, obj) for s, verb, obj in sentences)
+    def merged(fn): return lambda: (fn(), Platon.index.merge())
+    print(f"{len(sentences)} sentences{'':<14}{'define':>16}{'bulk':>16}{'gain':>11}")
+    before = _time(define, 1)
+    for name, fn in (('Platon.define_many', many), ('Platon.define_many({verb: [...]})', many_grouped), ('DB.load', load)):
+        _report(name, before, _time(fn, 1))
+        _report('  + index merge', before, _time(merged(fn), 1))
+    Platon.index = None
+
+
+
+@CLI()
+def wal(*, transactions__t=2000, path__p='local/bench_wal'):
+    ''' Durable DB transactions per second as the number of concurrent writers grows
+
+    Parameters:
+        --transactions <int>, -t <int>
+            The total number of transactions for each run
+        --path <dir>, -p <dir>
+            Where to put the log
+    '''
+    print(f"{'writers':<10}{'tx/s':>12}{'fsyncs':>10}{'tx/fsync':>10}")
+    for writers in (1, 4, 16, 64):
+        shutil.rmtree(path__p, ignore_errors=True)
+        db = DB(WAL(path__p))
+        verb = Platon()
+        db.apply([('insert', db, 0, verb)] + [('insert', db, i + 1, None) for i in range(writers)])
+        def writer(n):
+            subject = db.lookup(PlatonID(n + 1))
+            for i in range(transactions__t // writers): db.apply([('define', subject, verb, i)])
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+        fsyncs, start = db.wal.fsyncs, time.perf_counter()
+        for t in threads: t.start()
+        for t in threads: t.join()
+        elapsed, fsyncs = time.perf_counter() - start, db.wal.fsyncs - fsyncs
+        print(f"{writers:<10}{transactions__t/elapsed:>12.0f}{fsyncs:>10}{transactions__t/fsyncs:>10.1f}")
+        db.wal.close()
+    shutil.rmtree(path__p, ignore_errors=True)
+
+
+
+@CLI()
+def image(*, subjects__s=200000, sentences__n=10, path__p='local/bench.img'):
+    ''' Time opening a checkpoint image, compared with reading the same DB back from an `ObjectStore`
+
+    Parameters:
+        --subjects <int>, -s <int>
+            The number of subject platons, 1000 per parent
+        --sentences <int>, -n <int>
+            The number of sentences per subject
+        --path <file>, -p <file>
+            Where to put the image.  The object store goes next to it.
+    '''
+    db, rnd = DB(), random.Random(0)
+    db.namespace[0] = verbs = Platon()
+    for i in range(8): verbs.namespace[i] = Platon()
+    verbs = list(verbs.namespace.values())
+    for i in range(subjects__s):
+        if i % 1000 == 0: db.namespace[i // 1000 + 1] = parent = Platon()
+        parent.namespace[i % 1000] = subject = Platon()
+        subject.define_many({verb: [(rnd.randrange(1000),)] for verb in rnd.sample(verbs, min(8, sentences__n))})
+        for _ in range(sentences__n - 8): subject.define(rnd.choice(verbs), rnd.randrange(1000))
+    start = time.perf_counter()
+    write_image(path__p, db)
+    print(f"wrote {subjects__s * sentences__n} sentences in {time.perf_counter() - start:.1f}s, {os.path.getsize(path__p) >> 20}MB")
+    store_path = path__p + '.objects'
+    shutil.rmtree(store_path, ignore_errors=True)
+    store = ObjectStore(Filesystem(KVStore(id='bench', base=store_path)))
+    tree = store.put_tree(db)
+    del db
+    ids = [PlatonID(i // 1000 + 1, i % 1000) for i in rnd.sample(range(subjects__s), 1000)]
+    image = ImagePager(path__p)
+    _report('open image', _time(lambda: ImagePager(path__p), 10))
+    _report('image: 1000 random subjects', _time(lambda: [list(image.root.lookup(id)) for id in ids], 1))
+    _report('image: subjects of a verb', _time(lambda: image.subjects(image.root.lookup(PlatonID(0, 3))), 1))
+    _report('open from ObjectStore', _time(lambda: store.get_tree(tree), 1))
+    shutil.rmtree(store_path, ignore_errors=True)
+
+
+
+@CLI()
+def merge(*, objects__n=1000000, changes__c=1000, overlap__o=50):
+    ''' Three-way merge of two copies of a world of objects that each changed a few of them
+
+    Parameters:
+        --objects <int>, -n <int>
+            The number of objects in the world, 1000 per group
+        --changes <int>, -c <int>
+            The number of objects each side changes
+        --overlap <int>, -o <int>
+            How many of those both sides change
+    '''
+    store, rnd = ObjectStore(_Memory()), random.Random(0)
+    world = Platon()
+    world.namespace[0] = verbs = Platon()
+    tag, title = verbs.namespace[0], verbs.namespace[1] = Platon(), Platon()
+    for i in range(objects__n):
+        if i % 1000 == 0: world.namespace[i // 1000 + 1] = group = Platon()
+        group.namespace[i % 1000] = node = Platon()
+        node.define_many({tag: [('base',)], title: [(i,)]})
+    start = time.perf_counter()
+    base = store.put_tree(world)
+    print(f"{objects__n} objects stored in {time.perf_counter() - start:.1f}s")
+    picked = rnd.sample(range(objects__n), 2 * changes__c - overlap__o)
+    sides = []
+    for side, changed in (('ours', picked[:changes__c]), ('theirs', picked[-changes__c:])):
+        nodes = [world.lookup(PlatonID(i // 1000 + 1, i % 1000)) for i in changed]
+        for node in nodes:
+            node.define(tag, side)
+            node.sentences[title] = (side,),
+        sides.append(store.put_tree(world))
+        for node, i in zip(nodes, changed):
+            node.sentences = None
+            node.define_many({tag: [('base',)], title: [(i,)]})
+    merger = Merge(store, single=[title])
+    start = time.perf_counter()
+    merger.trees(base, *sides)
+    elapsed = time.perf_counter() - start
+    print(f"merged {changes__c} + {changes__c} changed objects in {elapsed*1e3:.1f}ms: "
+        f"{merger.reads} trees read, {len(merger.conflicts)} conflicts")
+
+
+
+@CLI()
+def mvcc(*, seconds__t=3.0, batch__b=2000, path__p='local/bench_mvcc'):
+    ''' Snapshot reads per second from reader processes while one writer keeps committing
+
+    Parameters:
+        --seconds <float>, -t <float>
+            How long each run lasts
+        --batch <int>, -b <int>
+            The number of sentences the writer loads per commit
+        --path <dir>, -p <dir>
+            Where to put the object store
+    '''
+    print(f"{os.cpu_count()} cores")
+    print(f"{'readers':<10}{'reads/s':>12}{'commits':>10}")
+    ctx = multiprocessing.get_context('fork')
+    for readers in (1, 2, 4, 8):
+        shutil.rmtree(path__p, ignore_errors=True)
+        store, db, rnd = ObjectStore(Filesystem(KVStore(id='bench', base=path__p))), DB(), random.Random(0)
+        db.namespace[0] = verb = Platon()
+        for i in range(100): db.namespace[i + 1] = Platon()
+        head, stop, reads = ctx.Array('c', db.commit(store)), ctx.Event(), ctx.Value('q', 0)
+        procs = [ctx.Process(target=_mvcc_reader, args=(path__p, head, stop, reads, verb.path().id)) for _ in range(readers)]
+        for p in procs: p.start()
+        commits, end = 0, time.perf_counter() + seconds__t
+        while time.perf_counter() < end:
+            db.load((PlatonID(rnd.randrange(100) + 1), verb, rnd.randrange(1 << 30)) for _ in range(batch__b))
+            head.raw = db.commit(store)
+            commits += 1
+        stop.set()
+        for p in procs: p.join()
+        print(f"{readers:<10}{reads.value/seconds__t:>12.0f}{commits:>10}")
+    shutil.rmtree(path__p, ignore_errors=True)
+
+
+def _mvcc_reader(path, head, stop, reads, verb):
+    versions, rnd, n = Versions(ObjectStore(Filesystem(KVStore(id='bench', base=path)))), random.Random(), 0
+    verb = PlatonID.from_trusted(verb)
+    while not stop.is_set():
+        if versions.current is None or versions.current.commit != head.raw: versions.publish(head.raw)
+        snap = versions.snapshot()
+        for _ in range(100):
+            snap.lookup(PlatonID(rnd.randrange(100) + 1)).sentences.get(verb)
+            n += 1
+    with reads.get_lock(): reads.value += n
+
+
+
+@CLI()
+def commit(*, objects__n=200000, changes__c=100):
+    ''' Time `DB.commit` after a few changes, once re-encoding the whole DB and once with a `Merkle` tracking it
+
+    Parameters:
+        --objects <int>, -n <int>
+            The number of objects in the DB, 1000 per group
+        --changes <int>, -c <int>
+            The number of objects changed before each commit
+    '''
+    print(f"{'objects='+str(objects__n):<40}{'full':>16}{'merkle':>16}{'gain':>11}")
+    timings = []
+    for merkle in (None, Merkle()):
+        store, db, rnd = ObjectStore(_Memory()), DB(), random.Random(0)
+        db.namespace[0] = verb = Platon()
+        for i in range(objects__n):
+            if i % 1000 == 0: db.namespace[i // 1000 + 1] = group = Platon()
+            group.namespace[i % 1000] = node = Platon()
+            node.define(verb, i)
+        if merkle is not None: merkle.install().track(db)
+        db.commit(store)
+        def change_and_commit():
+            for _ in range(changes__c): db.lookup(PlatonID(rnd.randrange(objects__n // 1000) + 1, rnd.randrange(1000))).define(verb, rnd.randrange(1 << 30))
+            db.commit(store)
+        timings.append(_time(change_and_commit, 3))
+        if merkle is not None: merkle.uninstall()
+    _report(f'{changes__c} changes + commit', *timings)
+
+
+
+@CLI()
+def sync(*, objects__n=200000, changes__c=100, path__p='local/bench_sync'):
+    ''' Incremental sync of a big repository that the receiver mostly has already
+
+    Parameters:
+        --objects <int>, -n <int>
+            The number of objects in the world, 1000 per group
+        --changes <int>, -c <int>
+            The number of objects changed since the receiver's head
+        --path <dir>, -p <dir>
+            Where to put the bridge between the two sides
+    '''
+    ours, theirs, rnd = ObjectStore(_Memory()), ObjectStore(_Memory()), random.Random(0)
+    shutil.rmtree(path__p, ignore_errors=True)
+    wire = Filesystem(KVStore(id='bench', base=path__p))
+    world = Platon()
+    world.namespace[0] = verb = Platon()
+    for i in range(objects__n):
+        if i % 1000 == 0: world.namespace[i // 1000 + 1] = group = Platon()
+        group.namespace[i % 1000] = node = Platon()
+        node.define(verb, i)
+    first = ours.put_commit(Commit(ours.put_tree(world)))
+    start = time.perf_counter()
+    rounds = sync_stores(Sender(ours, wire, [first]), Receiver(theirs, wire))
+    print(f"initial: {len(theirs)} objects in {rounds} round(s), {time.perf_counter() - start:.1f}s")
+    for i in rnd.sample(range(objects__n), changes__c): world.lookup(PlatonID(i // 1000 + 1, i % 1000)).define(verb, 'changed')
+    second = ours.put_commit(Commit(ours.put_tree(world), [first]))
+    sender, receiver = Sender(ours, wire, [second]), Receiver(theirs, wire)
+    start = time.perf_counter()
+    rounds = sync_stores(sender, receiver, [first])
+    elapsed = time.perf_counter() - start
+    print(f"incremental: {sender.sent} objects in {rounds} round(s), {elapsed:.2f}s, complete: {len(theirs) == len(ours)}")
+    print(f"  receiver -> sender {receiver.bytes:>10} bytes (the digest list would be {32 * len(theirs)})")
+    print(f"  sender -> receiver {sender.bytes:>10} bytes ({sender.bytes / sender.sent:.0f} per object)")
+    shutil.rmtree(path__p, ignore_errors=True)
+
+
+
+class _Memory():
+    ''' A `Bridge` that keeps everything in a dict, so benchmarks measure the code and not the disk
+    '''
+    def __init__(self):
+        self.data = {}
+
+
+    def read(self, key, max_size=None):
+        try:
+            return self.data[key]
+        except KeyError:
+            raise FileNotFoundError(key) from None
+
+
+    def write(self, key, data):
+        self.data[key] = bytes(data)
+
+
+    def read_range(self, key, offset, size):
+        return self.read(key)[offset:offset+size]
+
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+
+def _memory(fn):
+    tracemalloc.start()
+    fn()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return used
+
+
+
+import multiprocessing, os, random, shutil, threading, time, timeit, tracemalloc
+from functools import reduce
+from cli import print
+from objfs.db import DB
+from objfs.image import ImagePager, write_image
+from objfs.kvfs import Filesystem, KVStore
+from objfs.merge import Merge
+from objfs.merkle import Merkle
+from objfs.object_store import ObjectStore
+from objfs.commit import Commit
+from objfs.platon import Platon
+from objfs.platon_id import PlatonID
+from objfs.snapshot import Versions
+from objfs.sync import Sender, Receiver, sync as sync_stores
+from objfs.triple_index import TripleIndex
+from objfs.triple_store import TripleStore
+from objfs.wal import WAL
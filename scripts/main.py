@@ -15,6 +15,14 @@ def blobs(*args):
 
 
 
+@CLI('.bench')
+def bench(*args):
+    ''' Micro-benchmarks
+    '''
+    return CLI.sub_cmd(bench, args)
+
+
+
 @CLI()
 def test(spec=None, *, verbose__v=False):
     ''' Run all unit tests
@@ -37,24 +45,65 @@ def test(spec=None, *, verbose__v=False):
 
 
 @CLI()
-def platon(*, out__o="local/platon_graph.png", view__v=False):
+def platon(root='.', *, store__s='local/db', out__o="local/platon_graph.png", view__v=False, depth__d=8, nodes__n=1000, collapse__c=50):
     ''' Show platon graph
 
     Parameters:
+        <path>, --root <path>
+            The PlatonID of the platon to start from.
+        --store <dir>, -s <dir>
+            The directory of the stored platon hierarchy.
         --out <fname>, -o <fname>
-            The filename of the image to write.
+            The filename of the image to write.  Use - to write DOT to stdout.
         --view, -v
             Open up the created image with the system viewer.
+        --depth <int>, -d <int>
+            The number of hops from the root to show.
+        --nodes <int>, -n <int>
+            The maximum number of platons to show.
+        --collapse <int>, -c <int>
+            Namespaces with more children than this are shown as one node.
     '''
     from scripts.core.graphviz import GraphViz
-    from objfs.platon import Name, platon_graph
-    lines = platon_graph(Name)
-    if out__o == '-': return print.ln(lines)
-    GraphViz()(out__o, lines)
+    from objfs.kvfs import Filesystem, KVStore
+    from objfs.paging import Pager
+    from objfs.platon import platon_graph
+    node = Pager(Filesystem(KVStore(id='local', base=store__s))).root.lookup(root)
+    limits = dict(max_depth=depth__d, max_nodes=nodes__n, collapse=collapse__c)
+    if out__o == '-': return platon_graph(sys.stdout, node, **limits)
+    dot = Path(out__o).with_suffix('.dot')
+    dot.parent.mkdir(parents=True, exist_ok=True)
+    with open(dot, 'w') as f:
+        platon_graph(f, node, **limits)
+    GraphViz()(out__o)
     if view__v: run(['open', out__o])
 
 
 
+@CLI()
+def repack(*, store__s='local/db', depth__d=50, window__w=10):
+    ''' Move loose objects into a delta compressed pack
+
+    Parameters:
+        --store <dir>, -s <dir>
+            The directory of the object store.
+        --depth <int>, -d <int>
+            The longest chain of deltas to build.
+        --window <int>, -w <int>
+            How many neighbouring objects to try as a delta base.
+
+    No other process may write to the store while it runs.  Objects are only grouped by path within
+    the process that stored them, so a store opened here packs them by kind and size alone.
+    '''
+    from objfs.kvfs import Filesystem, KVStore
+    from objfs.object_store import ObjectStore
+    store = ObjectStore(Filesystem(KVStore(id='local', base=store__s)))
+    pack = store.repack(depth=depth__d, window=window__w)
+    print.ln(f"Packed {len(pack)} objects into {pack.key}" if pack else "Nothing to pack")
+
+
+
 import sys
+from pathlib import Path
 from cli import print, run
 from config import Config